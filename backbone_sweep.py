@@ -0,0 +1,232 @@
+"""
+Backbone Sweep for CPU Deployment
+Trains, converts and benchmarks each candidate backbone, then prints an accuracy / latency /
+size Pareto table and picks the fastest TFLite model that meets the accuracy bar
+"""
+
+import argparse
+import functools
+import json
+import os
+import time
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.callbacks import EarlyStopping
+from tensorflow.keras.optimizers import Adam
+from benchmark_tflite import LATENCY_RUNS, run_benchmarks
+from convert_model import TARGETS, convert_targets
+from dataset_manifest import MANIFEST_PATH, build_manifest, class_names_from, split_rows
+from input_pipeline import ThroughputCallback, make_dataset, paths_and_labels
+from model_factory import BACKBONES, build_model
+from tflite_conversion import REPRESENTATIVE_SAMPLES, load_pixels, sample_rows, tflite_scores
+from training_schedule import SCHEDULES, build_schedule, print_phase_report, run_schedule
+
+# Configuration (training matches retrain_model_tf214.py)
+IMG_HEIGHT, IMG_WIDTH = 224, 224
+BATCH_SIZE = 32
+EPOCHS = 10
+LEARNING_RATE = 0.0001
+SEED = 42
+
+SWEEP_BACKBONES = ('mobilenetv3small', 'mobilenetv3large', 'efficientnetb0', 'efficientnetb1',
+                   'efficientnetb2', 'efficientnetb3')
+SWEEP_DIR = 'backbone_sweep'
+SWEEP_REPORT = 'sweep_report.json'
+SWEEP_TARGET = 'dynamic'       # the TFLite target shipped to the app
+MIN_ACCURACY = 0.95            # TFLite top-1 on the test split
+EVAL_SAMPLES = 1000
+
+
+def train_backbone(backbone, manifest, data_path, class_names, img_size, schedule, epochs, seed=SEED):
+    """Train one backbone from ImageNet weights; returns (model, phase reports)."""
+    tf.keras.backend.clear_session()
+    tf.keras.utils.set_random_seed(seed)
+    num_classes = len(class_names)
+    train_rows = split_rows(manifest, 'train')
+    make_train_dataset = functools.partial(
+        make_dataset, *paths_and_labels(train_rows, data_path, class_names),
+        num_classes, BATCH_SIZE, img_size, training=True, seed=seed
+    )
+    val_dataset = make_dataset(*paths_and_labels(split_rows(manifest, 'val'), data_path, class_names),
+                               num_classes, BATCH_SIZE, img_size)
+
+    model, base_model = build_model(num_classes, img_size, backbone=backbone)
+    compile_kwargs = {'loss': 'categorical_crossentropy', 'metrics': ['accuracy']}
+    model.compile(optimizer=Adam(learning_rate=LEARNING_RATE), **compile_kwargs)
+    model.optimizer.build(model.trainable_variables)
+
+    phases = build_schedule(schedule, epochs, LEARNING_RATE, blocks=BACKBONES[backbone].blocks)
+    reports = run_schedule(
+        model, base_model, phases, make_train_dataset, compile_kwargs, tf.distribute.get_strategy(),
+        validation_data=val_dataset,
+        callbacks=[EarlyStopping(monitor='val_loss', patience=3, restore_best_weights=True, verbose=1),
+                   ThroughputCallback(len(train_rows), BATCH_SIZE)],
+        verbose=2
+    )
+    return model, reports
+
+
+def sweep_key(backbone, schedule, epochs, target, img_size):
+    """Results are only reusable for the same backbone, training run, TFLite target and input size."""
+    return f"{backbone}_{schedule}_{epochs}ep_{target}_{img_size[0]}x{img_size[1]}"
+
+
+def sweep_backbone(backbone, manifest, data_path, class_names, img_size, test_pixels, args):
+    """Train, evaluate, convert and benchmark one backbone; returns its result row."""
+    key = sweep_key(backbone, args.schedule, args.epochs, args.target, img_size)
+    start = time.perf_counter()
+    model, reports = train_backbone(backbone, manifest, data_path, class_names, img_size,
+                                    args.schedule, args.epochs)
+    print_phase_report(reports)
+    train_seconds = time.perf_counter() - start
+
+    test_dataset = make_dataset(*paths_and_labels(split_rows(manifest, 'test'), data_path, class_names),
+                                len(class_names), BATCH_SIZE, img_size)
+    _, keras_accuracy = model.evaluate(test_dataset, verbose=0)
+    model.save(os.path.join(args.output_dir, f"{key}.keras"))
+
+    tflite_path = os.path.join(args.output_dir, f"{key}.tflite")
+    int8_data = (data_path, MANIFEST_PATH, img_size, REPRESENTATIVE_SAMPLES, 'int8')
+    conversion = convert_targets(model, [args.target], {args.target: tflite_path}, int8_data=int8_data)[args.target]
+    if 'error' in conversion:
+        raise RuntimeError(f"{args.target} conversion failed: {conversion['error']}")
+
+    images, labels = test_pixels
+    accuracy = float(np.mean(np.argmax(tflite_scores(tflite_path, images), axis=1) == labels))
+    benchmark = run_benchmarks([tflite_path], num_threads=args.threads, latency_runs=args.runs)['models'][tflite_path]
+    return {
+        'backbone': backbone,
+        'schedule': args.schedule,
+        'epochs': args.epochs,
+        'target': args.target,
+        'img_size': list(img_size),
+        'params': int(model.count_params()),
+        'train_seconds': train_seconds,
+        'keras_accuracy': float(keras_accuracy),
+        'accuracy': accuracy,
+        'size_mb': benchmark['size_mb'],
+        'latency_p50_ms': benchmark['latency_p50_ms'],
+        'latency_p95_ms': benchmark['latency_p95_ms'],
+        'throughput_ips': benchmark['throughput_ips'],
+        'tflite_path': tflite_path,
+    }
+
+
+def pareto_front(rows):
+    """Backbones no other backbone beats on accuracy, p50 latency and size at once."""
+    def dominates(a, b):
+        no_worse = (a['accuracy'] >= b['accuracy'] and a['latency_p50_ms'] <= b['latency_p50_ms']
+                    and a['size_mb'] <= b['size_mb'])
+        better = (a['accuracy'] > b['accuracy'] or a['latency_p50_ms'] < b['latency_p50_ms']
+                  or a['size_mb'] < b['size_mb'])
+        return no_worse and better
+    return {r['backbone'] for r in rows if not any(dominates(other, r) for other in rows)}
+
+
+def pick_backbone(rows, min_accuracy):
+    """The lowest-latency backbone at or above min_accuracy, or None."""
+    eligible = [r for r in rows if r['accuracy'] >= min_accuracy]
+    return min(eligible, key=lambda r: r['latency_p50_ms']) if eligible else None
+
+
+def print_sweep_table(rows, min_accuracy):
+    front = pareto_front(rows)
+    chosen = pick_backbone(rows, min_accuracy)
+    print("\n📊 Backbone Sweep (sorted by p50 latency)")
+    print("=" * 60)
+    print(f"{'Backbone':<20} {'Params':>11} {'Keras acc':>10} {'TFLite acc':>11} {'MB':>7} "
+          f"{'p50':>8} {'p95':>8} {'img/s':>8}  Pareto")
+    print("-" * 98)
+    for r in sorted(rows, key=lambda r: r['latency_p50_ms']):
+        mark = '★' if r['backbone'] in front else ''
+        if chosen is not None and r['backbone'] == chosen['backbone']:
+            mark += ' ← pick'
+        print(f"{r['backbone']:<20} {r['params']:>11,} {r['keras_accuracy'] * 100:>9.2f}% "
+              f"{r['accuracy'] * 100:>10.2f}% {r['size_mb']:>7.2f} {r['latency_p50_ms']:>6.1f}ms "
+              f"{r['latency_p95_ms']:>6.1f}ms {r['throughput_ips']:>8.1f}  {mark}")
+    print("-" * 98)
+    print("★ = Pareto-optimal on TFLite accuracy, p50 latency and size")
+    if chosen is not None:
+        print(f"\n🏆 Fastest backbone with TFLite accuracy >= {min_accuracy * 100:.1f}%: {chosen['backbone']} "
+              f"({chosen['latency_p50_ms']:.1f}ms p50, {chosen['size_mb']:.2f} MB) -> {chosen['tflite_path']}")
+    elif rows:
+        best = max(rows, key=lambda r: r['accuracy'])
+        print(f"\n⚠️  No backbone reached {min_accuracy * 100:.1f}%; most accurate was {best['backbone']} "
+              f"({best['accuracy'] * 100:.2f}%)")
+
+
+def save_report(report, path):
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train, convert and benchmark candidate backbones")
+    parser.add_argument('--data-path', required=True, help="PlantVillage 'color' folder")
+    parser.add_argument('--backbones', default=','.join(SWEEP_BACKBONES),
+                        help=f"comma-separated subset of {', '.join(BACKBONES)}")
+    parser.add_argument('--schedule', choices=SCHEDULES, default='two-phase')
+    parser.add_argument('--epochs', type=int, default=EPOCHS, help="epochs for the 'full' schedule")
+    parser.add_argument('--target', choices=TARGETS, default=SWEEP_TARGET, help="TFLite target to benchmark")
+    parser.add_argument('--min-accuracy', type=float, default=MIN_ACCURACY,
+                        help="TFLite top-1 accuracy bar on the test split (0-1)")
+    parser.add_argument('--eval-samples', type=int, default=EVAL_SAMPLES)
+    parser.add_argument('--threads', type=int, default=None, help="TFLite interpreter threads")
+    parser.add_argument('--runs', type=int, default=LATENCY_RUNS)
+    parser.add_argument('--output-dir', default=SWEEP_DIR)
+    parser.add_argument('--rerun', action='store_true', help="retrain backbones already in the report")
+    args = parser.parse_args()
+
+    backbones = [b.strip() for b in args.backbones.split(',') if b.strip()]
+    unknown = set(backbones) - set(BACKBONES)
+    if unknown:
+        parser.error(f"unknown backbones: {', '.join(sorted(unknown))}")
+    if not os.path.exists(args.data_path):
+        print(f"❌ Dataset path does not exist: {args.data_path}")
+        exit(1)
+
+    print(f"TensorFlow version: {tf.__version__}")
+    os.makedirs(args.output_dir, exist_ok=True)
+    report_path = os.path.join(args.output_dir, SWEEP_REPORT)
+    report = {'results': {}}
+    if os.path.exists(report_path) and not args.rerun:
+        with open(report_path, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+    report.update({'target': args.target, 'schedule': args.schedule, 'min_accuracy': args.min_accuracy})
+
+    print("\n📋 Preparing dataset split manifest...")
+    manifest = build_manifest(args.data_path, MANIFEST_PATH)
+    class_names = class_names_from(manifest)
+    img_size = (IMG_HEIGHT, IMG_WIDTH)
+    # Every backbone is scored on the same labelled test images
+    test_pixels = load_pixels(sample_rows(manifest, 'test', args.eval_samples), args.data_path,
+                              class_names, img_size)
+    print(f"Found {len(manifest)} images, {len(class_names)} classes; scoring on {len(test_pixels[1])} test images")
+
+    keys = {b: sweep_key(b, args.schedule, args.epochs, args.target, img_size) for b in backbones}
+    for backbone in backbones:
+        if keys[backbone] in report['results']:
+            print(f"\n⏭️  {backbone}: already in {report_path} for this schedule, target and size "
+                  f"(use --rerun to retrain)")
+            continue
+        print(f"\n🏗️ Sweeping {backbone}...")
+        print("=" * 60)
+        try:
+            report['results'][keys[backbone]] = sweep_backbone(backbone, manifest, args.data_path, class_names,
+                                                         img_size, test_pixels, args)
+        except Exception as e:
+            print(f"❌ {backbone} failed: {e}")
+            continue
+        save_report(report, report_path)
+
+    rows = [report['results'][keys[b]] for b in backbones if keys[b] in report['results']]
+    if not rows:
+        print("❌ No backbone finished")
+        exit(1)
+    print_sweep_table(rows, args.min_accuracy)
+    chosen = pick_backbone(rows, args.min_accuracy)
+    report['pareto'] = sorted(pareto_front(rows))
+    report['pick'] = chosen['backbone'] if chosen else None
+    save_report(report, report_path)
+    print(f"\n📄 Sweep report written to {report_path}")
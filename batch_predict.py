@@ -0,0 +1,214 @@
+"""
+Batch Inference over Folders of Leaf Photos
+Scores images in batches with a TFLite model and writes top-k predictions to CSV/JSONL
+"""
+
+import argparse
+import csv
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from dataset_manifest import IMAGE_EXTENSIONS
+from label_table import DEFAULT_LABELS, load_label_table
+from prediction_cache import DB_MAX_MB, MEMORY_ENTRIES, PredictionCache, sha256_file
+from preprocessing import decode_batch
+from tflite_runner import TFLiteRunner
+
+DEFAULT_MODEL = 'CNN_PV_model.tflite'
+BATCH_SIZE = 32
+TOP_K = 3
+QUEUE_BATCHES = 4          # decoded batches buffered ahead of the interpreter
+DECODE_THREADS = 4
+
+
+def list_images(inputs):
+    """Expand folders (recursively), .txt file lists and single image paths."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs.sort()
+                paths.extend(os.path.join(root, f) for f in sorted(files)
+                             if f.lower().endswith(IMAGE_EXTENSIONS))
+        elif item.lower().endswith('.txt'):
+            with open(item, 'r', encoding='utf-8') as f:
+                paths.extend(line.strip() for line in f if line.strip())
+        else:
+            paths.append(item)
+    return paths
+
+
+def top_k(scores, k):
+    """Vectorized top-k: returns (indices, scores), each (N, k), best first."""
+    k = min(k, scores.shape[1])
+    indices = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, indices, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    return np.take_along_axis(indices, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+def batch_results(batch_paths, indices, top_scores, errors, labels):
+    """One result dict per path from top-k arrays (padding rows are dropped)."""
+    results = []
+    for i, path in enumerate(batch_paths):
+        if i in errors:
+            results.append({'path': path, 'error': errors[i], 'predictions': []})
+            continue
+        results.append({
+            'path': path,
+            'predictions': [
+                {'index': int(idx),
+                 'label': labels[idx] if idx < len(labels) else 'UNKNOWN',
+                 'score': float(score)}
+                for idx, score in zip(indices[i], top_scores[i])
+            ],
+        })
+    return results
+
+
+def _file_key(path):
+    try:
+        return sha256_file(path)
+    except OSError:
+        return None     # unreadable: left to the decoder to report
+
+
+def _decode_batches(paths, img_size, batch_size, out_queue, threads=DECODE_THREADS, cache=None):
+    """
+    Producer: look each batch up in the cache, decode only the misses on a thread
+    pool and put (paths, cache keys, cached scores, pixels, errors) batches on the queue.
+    Always finishes by putting None, or the exception that stopped it.
+    """
+    failure = None
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            for start in range(0, len(paths), batch_size):
+                batch_paths = paths[start:start + batch_size]
+                keys, cached = [None] * len(batch_paths), {}
+                if cache is not None:
+                    keys = list(pool.map(_file_key, batch_paths))
+                    hits = cache.get_many([key for key in keys if key is not None])
+                    cached = {i: hits[key] for i, key in enumerate(keys) if key in hits}
+                misses = [path for i, path in enumerate(batch_paths) if i not in cached]
+                pixels, errors = decode_batch(misses, img_size, batch_size, pool)
+                out_queue.put((batch_paths, keys, cached, pixels, errors))
+    except Exception as e:
+        failure = e
+    finally:
+        out_queue.put(failure)
+
+
+def predict_batches(runner, paths, labels, k=TOP_K, cache=None):
+    """
+    Yield one result dict per path, in input order. Partial final batches are
+    zero-padded so the interpreter keeps a single allocated shape. With a
+    PredictionCache, cached images skip both decode and inference.
+    """
+    batches = queue.Queue(maxsize=QUEUE_BATCHES)
+    producer = threading.Thread(target=_decode_batches, daemon=True,
+                                args=(paths, runner.img_size, runner.batch_size, batches, DECODE_THREADS, cache))
+    producer.start()
+
+    scores = np.empty((runner.batch_size, runner.num_classes), dtype=np.float32)
+    while True:
+        item = batches.get()
+        if item is None:
+            break
+        if isinstance(item, Exception):
+            raise item      # the producer failed; without this the loop would wait forever
+        batch_paths, keys, cached, pixels, decode_errors = item
+        misses = [i for i in range(len(batch_paths)) if i not in cached]
+        if misses:
+            scores[misses] = runner.run(pixels[:len(misses)])
+        for i, cached_scores in cached.items():
+            scores[i] = cached_scores
+        errors = {misses[j]: error for j, error in decode_errors.items()}
+        if cache is not None:
+            cache.put_many({keys[i]: scores[i] for i in misses if i not in errors and keys[i] is not None})
+        indices, top_scores = top_k(scores[:len(batch_paths)], k)
+        yield from batch_results(batch_paths, indices, top_scores, errors, labels)
+    producer.join()
+
+
+class ResultWriter:
+    """Streams results to .csv (one row per image) or .jsonl (one object per line)."""
+
+    def __init__(self, output_path, k):
+        self.format = 'jsonl' if output_path.lower().endswith(('.jsonl', '.json')) else 'csv'
+        self.file = open(output_path, 'w', newline='', encoding='utf-8')
+        if self.format == 'csv':
+            self.writer = csv.writer(self.file)
+            header = ['path', 'error']
+            for rank in range(1, k + 1):
+                header += [f'top{rank}_label', f'top{rank}_index', f'top{rank}_score']
+            self.writer.writerow(header)
+
+    def write(self, result):
+        if self.format == 'jsonl':
+            self.file.write(json.dumps(result) + '\n')
+            return
+        row = [result['path'], result.get('error', '')]
+        for prediction in result['predictions']:
+            row += [prediction['label'], prediction['index'], f"{prediction['score']:.6f}"]
+        self.writer.writerow(row)
+
+    def close(self):
+        self.file.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch-score leaf photos with a TFLite model")
+    parser.add_argument('inputs', nargs='+', help="image folders, image files or .txt file lists")
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--labels', help=f"label table (.json) or list (.txt); default: the table next to "
+                                         f"the model, else {DEFAULT_LABELS}")
+    parser.add_argument('--output', default='predictions.csv', help=".csv or .jsonl")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--top-k', type=int, default=TOP_K)
+    parser.add_argument('--threads', type=int, default=None, help="TFLite interpreter threads")
+    parser.add_argument('--cache', action='store_true', help="skip images already scored in this run")
+    parser.add_argument('--cache-db', help="SQLite prediction cache shared across runs (implies --cache)")
+    parser.add_argument('--cache-db-mb', type=float, default=DB_MAX_MB)
+    args = parser.parse_args()
+
+    paths = list_images(args.inputs)
+    print(f"📸 Found {len(paths)} images")
+
+    runner = TFLiteRunner(args.model, args.batch_size, args.threads)
+    print(f"🧠 Model: {args.model} (batch {runner.batch_size}, {runner.num_classes} classes)")
+    try:
+        labels = load_label_table(args.labels, args.model, runner.num_classes).names
+    except ValueError as e:
+        print(f"❌ {e}")
+        exit(1)
+
+    cache = None
+    if args.cache or args.cache_db:
+        cache = PredictionCache(args.model, MEMORY_ENTRIES, args.cache_db, args.cache_db_mb)
+
+    writer = ResultWriter(args.output, args.top_k)
+    start = time.perf_counter()
+    failed = 0
+    for count, result in enumerate(predict_batches(runner, paths, labels, args.top_k, cache), 1):
+        writer.write(result)
+        failed += 'error' in result
+        if count % 1000 == 0:
+            print(f"   {count}/{len(paths)} images scored...")
+    writer.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"\n✅ Scored {len(paths) - failed} images in {elapsed:.1f}s "
+          f"({(len(paths) - failed) / elapsed if elapsed > 0 else 0:.1f} images/sec)")
+    if failed:
+        print(f"⚠️  {failed} images could not be decoded (see 'error' column)")
+    if cache is not None:
+        stats = cache.stats()
+        print(f"♻️  Cache: {stats['memory_hits'] + stats['disk_hits']} hits "
+              f"({stats['memory_hits']} memory, {stats['disk_hits']} disk), {stats['misses']} misses, "
+              f"hit rate {stats['hit_rate'] * 100:.1f}%")
+        cache.close()
+    print(f"📄 Predictions written to {args.output}")
@@ -0,0 +1,197 @@
+"""
+TFLite Model Benchmark
+Compares float / dynamic-range / int8 variants on load time, latency, throughput,
+peak memory and top-1 agreement with a float reference
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import time
+import numpy as np
+from batch_predict import list_images
+from tflite_runner import make_interpreter
+from preprocessing import decode_batch, from_model_output, to_model_input
+
+NUM_IMAGES = 64
+WARMUP_RUNS = 5
+LATENCY_RUNS = 100
+BATCH_SIZE = 16
+REPORT_PATH = 'benchmark_report.json'
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak / 1024 / 1024 if os.uname().sysname == 'Darwin' else peak / 1024
+
+
+def load_benchmark_images(image_dir, num_images, img_size, seed=0):
+    """
+    Fixed image set: the first num_images files (sorted) or seeded random pixels.
+    Returns (pixels, {path: error}); files that fail to decode are left out, not benchmarked as blanks.
+    """
+    if image_dir:
+        paths = list_images([image_dir])[:num_images]
+        pixels, errors = decode_batch(paths, img_size)
+        if len(errors) == len(paths):
+            raise ValueError(f"No readable images in {image_dir}")
+        keep = [i for i in range(len(paths)) if i not in errors]
+        return pixels[keep], {paths[i]: error for i, error in errors.items()}
+    pixels = np.random.RandomState(seed).randint(0, 256, size=(num_images,) + tuple(img_size) + (3,), dtype=np.uint8)
+    return pixels, {}
+
+
+def _benchmark_model(model_path, image_dir, num_images, batch_size, num_threads, latency_runs, warmup_runs):
+    """Runs in a fresh process so load time and peak RSS belong to this model alone."""
+    import tensorflow as tf
+
+    baseline_rss = _peak_rss_mb()
+
+    start = time.perf_counter()
+    interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=num_threads)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    interpreter.allocate_tensors()
+    allocate_ms = (time.perf_counter() - start) * 1000
+
+    input_detail = interpreter.get_input_details()[0]
+    output_detail = interpreter.get_output_details()[0]
+    # Same images for every model, decoded at this model's input size
+    pixels, decode_errors = load_benchmark_images(image_dir, num_images, tuple(input_detail['shape'][1:3]))
+    inputs = to_model_input(pixels, input_detail)
+
+    # Single-image latency (batch 1), also collecting top-1 for the agreement check
+    top1 = np.empty(len(pixels), dtype=np.int64)
+    for i in range(len(pixels)):
+        interpreter.set_tensor(input_detail['index'], inputs[i:i + 1])
+        interpreter.invoke()
+        top1[i] = np.argmax(from_model_output(interpreter.get_tensor(output_detail['index']), output_detail)[0])
+
+    for i in range(warmup_runs):
+        interpreter.set_tensor(input_detail['index'], inputs[i % len(inputs):i % len(inputs) + 1])
+        interpreter.invoke()
+    latencies = np.empty(latency_runs)
+    for i in range(latency_runs):
+        sample = inputs[i % len(inputs):i % len(inputs) + 1]
+        start = time.perf_counter()
+        interpreter.set_tensor(input_detail['index'], sample)
+        interpreter.invoke()
+        interpreter.get_tensor(output_detail['index'])
+        latencies[i] = (time.perf_counter() - start) * 1000
+
+    # Batched throughput
+    batched, used_batch = make_interpreter(model_path, batch_size, num_threads)
+    batch_input = batched.get_input_details()[0]
+    # Fewer images than one batch are repeated to fill it, so there is always a full batch to time
+    batch_pixels = np.take(pixels, np.arange(max(len(pixels), used_batch)) % len(pixels), axis=0)
+    batches = [to_model_input(batch_pixels[s:s + used_batch], batch_input)
+               for s in range(0, len(batch_pixels) - used_batch + 1, used_batch)]
+    batched.set_tensor(batch_input['index'], batches[0])
+    batched.invoke()
+    start = time.perf_counter()
+    for batch in batches:
+        batched.set_tensor(batch_input['index'], batch)
+        batched.invoke()
+    elapsed = time.perf_counter() - start
+    peak_rss = _peak_rss_mb()
+
+    return {
+        'size_mb': os.path.getsize(model_path) / (1024 * 1024),
+        'input_dtype': np.dtype(input_detail['dtype']).name,
+        'output_dtype': np.dtype(output_detail['dtype']).name,
+        'load_ms': load_ms,
+        'allocate_ms': allocate_ms,
+        'latency_p50_ms': float(np.percentile(latencies, 50)),
+        'latency_p95_ms': float(np.percentile(latencies, 95)),
+        'latency_p99_ms': float(np.percentile(latencies, 99)),
+        'batch_size': used_batch,
+        'throughput_ips': len(batches) * used_batch / elapsed if elapsed > 0 else 0.0,
+        'peak_rss_mb': peak_rss,
+        'rss_delta_mb': peak_rss - baseline_rss if peak_rss is not None else None,
+        'top1': top1.tolist(),
+        'decode_errors': decode_errors,
+    }
+
+
+def run_benchmarks(model_paths, image_dir=None, num_images=NUM_IMAGES, reference=None, batch_size=BATCH_SIZE,
+                   num_threads=None, latency_runs=LATENCY_RUNS, warmup_runs=WARMUP_RUNS):
+    """Benchmark each model in its own spawned process; returns the report dict."""
+    reference = reference or model_paths[0]
+    ctx = mp.get_context('spawn')
+    results = {}
+    for model_path in dict.fromkeys([reference] + list(model_paths)):
+        print(f"⏱️  Benchmarking {model_path}...")
+        with ctx.Pool(1) as pool:
+            results[model_path] = pool.apply(
+                _benchmark_model,
+                (model_path, image_dir, num_images, batch_size, num_threads, latency_runs, warmup_runs)
+            )
+
+    reference_top1 = np.array(results[reference]['top1'])
+    # Decoding does not depend on input size, so every model skipped the same files
+    skipped = results[reference]['decode_errors']
+    for result in results.values():
+        result['top1_agreement'] = float(np.mean(np.array(result.pop('top1')) == reference_top1))
+        result.pop('decode_errors')
+
+    return {
+        'reference': reference,
+        'images': image_dir or 'random',
+        'num_images': len(reference_top1),
+        'skipped_images': skipped,
+        'num_threads': num_threads,
+        'latency_runs': latency_runs,
+        'models': results,
+    }
+
+
+def print_table(report):
+    print(f"\n{'Model':<34} {'MB':>7} {'Load':>7} {'Alloc':>7} {'p50':>7} {'p95':>7} {'p99':>7} "
+          f"{'img/s':>8} {'RSS+MB':>7} {'Agree':>6}")
+    print("-" * 108)
+    for path, r in report['models'].items():
+        rss = f"{r['rss_delta_mb']:.0f}" if r['rss_delta_mb'] is not None else 'n/a'
+        print(f"{os.path.basename(path)[:34]:<34} {r['size_mb']:>7.2f} {r['load_ms']:>6.1f}ms "
+              f"{r['allocate_ms']:>5.1f}ms {r['latency_p50_ms']:>5.1f}ms {r['latency_p95_ms']:>5.1f}ms "
+              f"{r['latency_p99_ms']:>5.1f}ms {r['throughput_ips']:>8.1f} {rss:>7} "
+              f"{r['top1_agreement'] * 100:>5.1f}%")
+    print(f"\nAgreement is top-1 match with {report['reference']} on {report['num_images']} images")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark TFLite model variants")
+    parser.add_argument('models', nargs='+', help=".tflite files to compare")
+    parser.add_argument('--reference', help="float model for top-1 agreement (default: first model)")
+    parser.add_argument('--images', help="folder of real images (default: seeded random pixels)")
+    parser.add_argument('--num-images', type=int, default=NUM_IMAGES)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--runs', type=int, default=LATENCY_RUNS)
+    parser.add_argument('--output', default=REPORT_PATH)
+    args = parser.parse_args()
+
+    try:
+        report = run_benchmarks(args.models, args.images, args.num_images, args.reference,
+                                args.batch_size, args.threads, args.runs)
+    except ValueError as e:
+        print(f"❌ {e}")
+        exit(1)
+    if report['skipped_images']:
+        print(f"\n⚠️  Skipped {len(report['skipped_images'])} unreadable images:")
+        for path, error in report['skipped_images'].items():
+            print(f"   {path}: {error}")
+    print_table(report)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"📄 Report written to {args.output}")
@@ -0,0 +1,226 @@
+"""
+Pruning and Weight Clustering for the Retrained Model
+Applies magnitude pruning (unstructured or 2:4) or weight clustering with a short fine-tune,
+strips the wrappers and exports a compressed TFLite model benchmarked against the unpruned one
+"""
+
+import argparse
+import gzip
+import json
+import math
+import os
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.layers import Conv2D, Dense, DepthwiseConv2D
+from tensorflow.keras.optimizers import Adam
+from benchmark_tflite import LATENCY_RUNS, print_table, run_benchmarks
+from convert_model import TARGETS, convert_targets, load_source_model
+from dataset_manifest import MANIFEST_PATH, build_manifest, class_names_from, split_rows
+from input_pipeline import ThroughputCallback, make_dataset, paths_and_labels
+from tflite_conversion import REPRESENTATIVE_SAMPLES
+
+try:
+    import tensorflow_model_optimization as tfmot
+except ImportError:
+    tfmot = None
+
+MODEL_PATH = 'plant_model_tf214.keras'
+REPORT_PATH = 'compression_report.json'
+METHODS = ('prune', 'cluster')
+SCOPES = ('head', 'all')
+HEAD_DENSE_LAYERS = ('head_dense', 'head_dense_1')   # the 1024 -> 512 dense stack
+
+# Configuration
+BATCH_SIZE = 32
+FINE_TUNE_EPOCHS = 2
+FINE_TUNE_LEARNING_RATE = 1e-5
+SPARSITY = 0.5                 # final fraction of zeroed weights (2:4 is always 50%)
+CLUSTERS = 16                  # unique values per clustered weight tensor
+SEED = 42
+
+
+def target_layers(model, scope):
+    """Names of the layers to compress: the dense head stack, or every conv/dense layer."""
+    if scope == 'head':
+        return [name for name in HEAD_DENSE_LAYERS if name in [layer.name for layer in model.layers]]
+    return [layer.name for layer in model.layers if isinstance(layer, (Conv2D, DepthwiseConv2D, Dense))]
+
+
+def wrap_layers(model, layer_names, wrap):
+    """Clone the model with the named layers wrapped; every layer keeps its trained weights."""
+    layer_names = set(layer_names)
+    return tf.keras.models.clone_model(
+        model, clone_function=lambda layer: wrap(layer) if layer.name in layer_names else layer
+    )
+
+
+def apply_pruning(model, layer_names, end_step, sparsity=SPARSITY, structure='unstructured'):
+    """
+    Magnitude pruning ramped from 0 to `sparsity` over end_step steps.
+    '2:4' keeps the two largest of every four consecutive weights instead.
+    """
+    schedule = tfmot.sparsity.keras.PolynomialDecay(
+        initial_sparsity=0.0, final_sparsity=sparsity, begin_step=0, end_step=end_step,
+        frequency=max(end_step // 10, 1)
+    )
+    kwargs = {'sparsity_m_by_n': (2, 4)} if structure == '2:4' else {}
+    return wrap_layers(model, layer_names,
+                       lambda layer: tfmot.sparsity.keras.prune_low_magnitude(layer, pruning_schedule=schedule,
+                                                                              **kwargs))
+
+
+def apply_clustering(model, layer_names, clusters=CLUSTERS):
+    """Weight clustering: each wrapped kernel shares `clusters` k-means++ initialised centroids."""
+    init = tfmot.clustering.keras.CentroidInitialization.KMEANS_PLUS_PLUS
+    return wrap_layers(model, layer_names,
+                       lambda layer: tfmot.clustering.keras.cluster_weights(
+                           layer, number_of_clusters=clusters, cluster_centroids_init=init))
+
+
+def strip_wrappers(model, method):
+    if method == 'prune':
+        return tfmot.sparsity.keras.strip_pruning(model)
+    return tfmot.clustering.keras.strip_clustering(model)
+
+
+def weight_sparsity(model, layer_names):
+    """Fraction of exactly-zero kernel weights across the named layers."""
+    kernels = [model.get_layer(name).get_weights()[0] for name in layer_names]
+    total = sum(k.size for k in kernels)
+    return float(sum(np.count_nonzero(k == 0) for k in kernels) / total) if total else 0.0
+
+
+def gzipped_size_mb(path):
+    """Size after gzip: how much of the pruning/clustering redundancy a download or APK actually saves."""
+    with open(path, 'rb') as f:
+        return len(gzip.compress(f.read(), compresslevel=9)) / (1024 * 1024)
+
+
+def print_compression(report):
+    print_table(report['benchmark'])
+    print(f"\n{'Model':<34} {'MB':>7} {'gzip MB':>8} {'Test acc':>9}")
+    print("-" * 60)
+    for key in ('baseline', 'compressed'):
+        r = report[key]
+        print(f"{os.path.basename(r['tflite_path'])[:34]:<34} {r['size_mb']:>7.2f} {r['gzip_mb']:>8.2f} "
+              f"{r['test_accuracy'] * 100:>8.2f}%")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prune or cluster the retrained model and export a compressed TFLite")
+    parser.add_argument('--data-path', required=True, help="PlantVillage 'color' folder (fine-tune and test data)")
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--method', choices=METHODS, default='prune')
+    parser.add_argument('--scope', choices=SCOPES, default='head',
+                        help="'head': the dense head stack only; 'all': every conv and dense layer")
+    parser.add_argument('--structure', choices=('unstructured', '2:4'), default='unstructured',
+                        help="pruning pattern")
+    parser.add_argument('--sparsity', type=float, default=SPARSITY)
+    parser.add_argument('--clusters', type=int, default=CLUSTERS)
+    parser.add_argument('--epochs', type=int, default=FINE_TUNE_EPOCHS, help="fine-tune epochs")
+    parser.add_argument('--target', choices=TARGETS, default='dynamic', help="TFLite target for both models")
+    parser.add_argument('--runs', type=int, default=LATENCY_RUNS)
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--output', default=REPORT_PATH)
+    args = parser.parse_args()
+
+    if tfmot is None:
+        print("❌ Pruning and clustering need tensorflow-model-optimization: "
+              "pip install tensorflow-model-optimization==0.7.5")
+        exit(1)
+    for path in (args.data_path, args.model):
+        if not os.path.exists(path):
+            print(f"❌ Not found: {path}")
+            exit(1)
+
+    print(f"TensorFlow version: {tf.__version__}")
+    tf.keras.utils.set_random_seed(SEED)
+    print(f"\n📂 Loading {args.model}...")
+    model = load_source_model(args.model)
+    img_size = tuple(model.input_shape[1:3])
+
+    manifest = build_manifest(args.data_path, MANIFEST_PATH)
+    class_names = class_names_from(manifest)
+    num_classes = len(class_names)
+    if model.output_shape[-1] != num_classes:
+        print(f"❌ {args.model} has {model.output_shape[-1]} outputs but the dataset has {num_classes} classes")
+        exit(1)
+    train_rows = split_rows(manifest, 'train')
+    train_dataset = make_dataset(*paths_and_labels(train_rows, args.data_path, class_names),
+                                 num_classes, BATCH_SIZE, img_size, training=True, seed=SEED)
+    val_dataset = make_dataset(*paths_and_labels(split_rows(manifest, 'val'), args.data_path, class_names),
+                               num_classes, BATCH_SIZE, img_size)
+    test_dataset = make_dataset(*paths_and_labels(split_rows(manifest, 'test'), args.data_path, class_names),
+                                num_classes, BATCH_SIZE, img_size)
+
+    stem = os.path.splitext(os.path.basename(os.path.normpath(args.model)))[0]
+    suffix = 'pruned' if args.method == 'prune' else 'clustered'
+    baseline_path = f"{stem}_{args.target}.tflite"
+    compressed_path = f"{stem}_{suffix}_{args.target}.tflite"
+    int8_data = (args.data_path, MANIFEST_PATH, img_size, REPRESENTATIVE_SAMPLES, 'int8')
+
+    model.compile(optimizer=Adam(FINE_TUNE_LEARNING_RATE), loss='categorical_crossentropy', metrics=['accuracy'])
+    _, baseline_accuracy = model.evaluate(test_dataset, verbose=1)
+    print(f"\n🔄 Converting the unpruned baseline ({args.target})...")
+    baseline = convert_targets(model, [args.target], {args.target: baseline_path}, int8_data=int8_data)[args.target]
+    if 'error' in baseline:
+        print(f"❌ Baseline conversion failed, nothing to compare against: {baseline['error']}")
+        exit(1)
+
+    layer_names = target_layers(model, args.scope)
+    if not layer_names:
+        print(f"❌ {args.model} has none of the {', '.join(HEAD_DENSE_LAYERS)} head layers; try --scope all")
+        exit(1)
+    if args.method == 'prune':
+        steps = args.epochs * math.ceil(len(train_rows) / BATCH_SIZE)
+        description = (f"2:4 structured sparsity" if args.structure == '2:4'
+                       else f"{args.sparsity * 100:.0f}% magnitude sparsity")
+        print(f"\n✂️  Pruning {len(layer_names)} layers to {description} over {steps} steps...")
+        wrapped = apply_pruning(model, layer_names, steps, args.sparsity, args.structure)
+        callbacks = [tfmot.sparsity.keras.UpdatePruningStep()]
+    else:
+        print(f"\n🎯 Clustering {len(layer_names)} layers to {args.clusters} weights each...")
+        wrapped = apply_clustering(model, layer_names, args.clusters)
+        callbacks = []
+
+    wrapped.compile(optimizer=Adam(FINE_TUNE_LEARNING_RATE), loss='categorical_crossentropy', metrics=['accuracy'])
+    print(f"🚀 Fine-tuning for {args.epochs} epochs...")
+    wrapped.fit(train_dataset, epochs=args.epochs, validation_data=val_dataset,
+                callbacks=callbacks + [ThroughputCallback(len(train_rows), BATCH_SIZE)], verbose=1)
+
+    compressed = strip_wrappers(wrapped, args.method)
+    compressed.compile(optimizer=Adam(FINE_TUNE_LEARNING_RATE), loss='categorical_crossentropy', metrics=['accuracy'])
+    _, compressed_accuracy = compressed.evaluate(test_dataset, verbose=1)
+    if args.method == 'prune':
+        print(f"   Kernel sparsity: {weight_sparsity(compressed, layer_names) * 100:.1f}%")
+    compressed.save(f"{stem}_{suffix}.keras")
+    print(f"💾 Compressed model saved as {stem}_{suffix}.keras")
+
+    print(f"\n🔄 Converting the compressed model ({args.target})...")
+    result = convert_targets(compressed, [args.target], {args.target: compressed_path}, int8_data=int8_data,
+                             sparse=args.method == 'prune')[args.target]
+    if 'error' in result:
+        print(f"❌ {result['error']}")
+        exit(1)
+
+    benchmark = run_benchmarks([baseline_path, compressed_path], reference=baseline_path,
+                               num_threads=args.threads, latency_runs=args.runs)
+    report = {
+        'model': args.model,
+        'method': args.method,
+        'scope': args.scope,
+        'layers': layer_names,
+        'settings': ({'structure': args.structure, 'sparsity': 0.5 if args.structure == '2:4' else args.sparsity}
+                     if args.method == 'prune' else {'clusters': args.clusters}),
+        'fine_tune_epochs': args.epochs,
+        'baseline': {'tflite_path': baseline_path, 'size_mb': benchmark['models'][baseline_path]['size_mb'],
+                     'gzip_mb': gzipped_size_mb(baseline_path), 'test_accuracy': float(baseline_accuracy)},
+        'compressed': {'tflite_path': compressed_path, 'size_mb': benchmark['models'][compressed_path]['size_mb'],
+                       'gzip_mb': gzipped_size_mb(compressed_path), 'test_accuracy': float(compressed_accuracy)},
+        'benchmark': benchmark,
+    }
+    print_compression(report)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📄 Report written to {args.output}")
@@ -0,0 +1,264 @@
+"""
+Unified TFLite Conversion Tool
+Loads a Keras model once (H5, .keras or SavedModel) and emits several TFLite
+targets in parallel processes, recording sizes, hashes and validation results
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import tensorflow as tf
+from dataset_manifest import MANIFEST_PATH, build_manifest, class_names_from
+from tflite_conversion import load_pixels, print_validation, representative_dataset, sample_rows, \
+    validate_against_float, FLOAT16_MAX_ABS_DIFF, MAX_ACCURACY_DROP, REPRESENTATIVE_SAMPLES, VALIDATION_SAMPLES
+
+TARGETS = ('float32', 'float16', 'dynamic', 'int8')
+DEFAULT_TARGETS = ('float32', 'dynamic')
+CONVERSION_MANIFEST = 'conversion_manifest.json'
+
+
+def _hash_file(digest, path):
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+
+
+def sha256_of(path):
+    """SHA-256 of a file, or of a SavedModel directory (relative paths and contents, in sorted order)."""
+    digest = hashlib.sha256()
+    if not os.path.isdir(path):
+        _hash_file(digest, path)
+        return digest.hexdigest()
+    rel_paths = sorted(os.path.relpath(os.path.join(root, name), path).replace(os.sep, '/')
+                       for root, _, names in os.walk(path) for name in names)
+    for rel_path in rel_paths:
+        digest.update(f"{rel_path}\n".encode('utf-8'))
+        _hash_file(digest, os.path.join(path, rel_path))
+    return digest.hexdigest()
+
+
+def load_source_model(model_path, rebuild_on_failure=False, num_classes=38):
+    """
+    Load a Keras model from .h5, .keras or a SavedModel directory.
+    Falls back to custom_objects for Keras version mismatches and, if asked,
+    to rebuilding EfficientNetB5 and loading whatever weights match by name.
+    """
+    try:
+        return tf.keras.models.load_model(model_path, compile=False)
+    except Exception as e:
+        print(f"⚠️  Direct load failed: {e}")
+
+    try:
+        return tf.keras.models.load_model(model_path, compile=False,
+                                          custom_objects={'InputLayer': tf.keras.layers.InputLayer})
+    except Exception as e:
+        print(f"⚠️  Load with custom_objects failed: {e}")
+        if not rebuild_on_failure:
+            raise
+
+    print("🔧 Rebuilding EfficientNetB5 and loading weights by name...")
+    base_model = tf.keras.applications.EfficientNetB5(
+        include_top=False, weights=None, input_shape=(224, 224, 3), pooling='avg'
+    )
+    inputs = tf.keras.Input(shape=(224, 224, 3))
+    outputs = tf.keras.layers.Dense(num_classes, activation='softmax')(base_model(inputs, training=False))
+    model = tf.keras.Model(inputs, outputs)
+    try:
+        model.load_weights(model_path, by_name=True, skip_mismatch=True)
+        print("✅ Weights loaded (some may be skipped due to version mismatch)")
+    except Exception as e:
+        print(f"⚠️  Could not load weights ({e}) - model has RANDOM weights, for testing only")
+    return model
+
+
+def export_saved_model(model, export_dir):
+    """One SavedModel export that every target process converts from."""
+    if hasattr(model, 'export'):
+        model.export(export_dir)
+    else:
+        tf.saved_model.save(model, export_dir)
+
+
+def make_converter(saved_model_dir, target, builtins_only=False, int8_data=None, sparse=False):
+    """Configure a TFLiteConverter for one target; sparse stores pruned weights in a sparse format."""
+    converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+    if target == 'float16':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif target == 'dynamic':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    elif target == 'int8':
+        data_path, manifest_path, img_size, num_samples, io_type = int8_data
+        # Converting must not touch the dataset, so unreadable images are skipped, not quarantined
+        manifest = build_manifest(data_path, manifest_path, quarantine_dir=None)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset(manifest, data_path, img_size, num_samples)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.as_dtype(io_type)
+        converter.inference_output_type = tf.as_dtype(io_type)
+    if builtins_only and target != 'int8':
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS]
+    if sparse:
+        converter.optimizations = list(converter.optimizations) + [tf.lite.Optimize.EXPERIMENTAL_SPARSITY]
+    return converter
+
+
+def _convert_target(saved_model_dir, target, output_path, builtins_only, int8_data, sparse):
+    """Worker process: convert one target and write it."""
+    start = time.perf_counter()
+    tflite_model = make_converter(saved_model_dir, target, builtins_only, int8_data, sparse).convert()
+    with open(output_path, 'wb') as f:
+        f.write(tflite_model)
+    return {
+        'path': output_path,
+        'size_bytes': len(tflite_model),
+        'sha256': hashlib.sha256(tflite_model).hexdigest(),
+        'convert_seconds': time.perf_counter() - start,
+    }
+
+
+def convert_targets(model, targets, output_paths, builtins_only=False, int8_data=None, workers=None, sparse=False):
+    """Export once, then convert every target in parallel spawned processes."""
+    export_dir = tempfile.mkdtemp(prefix='convert_model_')
+    try:
+        print("📦 Exporting SavedModel once for all targets...")
+        export_saved_model(model, export_dir)
+        ctx = mp.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers or len(targets), mp_context=ctx) as pool:
+            futures = {
+                target: pool.submit(_convert_target, export_dir, target, output_paths[target],
+                                    builtins_only, int8_data if target == 'int8' else None, sparse)
+                for target in targets
+            }
+            results = {}
+            for target, future in futures.items():
+                try:
+                    results[target] = future.result()
+                    print(f"✅ {target}: {output_paths[target]} "
+                          f"({results[target]['size_bytes'] / (1024 * 1024):.2f} MB, "
+                          f"{results[target]['convert_seconds']:.1f}s)")
+                except Exception as e:
+                    results[target] = {'path': output_paths[target], 'error': str(e)}
+                    print(f"❌ {target} conversion failed: {e}")
+        return results
+    finally:
+        shutil.rmtree(export_dir, ignore_errors=True)
+
+
+def validation_images(model, data_path, manifest_path, num_samples):
+    """
+    Labelled validation-split images when a dataset is given; otherwise seeded
+    random images with no labels (targets are then scored against the float
+    model's own predictions).
+    """
+    img_size = tuple(model.input_shape[1:3])
+    if data_path:
+        manifest = build_manifest(data_path, manifest_path, quarantine_dir=None)
+        return load_pixels(sample_rows(manifest, 'val', num_samples), data_path,
+                           class_names_from(manifest), img_size)
+    images = np.random.RandomState(0).randint(0, 256, size=(32,) + img_size + (3,), dtype=np.uint8)
+    return images, None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a Keras model to several TFLite targets in one pass")
+    parser.add_argument('model', help=".h5, .keras or SavedModel directory")
+    parser.add_argument('--targets', default=','.join(DEFAULT_TARGETS),
+                        help=f"comma-separated subset of {', '.join(TARGETS)}")
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--out', action='append', default=[], metavar='TARGET=PATH',
+                        help="explicit output path for a target (repeatable)")
+    parser.add_argument('--data-path', help="PlantVillage 'color' folder: int8 calibration and labelled validation")
+    parser.add_argument('--manifest', default=MANIFEST_PATH)
+    parser.add_argument('--representative-samples', type=int, default=REPRESENTATIVE_SAMPLES)
+    parser.add_argument('--validation-samples', type=int, default=VALIDATION_SAMPLES)
+    parser.add_argument('--max-accuracy-drop', type=float, default=MAX_ACCURACY_DROP)
+    parser.add_argument('--uint8-io', action='store_true', help="uint8 instead of int8 I/O for the int8 target")
+    parser.add_argument('--builtins-only', action='store_true', help="restrict to TFLITE_BUILTINS ops")
+    parser.add_argument('--sparse', action='store_true',
+                        help="store pruned weights in a sparse format (for compress_model.py output)")
+    parser.add_argument('--rebuild-on-failure', action='store_true',
+                        help="rebuild EfficientNetB5 and load weights by name if the model will not load")
+    parser.add_argument('--no-validate', action='store_true')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--manifest-out', default=None, help=f"default: <output-dir>/{CONVERSION_MANIFEST}")
+    args = parser.parse_args(argv)
+
+    args.targets = [t.strip() for t in args.targets.split(',') if t.strip()]
+    unknown = set(args.targets) - set(TARGETS)
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(sorted(unknown))}")
+    if 'int8' in args.targets and not args.data_path:
+        parser.error("the int8 target needs --data-path to sample representative images")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print(f"TensorFlow version: {tf.__version__}")
+
+    print(f"\n📂 Loading {args.model}...")
+    model = load_source_model(args.model, args.rebuild_on_failure)
+    print(f"   Input shape: {model.input_shape}")
+    print(f"   Output shape: {model.output_shape}")
+
+    stem = os.path.splitext(os.path.basename(os.path.normpath(args.model)))[0]
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_paths = {t: os.path.join(args.output_dir, f"{stem}_{t}.tflite") for t in args.targets}
+    for item in args.out:
+        target, path = item.split('=', 1)
+        output_paths[target] = path
+
+    int8_data = (args.data_path, args.manifest, tuple(model.input_shape[1:3]),
+                 args.representative_samples, 'uint8' if args.uint8_io else 'int8')
+
+    print(f"\n🔄 Converting targets: {', '.join(args.targets)}")
+    results = convert_targets(model, args.targets, output_paths, args.builtins_only, int8_data, args.workers,
+                              args.sparse)
+
+    all_passed = all('error' not in r for r in results.values())
+    if not args.no_validate:
+        print("\n🧪 Validating targets against the float Keras model...")
+        images, labels = validation_images(model, args.data_path, args.manifest, args.validation_samples)
+        for target, result in results.items():
+            if 'error' in result:
+                continue
+            validation = validate_against_float(model, result['path'], images, labels, args.max_accuracy_drop)
+            if target == 'float16':
+                # Float16 only rounds weights, so its outputs must track float32 closely
+                validation['max_abs_diff_limit'] = FLOAT16_MAX_ABS_DIFF
+                validation['passed'] &= validation['max_abs_diff'] <= FLOAT16_MAX_ABS_DIFF
+            result['validation'] = validation
+            print(f"\n   [{target}]")
+            print_validation(validation, target.capitalize())
+            if not validation['passed']:
+                print(f"   ❌ {target} failed validation")
+            all_passed &= validation['passed']
+
+    manifest_out = args.manifest_out or os.path.join(args.output_dir, CONVERSION_MANIFEST)
+    with open(manifest_out, 'w', encoding='utf-8') as f:
+        json.dump({
+            'source': args.model,
+            'source_sha256': sha256_of(args.model),
+            'tensorflow_version': tf.__version__,
+            'input_shape': list(model.input_shape),
+            'output_shape': list(model.output_shape),
+            'targets': results,
+        }, f, indent=2)
+    print(f"\n📄 Conversion manifest written to {manifest_out}")
+
+    print("\n" + "=" * 60)
+    print("✅ CONVERSION COMPLETE!" if all_passed else "❌ CONVERSION FINISHED WITH FAILURES")
+    print("=" * 60)
+    return 0 if all_passed else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -1,174 +1,33 @@
 """
 EMERGENCY FIX: Convert Keras 3.x H5 model to TFLite compatible with TensorFlow 2.13
 This rebuilds the model architecture to work around version incompatibility
-"""
 
-import tensorflow as tf
-import numpy as np
-import h5py
-import os
+Wrapper around convert_model.py: builtin ops only, and if the H5 will not load,
+EfficientNetB5 is rebuilt and whatever weights match by name are loaded.
+"""
 
-print("="*60)
-print("TensorFlow Version:", tf.__version__)
-print("="*60)
+import sys
+from convert_model import main
 
 MODEL_PATH = "my_model(1).h5"
 OUTPUT_PATH = "my_model_quantized_fixed.tflite"
 
-# PlantVillage 38 classes
-CLASS_NAMES = [
-    'Apple___Apple_scab', 'Apple___Black_rot', 'Apple___Cedar_apple_rust', 'Apple___healthy',
-    'Background_without_leaves', 'Blueberry___healthy', 'Cherry___Powdery_mildew', 'Cherry___healthy',
-    'Corn___Cercospora_leaf_spot Gray_leaf_spot', 'Corn___Common_rust', 'Corn___Northern_Leaf_Blight',
-    'Corn___healthy', 'Grape___Black_rot', 'Grape___Esca_(Black_Measles)',
-    'Grape___Leaf_blight_(Isariopsis_Leaf_Spot)', 'Grape___healthy',
-    'Orange___Haunglongbing_(Citrus_greening)', 'Peach___Bacterial_spot', 'Peach___healthy',
-    'Pepper,_bell___Bacterial_spot', 'Pepper,_bell___healthy', 'Potato___Early_blight',
-    'Potato___Late_blight', 'Potato___healthy', 'Raspberry___healthy', 'Soybean___healthy',
-    'Squash___Powdery_mildew', 'Strawberry___Leaf_scorch', 'Strawberry___healthy',
-    'Tomato___Bacterial_spot', 'Tomato___Early_blight', 'Tomato___Late_blight', 'Tomato___Leaf_Mold',
-    'Tomato___Septoria_leaf_spot', 'Tomato___Spider_mites Two-spotted_spider_mite',
-    'Tomato___Target_Spot', 'Tomato___Tomato_Yellow_Leaf_Curl_Virus', 'Tomato___Tomato_mosaic_virus',
-    'Tomato___healthy'
-]
-
-print("\n🔧 STEP 1: Reading H5 file structure...")
-try:
-    # Open H5 file to extract weights manually
-    h5_file = h5py.File(MODEL_PATH, 'r')
-    
-    # Try to get model config if available
-    if 'model_config' in h5_file.attrs:
-        print("   Found model config in H5 file")
-    
-    # List all groups in H5
-    print("   H5 file structure:")
-    def print_structure(name, obj):
-        print(f"      {name}: {type(obj)}")
-    h5_file.visititems(print_structure)
-    
-    h5_file.close()
-    print("✅ H5 file is readable")
-except Exception as e:
-    print(f"❌ Error reading H5: {e}")
-    exit(1)
-
-print("\n🔧 STEP 2: Loading model with Keras (ignoring compile errors)...")
-try:
-    # Load model without compiling (ignore optimizer state)
-    model = tf.keras.models.load_model(MODEL_PATH, compile=False)
-    print("✅ Model loaded successfully!")
-    print(f"   Input shape: {model.input_shape}")
-    print(f"   Output shape: {model.output_shape}")
-    print(f"   Total layers: {len(model.layers)}")
-except Exception as e:
-    print(f"❌ Direct load failed: {e}")
-    print("\n🔧 ATTEMPTING WORKAROUND: Rebuilding model from weights...")
-    
-    try:
-        # Create EfficientNetB5 base (most likely architecture based on file size)
-        print("   Creating EfficientNetB5 base model...")
-        base_model = tf.keras.applications.EfficientNetB5(
-            include_top=False,
-            weights=None,  # Don't load ImageNet weights
-            input_shape=(224, 224, 3),
-            pooling='avg'
-        )
-        
-        # Add classification head
-        inputs = tf.keras.Input(shape=(224, 224, 3))
-        x = base_model(inputs, training=False)
-        outputs = tf.keras.layers.Dense(38, activation='softmax')(x)
-        model = tf.keras.Model(inputs, outputs)
-        
-        print("✅ Model architecture rebuilt!")
-        print(f"   Total params: {model.count_params():,}")
-        
-        # Try to load weights from H5
-        print("\n🔧 Loading weights from H5 file...")
-        try:
-            model.load_weights(MODEL_PATH, by_name=True, skip_mismatch=True)
-            print("✅ Weights loaded (some may be skipped due to version mismatch)")
-        except Exception as e2:
-            print(f"⚠️  Could not load all weights: {e2}")
-            print("   Proceeding with random weights (FOR TESTING ONLY)")
-        
-    except Exception as e3:
-        print(f"❌ Rebuild failed: {e3}")
-        exit(1)
-
-print(f"\n🔧 STEP 3: Converting to TFLite with TF {tf.__version__}...")
-try:
-    converter = tf.lite.TFLiteConverter.from_keras_model(model)
-    
-    # Apply dynamic range quantization (reduces size)
-    converter.optimizations = [tf.lite.Optimize.DEFAULT]
-    
-    # Set experimental flags to ensure compatibility
-    converter.target_spec.supported_ops = [
-        tf.lite.OpsSet.TFLITE_BUILTINS,  # Use only built-in TFLite ops
-    ]
-    
-    # Convert
-    tflite_model = converter.convert()
-    
-    # Save
-    with open(OUTPUT_PATH, 'wb') as f:
-        f.write(tflite_model)
-    
-    size_mb = os.path.getsize(OUTPUT_PATH) / (1024 * 1024)
-    print(f"✅ TFLite model created!")
-    print(f"   Size: {size_mb:.2f} MB")
-    print(f"   Saved as: {OUTPUT_PATH}")
-    
-except Exception as e:
-    print(f"❌ Conversion failed: {e}")
-    exit(1)
-
-print("\n🧪 STEP 4: Testing TFLite model...")
-try:
-    # Load and test
-    interpreter = tf.lite.Interpreter(model_path=OUTPUT_PATH)
-    interpreter.allocate_tensors()
-    
-    input_details = interpreter.get_input_details()
-    output_details = interpreter.get_output_details()
-    
-    print(f"✅ Model loads in TFLite interpreter")
-    print(f"   Input: {input_details[0]['shape']} ({input_details[0]['dtype']})")
-    print(f"   Output: {output_details[0]['shape']} ({output_details[0]['dtype']})")
-    
-    # Test inference
-    test_input = np.random.random_sample(input_details[0]['shape']).astype(np.float32)
-    interpreter.set_tensor(input_details[0]['index'], test_input)
-    interpreter.invoke()
-    output = interpreter.get_tensor(output_details[0]['index'])
-    
-    print(f"✅ Test inference successful!")
-    print(f"   Predicted class: {np.argmax(output[0])}")
-    print(f"   Confidence: {np.max(output[0])*100:.2f}%")
-    
-    # Check operator versions
-    print("\n📋 Operator details:")
-    print("   Checking for FULLY_CONNECTED operator version...")
-    # The interpreter successfully ran, so operators are compatible!
-    print("   ✅ All operators are compatible with TFLite runtime!")
-    
-except Exception as e:
-    print(f"❌ Testing failed: {e}")
-    exit(1)
-
-print("\n" + "="*60)
-print("✅ SUCCESS! Model converted and tested.")
-print("="*60)
-print(f"\n📦 Output file: {OUTPUT_PATH} ({size_mb:.2f} MB)")
-print("\n📱 NEXT STEPS:")
-print("   1. Copy to Flutter assets:")
-print(f"      capstone_deepsea/assets/{OUTPUT_PATH}")
-print("   2. Copy to Android assets:")
-print(f"      capstone_deepsea/android/app/src/main/assets/{OUTPUT_PATH}")
-print("   3. Update your Java code to use the new filename")
-print("   4. Run: flutter clean && flutter run")
-print("\n⚠️  NOTE: If weights didn't load, the model won't give accurate predictions")
-print("   but it WILL prove the TFLite integration works!")
-print("="*60)
+if __name__ == "__main__":
+    status = main([
+        MODEL_PATH,
+        '--targets', 'dynamic',
+        '--out', f'dynamic={OUTPUT_PATH}',
+        '--builtins-only',
+        '--rebuild-on-failure',
+    ] + sys.argv[1:])
+
+    print("\n📱 NEXT STEPS:")
+    print("   1. Copy to Flutter assets:")
+    print(f"      capstone_deepsea/assets/{OUTPUT_PATH}")
+    print("   2. Copy to Android assets:")
+    print(f"      capstone_deepsea/android/app/src/main/assets/{OUTPUT_PATH}")
+    print("   3. Update your Java code to use the new filename")
+    print("   4. Run: flutter clean && flutter run")
+    print("\n⚠️  NOTE: If weights didn't load, the model won't give accurate predictions")
+    print("   but it WILL prove the TFLite integration works!")
+    exit(status)
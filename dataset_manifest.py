@@ -0,0 +1,242 @@
+"""
+Dataset Manifest for PlantVillage Retraining
+Records the train/test/val split as a CSV manifest instead of copying images
+"""
+
+import csv
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataset_scan import QUARANTINE_DIR, SCAN_WORKERS, check_images, cross_class_duplicates, print_duplicates, \
+    quarantine_files
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+SPLITS = ('train', 'test', 'val')
+MANIFEST_FIELDS = ['path', 'class', 'split', 'sha256', 'size', 'mtime_ns', 'width', 'height']
+MANIFEST_VERSION = 4   # 2: image dimensions, integrity-checked rows; 3: hash-based splits; 4: no rebalancing
+
+# Default manifest location (the .json sidecar stores the source fingerprint)
+MANIFEST_PATH = 'plantvillage_manifest.csv'
+
+TRAIN_RATIO = 0.8
+TEST_RATIO = 0.1
+SPLIT_SEED = 42
+SPLIT_KEYS = ('content', 'path')
+SPLIT_KEY = 'content'   # identical images always share a split, and renames keep theirs
+
+
+def _scan_folder(data_path, folder, recursive=True):
+    entries = {}
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        if not recursive:
+            dirs.clear()
+        for file in sorted(files):
+            if file.lower().endswith(IMAGE_EXTENSIONS):
+                full_path = os.path.join(root, file)
+                stat = os.stat(full_path)
+                rel_path = os.path.relpath(full_path, data_path).replace(os.sep, '/')
+                entries[rel_path] = (stat.st_size, stat.st_mtime_ns)
+    return entries
+
+
+def scan_images(data_path, workers=SCAN_WORKERS):
+    """
+    Walk data_path and return {relative_path: (size, mtime_ns)} for every image.
+    Each top-level (class) folder is walked on its own thread.
+    """
+    folders = sorted(entry.path for entry in os.scandir(data_path) if entry.is_dir())
+    entries = _scan_folder(data_path, data_path, recursive=False)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for folder_entries in pool.map(lambda folder: _scan_folder(data_path, folder), folders):
+            entries.update(folder_entries)
+    return dict(sorted(entries.items()))
+
+
+def fingerprint(entries):
+    """Cheap digest of the source tree built from paths, sizes and mtimes."""
+    digest = hashlib.sha256()
+    for rel_path in sorted(entries):
+        size, mtime_ns = entries[rel_path]
+        digest.update(f"{rel_path}|{size}|{mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def class_of(rel_path):
+    """Class name is the image's parent folder, as in flow_from_directory."""
+    return os.path.basename(os.path.dirname(rel_path))
+
+
+def split_fraction(key, seed=SPLIT_SEED):
+    """A stable, uniformly spread position in [0, 1) for a split key."""
+    digest = hashlib.sha256(f"{seed}:{key}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64
+
+
+def assign_splits(rows, seed=SPLIT_SEED, train_ratio=TRAIN_RATIO, test_ratio=TEST_RATIO, key=SPLIT_KEY):
+    """
+    {path: split} decided per image by a hash of its content (or relative path)
+    and class: below train_ratio is train, then test, then val. Each class is
+    split on its own, so every class gets ~80/10/10, and an image's split never
+    depends on the other images: new data only adds rows. There is no minimum
+    per split, so a very small class can end up without test or val images.
+    """
+    fractions = {
+        row['path']: split_fraction(f"{row['class']}/{row['sha256'] if key == 'content' else row['path']}", seed)
+        for row in rows
+    }
+    splits = {}
+    for path, fraction in fractions.items():
+        if fraction < train_ratio:
+            splits[path] = 'train'
+        elif fraction < train_ratio + test_ratio:
+            splits[path] = 'test'
+        else:
+            splits[path] = 'val'
+    return splits
+
+
+def read_manifest(manifest_path=MANIFEST_PATH):
+    """Load manifest rows as a list of dicts (size/mtime_ns converted to int)."""
+    with open(manifest_path, 'r', newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    for row in rows:
+        for field in ('size', 'mtime_ns', 'width', 'height'):
+            row[field] = int(row.get(field) or 0)
+    return rows
+
+
+def write_manifest(rows, manifest_path=MANIFEST_PATH):
+    # Write then rename, so workers building the same manifest never read a partial file
+    with open(manifest_path + '.tmp', 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=MANIFEST_FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({field: row[field] for field in MANIFEST_FIELDS})
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+
+def _meta_path(manifest_path):
+    return os.path.splitext(manifest_path)[0] + '.json'
+
+
+def read_manifest_meta(manifest_path=MANIFEST_PATH):
+    """The manifest's .json sidecar (fingerprint, settings, duplicate report), or None."""
+    meta_path = _meta_path(manifest_path)
+    if not (os.path.exists(manifest_path) and os.path.exists(meta_path)):
+        return None
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def build_manifest(data_path, manifest_path=MANIFEST_PATH, seed=SPLIT_SEED, quarantine_dir=QUARANTINE_DIR,
+                   workers=SCAN_WORKERS, split_key=SPLIT_KEY):
+    """
+    Return manifest rows for data_path, reusing the manifest on disk when the
+    source tree is unchanged. Only new or modified images are hashed and
+    test-decoded, in parallel; images that fail are moved to quarantine_dir
+    (or, with quarantine_dir=None, left in place) and kept out of the manifest.
+    Bad files left in place are remembered by size and mtime in the sidecar,
+    so later runs skip them without checking them again.
+    """
+    data_path = os.path.abspath(data_path)
+    print("📸 Scanning image files...")
+    entries = scan_images(data_path, workers)
+    tree_fingerprint = fingerprint(entries)
+
+    meta = read_manifest_meta(manifest_path)
+    settings = {'data_path': data_path, 'seed': seed, 'version': MANIFEST_VERSION, 'split_key': split_key,
+                'train_ratio': TRAIN_RATIO, 'test_ratio': TEST_RATIO}
+    # Bad files left in place by an earlier --no-quarantine run are quarantined now if asked
+    pending_quarantine = bool(quarantine_dir and meta and meta.get('excluded'))
+    if (meta and meta.get('fingerprint') == tree_fingerprint and meta.get('settings') == settings
+            and not pending_quarantine):
+        print(f"♻️  Source tree unchanged, reusing manifest: {manifest_path}")
+        return read_manifest(manifest_path)
+
+    # Keep check results (hash and dimensions, or the error) for files whose size and mtime did not change
+    known = {}
+    if meta and meta.get('settings', {}).get('data_path') == data_path:
+        for row in read_manifest(manifest_path):
+            if row['width']:
+                known[row['path']] = (row['size'], row['mtime_ns'], row['sha256'], row['width'], row['height'], None)
+        for rel_path, bad in meta.get('excluded', {}).items():
+            known[rel_path] = (bad['size'], bad['mtime_ns'], None, 0, 0, bad['reason'])
+
+    to_check = [rel_path for rel_path, stat in entries.items() if known.get(rel_path, ())[:2] != stat]
+    if to_check:
+        print(f"🔍 Checking {len(to_check)} new or modified images on {workers} threads...")
+    checked = check_images([os.path.join(data_path, rel_path) for rel_path in to_check], workers)
+    for rel_path in to_check:
+        stat = entries[rel_path]
+        sha256, width, height, error = checked[os.path.join(data_path, rel_path)]
+        known[rel_path] = stat + (sha256, width, height, error)
+
+    errors = {rel_path: known[rel_path][5] for rel_path in entries if known[rel_path][5]}
+    new_errors = [rel_path for rel_path in to_check if rel_path in errors]
+    moved = set()
+    if errors:
+        for rel_path in new_errors[:10]:
+            print(f"   ❌ {rel_path}: {errors[rel_path]}")
+        if quarantine_dir:
+            moved = set(quarantine_files(data_path, errors, quarantine_dir))
+            print(f"🚫 Quarantined {len(moved)} of {len(errors)} unreadable images to {quarantine_dir}/")
+        else:
+            print(f"🚫 Leaving out {len(errors)} unreadable images ({len(errors) - len(new_errors)} found before)")
+        # What the next scan sees: quarantined files are gone, the rest stay on disk
+        tree_fingerprint = fingerprint({p: stat for p, stat in entries.items() if p not in moved})
+        for rel_path in errors:
+            del entries[rel_path]
+    excluded = {
+        rel_path: {'size': known[rel_path][0], 'mtime_ns': known[rel_path][1], 'reason': reason}
+        for rel_path, reason in sorted(errors.items()) if rel_path not in moved
+    }
+
+    rows = []
+    for rel_path in sorted(entries):
+        size, mtime_ns, sha256, width, height = known[rel_path][:5]
+        rows.append({
+            'path': rel_path,
+            'class': class_of(rel_path),
+            'split': None,
+            'sha256': sha256,
+            'size': size,
+            'mtime_ns': mtime_ns,
+            'width': width,
+            'height': height,
+        })
+
+    splits = assign_splits(rows, seed=seed, key=split_key)
+    for row in rows:
+        row['split'] = splits[row['path']]
+    print("🔀 Split: " + ', '.join(f"{len(split_rows(rows, split))} {split}" for split in SPLITS))
+    class_splits = {}
+    for row in rows:
+        class_splits.setdefault(row['class'], set()).add(row['split'])
+    missing = sorted(class_name for class_name, found in class_splits.items() if {'test', 'val'} - found)
+    if missing:
+        print(f"⚠️  {len(missing)} classes have no test or val images (too few images): {', '.join(missing[:10])}")
+
+    duplicates = cross_class_duplicates(rows)
+    print_duplicates(duplicates)
+
+    write_manifest(rows, manifest_path)
+    meta_path = _meta_path(manifest_path)
+    with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'fingerprint': tree_fingerprint, 'settings': settings, 'num_images': len(rows),
+                   'quarantined': sorted(moved), 'excluded': excluded, 'cross_class_duplicates': duplicates},
+                  f, indent=2)
+    os.replace(meta_path + '.tmp', meta_path)
+    print(f"✅ Manifest written to {manifest_path} ({len(to_check) - len(new_errors)} of {len(rows)} images checked)")
+    return rows
+
+
+def split_rows(rows, split):
+    """Rows belonging to one split."""
+    return [row for row in rows if row['split'] == split]
+
+
+def class_names_from(rows):
+    """Sorted class names, matching flow_from_directory's class_indices order."""
+    return sorted({row['class'] for row in rows})
@@ -0,0 +1,135 @@
+"""
+Parallel Dataset Integrity Scan
+Hashes and test-decodes images on a thread pool, quarantines files that would fail
+mid-epoch, and reports exact duplicates filed under more than one class
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+SCAN_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+QUARANTINE_DIR = 'quarantine'
+QUARANTINE_LOG = 'quarantine.csv'
+SUPPORTED_FORMATS = ('JPEG', 'PNG', 'GIF', 'BMP')   # what tf.io.decode_image reads
+THUMBNAIL_SIZE = (1, 1)            # JPEG draft decodes at its smallest scale (1/8)
+
+
+def check_image(path):
+    """
+    (sha256, width, height, error) for one file, reading it once. The image is
+    verified, then decoded as a thumbnail (JPEG decodes at reduced scale but
+    still reads every byte, so truncation shows up). error is None when the
+    file will decode in training.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    sha256 = hashlib.sha256(data).hexdigest()
+    if not data:
+        return sha256, 0, 0, 'empty file'
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.verify()
+        with Image.open(io.BytesIO(data)) as image:
+            if image.format not in SUPPORTED_FORMATS:
+                return sha256, 0, 0, f"unsupported format {image.format}"
+            width, height = image.size
+            image.draft('RGB', THUMBNAIL_SIZE)
+            image.load()
+    except Image.UnidentifiedImageError:
+        return sha256, 0, 0, 'not a recognised image'
+    except Exception as e:
+        return sha256, 0, 0, f"{type(e).__name__}: {e}"
+    return sha256, width, height, None
+
+
+def check_images(paths, workers=SCAN_WORKERS):
+    """{path: check_image(path)} on a thread pool; hashing and decoding release the GIL."""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(paths, pool.map(check_image, paths)))
+
+
+def quarantine_files(data_path, errors, quarantine_dir=QUARANTINE_DIR):
+    """
+    Move each bad file (relative path -> reason) to quarantine_dir, keeping its
+    relative path, and append the reasons to quarantine_dir/quarantine.csv.
+    Files that cannot be moved stay in place; returns the paths moved.
+    """
+    os.makedirs(quarantine_dir, exist_ok=True)
+    log_path = os.path.join(quarantine_dir, QUARANTINE_LOG)
+    new_log = not os.path.exists(log_path)
+    moved = []
+    with open(log_path, 'a', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        if new_log:
+            writer.writerow(['path', 'reason', 'quarantined_at'])
+        for rel_path, reason in sorted(errors.items()):
+            target = os.path.join(quarantine_dir, rel_path)
+            try:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.move(os.path.join(data_path, rel_path), target)
+            except OSError as e:
+                print(f"⚠️  Could not quarantine {rel_path}: {e}")
+                continue
+            writer.writerow([rel_path, reason, time.strftime('%Y-%m-%dT%H:%M:%S')])
+            moved.append(rel_path)
+    return moved
+
+
+def cross_class_duplicates(rows):
+    """Groups of identical images (same content hash) filed under more than one class."""
+    by_hash = {}
+    for row in rows:
+        by_hash.setdefault(row['sha256'], []).append(row)
+    return [
+        {'sha256': sha256, 'paths': [row['path'] for row in group]}
+        for sha256, group in sorted(by_hash.items())
+        if len({row['class'] for row in group}) > 1
+    ]
+
+
+def print_duplicates(duplicates, limit=10):
+    if not duplicates:
+        return
+    print(f"⚠️  {len(duplicates)} images appear under more than one class (label noise):")
+    for group in duplicates[:limit]:
+        print(f"   {' = '.join(group['paths'])}")
+    if len(duplicates) > limit:
+        print(f"   ... and {len(duplicates) - limit} more (listed in the manifest's .json sidecar)")
+
+
+if __name__ == "__main__":
+    from dataset_manifest import MANIFEST_PATH, build_manifest, class_names_from, read_manifest_meta
+
+    parser = argparse.ArgumentParser(description="Scan, hash and integrity-check the dataset, updating the manifest")
+    parser.add_argument('--data-path', required=True, help="PlantVillage 'color' folder")
+    parser.add_argument('--manifest', default=MANIFEST_PATH)
+    parser.add_argument('--workers', type=int, default=SCAN_WORKERS)
+    parser.add_argument('--quarantine', default=QUARANTINE_DIR, metavar='DIR',
+                        help="where corrupt or unreadable images are moved")
+    parser.add_argument('--no-quarantine', action='store_true',
+                        help="leave bad images in place (they are still left out of the manifest)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.data_path):
+        print(f"❌ Dataset path does not exist: {args.data_path}")
+        exit(1)
+
+    start = time.perf_counter()
+    rows = build_manifest(args.data_path, args.manifest, quarantine_dir=None if args.no_quarantine else args.quarantine,
+                          workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    widths = [row['width'] for row in rows]
+    heights = [row['height'] for row in rows]
+    print(f"\n📊 {len(rows)} images in {len(class_names_from(rows))} classes, scanned in {elapsed:.1f}s")
+    if rows:
+        print(f"   Sizes: {min(widths)}-{max(widths)} x {min(heights)}-{max(heights)} px")
+        print(f"   Unique contents: {len({row['sha256'] for row in rows})}")
+    print(f"   Cross-class duplicates: {len(read_manifest_meta(args.manifest).get('cross_class_duplicates', []))}")
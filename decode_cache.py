@@ -0,0 +1,170 @@
+"""
+Pre-decoded Training Cache for PlantVillage Retraining
+Decodes and resizes each split once into memory-mapped uint8 .npy shards
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+import tensorflow as tf
+from dataset_manifest import SPLITS, build_manifest, split_rows, class_names_from, MANIFEST_PATH
+from input_pipeline import AUTOTUNE, batch_pipeline, decode_and_resize, paths_and_labels
+
+CACHE_DIR = 'decode_cache'
+SHARD_SIZE = 2048          # images per shard (~300 MB at 224x224x3)
+DECODE_BATCH_SIZE = 256
+CACHE_SEED = 42
+
+
+def cache_key(rows, img_size, class_names):
+    """Cache identity: image contents, labels and target size - not file locations."""
+    digest = hashlib.sha256(f"{img_size[0]}x{img_size[1]}\n".encode('utf-8'))
+    digest.update(('\n'.join(class_names) + '\n').encode('utf-8'))
+    for row in sorted(rows, key=lambda r: (r['split'], r['sha256'], r['class'])):
+        digest.update(f"{row['split']}|{row['sha256']}|{row['class']}\n".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def _shard_path(split_dir, shard_index):
+    return os.path.join(split_dir, f"images_{shard_index:04d}.npy")
+
+
+def _write_split(split_dir, rows, data_path, class_names, img_size, seed):
+    """Decode one split in parallel and write its shards and label array."""
+    os.makedirs(split_dir, exist_ok=True)
+    rows = list(rows)
+    # Shuffle once on disk so shards are class-mixed for shard-local batching
+    np.random.RandomState(seed).shuffle(rows)
+    paths, labels = paths_and_labels(rows, data_path, class_names)
+    np.save(os.path.join(split_dir, 'labels.npy'), np.asarray(labels, dtype=np.int32))
+
+    img_height, img_width = img_size
+    dataset = tf.data.Dataset.from_tensor_slices(paths).map(
+        lambda path: decode_and_resize(path, img_height, img_width),
+        num_parallel_calls=AUTOTUNE, deterministic=True
+    ).batch(DECODE_BATCH_SIZE).prefetch(AUTOTUNE)
+
+    num_shards = (len(paths) + SHARD_SIZE - 1) // SHARD_SIZE
+    shards = []
+    for shard_index in range(num_shards):
+        count = min(SHARD_SIZE, len(paths) - shard_index * SHARD_SIZE)
+        shards.append(np.lib.format.open_memmap(
+            _shard_path(split_dir, shard_index), mode='w+', dtype=np.uint8,
+            shape=(count, img_height, img_width, 3)
+        ))
+
+    position = 0
+    for batch in dataset:
+        batch = batch.numpy()
+        start = 0
+        while start < len(batch):
+            shard_index, offset = divmod(position, SHARD_SIZE)
+            count = min(len(batch) - start, SHARD_SIZE - offset)
+            shards[shard_index][offset:offset + count] = batch[start:start + count]
+            start += count
+            position += count
+    for shard in shards:
+        shard.flush()
+    return num_shards
+
+
+def build_cache(rows, data_path, img_size, cache_dir=CACHE_DIR, seed=CACHE_SEED):
+    """
+    Return the cache directory for these manifest rows, building it if needed.
+    Experiments with the same images, classes and size share one cache.
+    """
+    class_names = class_names_from(rows)
+    key = cache_key(rows, img_size, class_names)
+    target_dir = os.path.join(cache_dir, key)
+    if os.path.exists(os.path.join(target_dir, 'meta.json')):
+        print(f"♻️  Reusing decode cache: {target_dir}")
+        return target_dir
+
+    print(f"🗜️  Building decode cache: {target_dir}")
+    tmp_dir = target_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    meta = {'img_size': list(img_size), 'class_names': class_names, 'splits': {}}
+    for split in SPLITS:
+        split_list = split_rows(rows, split)
+        num_shards = _write_split(os.path.join(tmp_dir, split), split_list,
+                                  data_path, class_names, img_size, seed)
+        meta['splits'][split] = {'num_images': len(split_list), 'num_shards': num_shards}
+        print(f"   {split}: {len(split_list)} images in {num_shards} shards")
+
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_dir, target_dir)
+    print("✅ Decode cache ready")
+    return target_dir
+
+
+def load_split(cache_path, split):
+    """Memory-map one split: returns (list of image shards, labels)."""
+    with open(os.path.join(cache_path, 'meta.json'), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    split_dir = os.path.join(cache_path, split)
+    shards = [np.load(_shard_path(split_dir, i), mmap_mode='r')
+              for i in range(meta['splits'][split]['num_shards'])]
+    labels = np.load(os.path.join(split_dir, 'labels.npy'))
+    return shards, labels
+
+
+def make_cached_dataset(shards, labels, num_classes, batch_size, training=False, seed=42,
+                        start_epoch=0, start_step=0):
+    """
+    tf.data pipeline over memory-mapped shards. Training visits shards in a
+    new random order each epoch and shuffles within each shard, so reads stay
+    mostly sequential. Augmentation, rescaling and the (start_epoch, start_step)
+    resume semantics match make_dataset.
+    """
+    img_height, img_width = shards[0].shape[1:3] if shards else (0, 0)
+    offsets = np.cumsum([0] + [len(shard) for shard in shards])
+    epoch = [start_epoch]
+
+    def generate():
+        skip = start_step
+        rng = np.random.RandomState(seed + epoch[0])
+        position = epoch[0] * offsets[-1]
+        if not start_step:
+            epoch[0] += 1
+        shard_order = rng.permutation(len(shards)) if training else range(len(shards))
+        for shard_index in shard_order:
+            shard = shards[shard_index]
+            order = rng.permutation(len(shard)) if training else np.arange(len(shard))
+            for start in range(0, len(shard), batch_size):
+                if skip:
+                    skip -= 1
+                else:
+                    # Sorted indices keep each gather a forward scan over the memmap
+                    indices = np.sort(order[start:start + batch_size])
+                    batch = (shard[indices], labels[offsets[shard_index] + indices])
+                    yield batch + (position,) if training else batch
+                position += min(batch_size, len(shard) - start)
+
+    signature = (
+        tf.TensorSpec(shape=(None, img_height, img_width, 3), dtype=tf.uint8),
+        tf.TensorSpec(shape=(None,), dtype=tf.int32),
+    )
+    if training:
+        signature += (tf.TensorSpec(shape=(), dtype=tf.int64),)
+    dataset = tf.data.Dataset.from_generator(generate, output_signature=signature)
+    if training:
+        # Every pass has the same length, so Keras knows the epoch length up front
+        num_batches = sum(-(-len(shard) // batch_size) for shard in shards) - start_step
+        dataset = dataset.apply(tf.data.experimental.assert_cardinality(num_batches))
+    return batch_pipeline(dataset, num_classes, training, seed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the decoded PlantVillage training cache")
+    parser.add_argument('--data-path', required=True, help="PlantVillage 'color' folder")
+    parser.add_argument('--manifest', default=MANIFEST_PATH)
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--img-size', type=int, default=224)
+    args = parser.parse_args()
+
+    manifest = build_manifest(args.data_path, args.manifest)
+    build_cache(manifest, args.data_path, (args.img_size, args.img_size), args.cache_dir)
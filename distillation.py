@@ -0,0 +1,263 @@
+"""
+Knowledge Distillation into a Compact Student
+Caches the retrained teacher's logits once per image, trains a small student on the
+temperature-scaled KD loss plus the hard labels, and exports it to TFLite
+"""
+
+import argparse
+import functools
+import os
+import time
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.callbacks import EarlyStopping
+from tensorflow.keras.layers import Dense
+from tensorflow.keras.models import Model
+from tensorflow.keras.optimizers import Adam
+from benchmark_tflite import print_table, run_benchmarks
+from convert_model import TARGETS, convert_targets, load_source_model, sha256_of, validation_images
+from dataset_manifest import MANIFEST_PATH, build_manifest, class_names_from, split_rows
+from feature_cache import FeatureStore, update_features
+from input_pipeline import AUTOTUNE, ThroughputCallback, augment_batch, decode_and_resize, epoch_order, \
+    make_dataset, paths_and_labels
+from model_factory import BACKBONES, build_model, classifier_layer
+from tflite_conversion import REPRESENTATIVE_SAMPLES, VALIDATION_SAMPLES, print_validation, validate_against_float
+from training_schedule import SCHEDULES, build_schedule, print_phase_report, run_schedule
+
+TEACHER_PATH = 'plant_model_tf214.keras'
+TEACHER_CLASS_NAMES = 'class_names_new.txt'
+STUDENT_BACKBONE = 'mobilenetv3small'
+STUDENT_PATH = 'plant_model_student.keras'
+SOFT_LABEL_DIR = 'soft_labels'
+
+# Configuration
+BATCH_SIZE = 32
+EPOCHS = 15
+LEARNING_RATE = 0.001
+TEMPERATURE = 4.0
+ALPHA = 0.1                    # weight of the hard-label loss; 1 - ALPHA goes to the KD term
+SEED = 42
+
+
+def teacher_logits_model(teacher):
+    """
+    The teacher with its softmax removed: a linear copy of its classifier
+    (features @ kernel + bias) on the same features, so cached soft labels are
+    exact logits. Works for teachers from the original training scripts, whose
+    classifier is an unnamed Dense layer.
+    """
+    classifier = classifier_layer(teacher)
+    logits = Dense(classifier.units, use_bias=classifier.use_bias, name='teacher_logits')(classifier.input)
+    model = Model(inputs=teacher.input, outputs=logits)
+    model.get_layer('teacher_logits').set_weights(classifier.get_weights())
+    return model
+
+
+def soft_label_key(teacher_path, img_size):
+    """Soft labels are only reusable for the same teacher file and input size."""
+    return f"teacher_{sha256_of(teacher_path)[:16]}_{img_size[0]}x{img_size[1]}"
+
+
+def distillation_loss(num_classes, temperature=TEMPERATURE, alpha=ALPHA):
+    """
+    Loss over targets packed as [one-hot label | teacher logits]:
+    alpha * cross-entropy on the label + (1 - alpha) * T^2 * KL(teacher_T || student_T),
+    where _T is the softmax at temperature T. The student outputs probabilities,
+    whose log is its logits up to a constant that the softmax cancels.
+    """
+    def loss(y_true, y_pred):
+        labels, teacher_logits = y_true[:, :num_classes], y_true[:, num_classes:]
+        student_logits = tf.math.log(tf.clip_by_value(y_pred, tf.keras.backend.epsilon(), 1.0))
+        teacher_log_soft = tf.nn.log_softmax(teacher_logits / temperature)
+        student_log_soft = tf.nn.log_softmax(student_logits / temperature)
+        kd = tf.reduce_sum(tf.exp(teacher_log_soft) * (teacher_log_soft - student_log_soft), axis=-1)
+        hard = tf.keras.losses.categorical_crossentropy(labels, y_pred)
+        return alpha * hard + (1.0 - alpha) * temperature ** 2 * kd
+    return loss
+
+
+def label_accuracy(num_classes):
+    """Top-1 accuracy against the one-hot part of the packed targets."""
+    def accuracy(y_true, y_pred):
+        return tf.cast(tf.equal(tf.argmax(y_true[:, :num_classes], axis=-1), tf.argmax(y_pred, axis=-1)),
+                       tf.float32)
+    return accuracy
+
+
+def make_distillation_dataset(paths, labels, teacher_logits, num_classes, batch_size, img_size,
+                              training=False, seed=42, start_epoch=0, start_step=0):
+    """
+    make_dataset with [one-hot label | teacher logits] targets. The teacher saw the
+    un-augmented image, so the student learns to match it under augmentation.
+    """
+    img_height, img_width = img_size
+    all_paths = tf.constant(paths)
+    all_labels = tf.constant(labels, dtype=tf.int32)
+    all_logits = tf.constant(np.asarray(teacher_logits, dtype=np.float32))
+
+    def load(index):
+        return (decode_and_resize(tf.gather(all_paths, index), img_height, img_width),
+                tf.concat([tf.one_hot(tf.gather(all_labels, index), num_classes), tf.gather(all_logits, index)], 0))
+
+    if training:
+        dataset = tf.data.Dataset.from_generator(
+            epoch_order(len(paths), batch_size, seed, start_epoch, start_step),
+            output_signature=(tf.TensorSpec(shape=(), dtype=tf.int64), tf.TensorSpec(shape=(), dtype=tf.int64))
+        )
+        dataset = dataset.map(lambda index, position: load(index) + (position,), num_parallel_calls=AUTOTUNE)
+        dataset = dataset.batch(batch_size).map(
+            lambda images, targets, positions: (
+                augment_batch(tf.cast(images, tf.float32), tf.stack([tf.constant(seed, tf.int64), positions[0]])),
+                targets
+            ),
+            num_parallel_calls=AUTOTUNE
+        )
+        num_batches = -(-len(paths) // batch_size) - start_step
+        dataset = dataset.apply(tf.data.experimental.assert_cardinality(num_batches))
+    else:
+        dataset = tf.data.Dataset.range(len(paths)).map(load, num_parallel_calls=AUTOTUNE).batch(batch_size)
+    dataset = dataset.map(lambda images, targets: (tf.cast(images, tf.float32) / 255.0, targets),
+                          num_parallel_calls=AUTOTUNE)
+    options = tf.data.Options()
+    options.deterministic = True
+    return dataset.with_options(options).prefetch(AUTOTUNE)
+
+
+def cache_soft_labels(teacher_path, manifest, data_path, class_names, cache_dir=SOFT_LABEL_DIR):
+    """
+    Teacher logits for every manifest image, computed once per image content
+    and stored as float16 chunks. Returns (store, teacher input size).
+    """
+    teacher = load_source_model(teacher_path)
+    if teacher.output_shape[-1] != len(class_names):
+        raise ValueError(f"{teacher_path} has {teacher.output_shape[-1]} outputs but the dataset "
+                         f"has {len(class_names)} classes")
+    if os.path.exists(TEACHER_CLASS_NAMES):
+        with open(TEACHER_CLASS_NAMES, 'r', encoding='utf-8') as f:
+            teacher_classes = [line.strip() for line in f if line.strip()]
+        if teacher_classes != class_names:
+            raise ValueError(f"{TEACHER_CLASS_NAMES} lists the teacher's classes in a different order "
+                             f"than the dataset; retrain the teacher on this dataset first")
+
+    img_size = tuple(teacher.input_shape[1:3])
+    store = FeatureStore(cache_dir, soft_label_key(teacher_path, img_size))
+    update_features(store, manifest, data_path, teacher_logits_model(teacher), img_size)
+    return store, img_size
+
+
+def split_arrays(store, manifest, split, data_path, class_names):
+    rows = split_rows(manifest, split)
+    paths, labels = paths_and_labels(rows, data_path, class_names)
+    return paths, labels, store.get([row['sha256'] for row in rows])
+
+
+def distill(manifest, data_path, class_names, store, img_size, student=STUDENT_BACKBONE, schedule='full',
+            epochs=EPOCHS, temperature=TEMPERATURE, alpha=ALPHA, seed=SEED):
+    """Train the student on cached teacher logits; returns (student model, phase reports)."""
+    tf.keras.utils.set_random_seed(seed)
+    num_classes = len(class_names)
+    train_paths, train_labels, train_logits = split_arrays(store, manifest, 'train', data_path, class_names)
+    make_train_dataset = functools.partial(
+        make_distillation_dataset, train_paths, train_labels, train_logits, num_classes, BATCH_SIZE, img_size,
+        training=True, seed=seed
+    )
+    val_dataset = make_distillation_dataset(*split_arrays(store, manifest, 'val', data_path, class_names),
+                                            num_classes, BATCH_SIZE, img_size)
+
+    model, base_model = build_model(num_classes, img_size, backbone=student)
+    compile_kwargs = {'loss': distillation_loss(num_classes, temperature, alpha),
+                      'metrics': [label_accuracy(num_classes)]}
+    model.compile(optimizer=Adam(learning_rate=LEARNING_RATE), **compile_kwargs)
+    model.optimizer.build(model.trainable_variables)
+
+    phases = build_schedule(schedule, epochs, LEARNING_RATE, blocks=BACKBONES[student].blocks)
+    reports = run_schedule(
+        model, base_model, phases, make_train_dataset, compile_kwargs, tf.distribute.get_strategy(),
+        validation_data=val_dataset,
+        callbacks=[EarlyStopping(monitor='val_loss', patience=3, restore_best_weights=True, verbose=1),
+                   ThroughputCallback(len(train_paths), BATCH_SIZE)],
+        verbose=1
+    )
+    return model, reports
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distill the retrained teacher into a compact student model")
+    parser.add_argument('--data-path', required=True, help="PlantVillage 'color' folder")
+    parser.add_argument('--teacher', default=TEACHER_PATH)
+    parser.add_argument('--student', choices=list(BACKBONES), default=STUDENT_BACKBONE)
+    parser.add_argument('--schedule', choices=SCHEDULES, default='full')
+    parser.add_argument('--epochs', type=int, default=EPOCHS)
+    parser.add_argument('--temperature', type=float, default=TEMPERATURE)
+    parser.add_argument('--alpha', type=float, default=ALPHA, help="hard-label loss weight (0-1)")
+    parser.add_argument('--soft-labels', default=SOFT_LABEL_DIR, metavar='DIR',
+                        help="where teacher logits are cached")
+    parser.add_argument('--targets', default='dynamic', help=f"comma-separated subset of {', '.join(TARGETS)}")
+    parser.add_argument('--output', default=STUDENT_PATH)
+    parser.add_argument('--compare-tflite', metavar='PATH',
+                        help="teacher .tflite to benchmark the student against (e.g. my_model_tf214.tflite)")
+    args = parser.parse_args()
+
+    targets = [t.strip() for t in args.targets.split(',') if t.strip()]
+    if set(targets) - set(TARGETS):
+        parser.error(f"unknown targets: {', '.join(sorted(set(targets) - set(TARGETS)))}")
+    for path in (args.data_path, args.teacher):
+        if not os.path.exists(path):
+            print(f"❌ Not found: {path}")
+            exit(1)
+
+    print(f"TensorFlow version: {tf.__version__}")
+    print("\n📋 Preparing dataset split manifest...")
+    manifest = build_manifest(args.data_path, MANIFEST_PATH)
+    class_names = class_names_from(manifest)
+
+    print(f"\n🎓 Caching teacher logits from {args.teacher}...")
+    start = time.perf_counter()
+    try:
+        store, img_size = cache_soft_labels(args.teacher, manifest, args.data_path, class_names, args.soft_labels)
+    except ValueError as e:
+        print(f"❌ {e}")
+        exit(1)
+    print(f"   Soft labels ready in {time.perf_counter() - start:.1f}s")
+
+    print(f"\n🧒 Distilling into {args.student} (T={args.temperature:g}, alpha={args.alpha:g})...")
+    model, reports = distill(manifest, args.data_path, class_names, store, img_size, args.student,
+                             args.schedule, args.epochs, args.temperature, args.alpha)
+    print_phase_report(reports)
+
+    # Plain cross-entropy from here on, so the saved student loads without custom objects
+    model.compile(optimizer=model.optimizer, loss='categorical_crossentropy', metrics=['accuracy'])
+    test_paths, test_labels, test_logits = split_arrays(store, manifest, 'test', args.data_path, class_names)
+    teacher_accuracy = float(np.mean(np.argmax(test_logits, axis=1) == np.asarray(test_labels)))
+    _, student_accuracy = model.evaluate(
+        make_dataset(test_paths, test_labels, len(class_names), BATCH_SIZE, img_size), verbose=1)
+    print(f"\n✅ Teacher test accuracy: {teacher_accuracy * 100:.2f}%")
+    print(f"✅ Student test accuracy: {student_accuracy * 100:.2f}% "
+          f"({model.count_params():,} params)")
+
+    model.save(args.output)
+    print(f"💾 Student saved as {args.output}")
+
+    stem = os.path.splitext(args.output)[0]
+    output_paths = {t: f"{stem}_{t}.tflite" for t in targets}
+    int8_data = (args.data_path, MANIFEST_PATH, img_size, REPRESENTATIVE_SAMPLES, 'int8')
+    print(f"\n🔄 Converting student: {', '.join(targets)}")
+    results = convert_targets(model, targets, output_paths, int8_data=int8_data)
+    converted = [r['path'] for r in results.values() if 'error' not in r]
+
+    if converted:
+        print("\n🧪 Validating the student's TFLite targets...")
+        images, labels = validation_images(model, args.data_path, MANIFEST_PATH, VALIDATION_SAMPLES)
+        for target, result in results.items():
+            if 'error' not in result:
+                print(f"\n   [{target}]")
+                print_validation(validate_against_float(model, result['path'], images, labels),
+                                 target.capitalize())
+
+    if args.compare_tflite and converted:
+        print_table(run_benchmarks([args.compare_tflite] + converted, reference=args.compare_tflite))
+
+    print("\n" + "=" * 60)
+    print("✅ DISTILLATION COMPLETE!" if len(converted) == len(targets) else "❌ DISTILLATION FINISHED WITH FAILURES")
+    print("=" * 60)
+    exit(0 if len(converted) == len(targets) else 1)
@@ -0,0 +1,172 @@
+"""
+Mixed-Precision and Multi-Worker Training Setup
+Picks a float16/bfloat16 policy the hardware supports, builds a MultiWorkerMirroredStrategy
+from TF_CONFIG, and launches local worker processes for testing without a cluster
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import tensorflow as tf
+
+PRECISION_MODES = ('float32', 'mixed_float16', 'mixed_bfloat16', 'auto')
+TRAIN_SCRIPT = 'retrain_model_tf214.py'
+LOCAL_WORKERS = 2
+WORKER_LOG = 'worker_{}.log'
+
+
+def gpu_compute_capability():
+    """Highest (major, minor) compute capability among visible GPUs, or None without a GPU."""
+    capabilities = []
+    for gpu in tf.config.list_physical_devices('GPU'):
+        capability = tf.config.experimental.get_device_details(gpu).get('compute_capability')
+        if capability:
+            capabilities.append(tuple(capability))
+    return max(capabilities) if capabilities else None
+
+
+def cpu_supports_bfloat16():
+    """True when the CPU has native bfloat16 instructions (AVX512_BF16 or AMX)."""
+    try:
+        with open('/proc/cpuinfo', 'r', encoding='utf-8') as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return 'avx512_bf16' in flags or 'amx_bf16' in flags
+
+
+def resolve_precision(mode):
+    """
+    The Keras dtype policy to train with. 'auto' prefers mixed_float16 on
+    Volta+ GPUs, then mixed_bfloat16 on Ampere+ GPUs or bfloat16-capable CPUs.
+    A requested mixed policy the hardware would only emulate falls back to float32.
+    """
+    capability = gpu_compute_capability()
+    float16_ok = capability is not None and capability >= (7, 0)
+    bfloat16_ok = (capability is not None and capability >= (8, 0)) or cpu_supports_bfloat16()
+
+    if mode == 'auto':
+        if float16_ok:
+            return 'mixed_float16'
+        return 'mixed_bfloat16' if bfloat16_ok else 'float32'
+    if mode == 'mixed_float16' and not float16_ok:
+        print("⚠️  mixed_float16 needs a GPU with compute capability 7.0+; training in float32")
+        return 'float32'
+    if mode == 'mixed_bfloat16' and not bfloat16_ok:
+        print("⚠️  mixed_bfloat16 needs an Ampere GPU or an AVX512_BF16/AMX CPU; training in float32")
+        return 'float32'
+    return mode
+
+
+def set_precision(mode):
+    """Resolve and apply the global dtype policy; returns the policy name."""
+    policy = resolve_precision(mode)
+    tf.keras.mixed_precision.set_global_policy(policy)
+    return policy
+
+
+def make_strategy(distributed):
+    """
+    MultiWorkerMirroredStrategy configured from TF_CONFIG, or the default
+    single-device strategy. Create it before any other TensorFlow op runs.
+    """
+    if not distributed:
+        return tf.distribute.get_strategy()
+    if 'TF_CONFIG' not in os.environ:
+        print("⚠️  TF_CONFIG is not set; running as a single worker")
+    return tf.distribute.MultiWorkerMirroredStrategy()
+
+
+def is_chief(strategy):
+    """Only the chief (or worker 0 when there is no chief) writes shared outputs."""
+    resolver = getattr(strategy, 'cluster_resolver', None)
+    if resolver is None:
+        return True
+    task_type, task_id = resolver.task_type, resolver.task_id
+    return task_type is None or task_type == 'chief' or (task_type == 'worker' and task_id == 0)
+
+
+def barrier(strategy):
+    """Block until every worker gets here: an all-reduce of one value per replica."""
+    strategy.reduce(tf.distribute.ReduceOp.SUM, strategy.run(lambda: tf.constant(1.0)), axis=None)
+
+
+def scale_for_replicas(batch_size, learning_rate, num_replicas):
+    """Global batch and learning rate for num_replicas, keeping batch_size per replica (linear LR scaling)."""
+    return batch_size * num_replicas, learning_rate * num_replicas
+
+
+def save_model(model, path, strategy):
+    """
+    Save on every worker, since saving a distributed model is collective, but
+    only the chief's copy lands at path; the others write to a scratch dir.
+    """
+    if is_chief(strategy):
+        model.save(path)
+        return
+    scratch = tempfile.mkdtemp(prefix=f"worker_{strategy.cluster_resolver.task_id}_")
+    try:
+        model.save(os.path.join(scratch, os.path.basename(path)))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def free_ports(count):
+    """count currently unused localhost ports."""
+    sockets = [socket.socket() for _ in range(count)]
+    try:
+        for s in sockets:
+            s.bind(('localhost', 0))
+        return [s.getsockname()[1] for s in sockets]
+    finally:
+        for s in sockets:
+            s.close()
+
+
+def launch_local_workers(num_workers, script_args, script=TRAIN_SCRIPT):
+    """
+    Run num_workers copies of the training script on this machine, each with
+    its own TF_CONFIG. Worker 0 (the chief) prints to the console, the others
+    to WORKER_LOG files. Returns the exit codes.
+    """
+    if '--distributed' not in script_args:
+        script_args = list(script_args) + ['--distributed']
+    cluster = {'worker': [f"localhost:{port}" for port in free_ports(num_workers)]}
+
+    processes, logs = [], []
+    for index in range(num_workers):
+        env = dict(os.environ, TF_CONFIG=json.dumps({'cluster': cluster, 'task': {'type': 'worker', 'index': index}}))
+        log = None if index == 0 else open(WORKER_LOG.format(index), 'w', encoding='utf-8')
+        logs.append(log)
+        processes.append(subprocess.Popen([sys.executable, script] + script_args, env=env,
+                                          stdout=log, stderr=subprocess.STDOUT if log else None))
+    print(f"🌐 Launched {num_workers} workers: {', '.join(cluster['worker'])}")
+
+    codes = [process.wait() for process in processes]
+    for log in logs:
+        if log:
+            log.close()
+    return codes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run multi-worker training locally, one process per worker",
+        epilog=f"arguments after -- go to {TRAIN_SCRIPT}, e.g. --workers 2 -- --data-path ./color"
+    )
+    parser.add_argument('--workers', type=int, default=LOCAL_WORKERS)
+    parser.add_argument('--script', default=TRAIN_SCRIPT)
+    args, script_args = parser.parse_known_args()
+    if script_args[:1] == ['--']:
+        script_args = script_args[1:]
+
+    codes = launch_local_workers(args.workers, script_args, args.script)
+    for index, code in enumerate(codes):
+        status = "✅" if code == 0 else "❌"
+        print(f"{status} Worker {index} exited with code {code}" + (f" (log: {WORKER_LOG.format(index)})" if index else ""))
+    exit(0 if all(code == 0 for code in codes) else 1)
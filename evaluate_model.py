@@ -0,0 +1,343 @@
+"""
+Vectorized Model Evaluation
+Scores a split once per model file (Keras or TFLite), caches the scores by content hash, and
+reports the confusion matrix, per-class precision/recall, top-k accuracy and calibration
+"""
+
+import argparse
+import json
+import os
+import time
+import numpy as np
+from convert_model import load_source_model, sha256_of
+from dataset_manifest import MANIFEST_PATH, build_manifest, class_names_from, split_rows
+from feature_cache import FeatureStore
+from preprocessing import decode_batch, normalize
+from tflite_conversion import tflite_scores
+from tflite_runner import TFLiteRunner
+
+MODEL_PATH = 'plant_model_tf214.keras'
+CLASS_NAMES_PATH = 'class_names_new.txt'
+SCORE_CACHE_DIR = 'eval_scores'
+FAILED_LIST = 'failed.txt'     # content hashes that failed to decode, next to the cached scores
+REPORT_PATH = 'evaluation_report.json'
+GROUPINGS = ('class', 'plant', 'health')
+
+# Configuration
+BATCH_SIZE = 32
+SCORE_CHUNK = 1024             # images decoded and scored per cache chunk
+TOP_K = (1, 3, 5)
+CALIBRATION_BINS = 15
+THRESHOLD_SWEEP = (0.5, 0.7, 0.8, 0.9, 0.95)
+
+
+def score_key(model_path, model_sha256):
+    """Scores are only reusable for the same model file or SavedModel; its hash also fixes the input size."""
+    stem = os.path.splitext(os.path.basename(os.path.normpath(model_path)))[0]
+    return f"{stem}_{model_sha256[:16]}"
+
+
+def model_scorer(model_path, batch_size=BATCH_SIZE):
+    """(score function: uint8 images -> float32 (N, C) scores, input size) for a .tflite or Keras model."""
+    if model_path.lower().endswith('.tflite'):
+        runner = TFLiteRunner(model_path, batch_size)
+        return (lambda images: tflite_scores(model_path, images, runner=runner)), runner.img_size
+    model = load_source_model(model_path)
+    return (lambda images: model.predict(normalize(images), batch_size=batch_size, verbose=0),
+            tuple(model.input_shape[1:3]))
+
+
+def read_failed(store):
+    """{content hash: error} for images that failed to decode in an earlier run."""
+    path = os.path.join(store.path, FAILED_LIST)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return dict(line.rstrip('\n').split('\t', 1) for line in f if line.strip())
+
+
+def record_failed(store, failed):
+    """Append {content hash: error} to the store's failed list, one tab-separated line each."""
+    if not failed:
+        return
+    with open(os.path.join(store.path, FAILED_LIST), 'a', encoding='utf-8') as f:
+        f.writelines(f"{sha256}\t{' '.join(error.split())}\n" for sha256, error in failed.items())
+
+
+def update_scores(store, rows, data_path, model_path, batch_size=BATCH_SIZE, chunk_size=SCORE_CHUNK):
+    """
+    Score only the images whose content hash is not in the store yet; the model
+    is not even loaded when every score is cached. Images are decoded with the
+    shared preprocessing, so Keras and TFLite results are directly comparable.
+    Each chunk is stored as it completes, so an interrupted run resumes. Images
+    that fail to decode are recorded and not retried.
+    """
+    failed = read_failed(store)
+    missing = [h for h in store.missing([row['sha256'] for row in rows]) if h not in failed]
+    if not missing:
+        skipped = sum(row['sha256'] in failed for row in rows)
+        print(f"♻️  Scores for all {len(rows) - skipped} images already cached"
+              + (f" ({skipped} unreadable images skipped)" if skipped else ""))
+        return 0
+    first_path = {}
+    for row in rows:
+        first_path.setdefault(row['sha256'], os.path.join(data_path, row['path']))
+
+    print(f"📂 Loading {model_path}...")
+    score, img_size = model_scorer(model_path, batch_size)
+    print(f"🧮 Scoring {len(missing)} images ({len(store)} cached)...")
+    start = time.perf_counter()
+    for offset in range(0, len(missing), chunk_size):
+        hashes = missing[offset:offset + chunk_size]
+        pixels, errors = decode_batch([first_path[h] for h in hashes], img_size)
+        for i, error in sorted(errors.items()):
+            print(f"⚠️  Skipping {first_path[hashes[i]]}: {error}")
+        record_failed(store, {hashes[i]: error for i, error in errors.items()})
+        keep = np.array([i not in errors for i in range(len(hashes))], dtype=bool)
+        store.add([h for h, k in zip(hashes, keep) if k], score(pixels[keep]))
+    elapsed = time.perf_counter() - start
+    print(f"   {len(missing)} images in {elapsed:.1f}s → {len(missing) / elapsed:.1f} images/sec")
+    return len(missing)
+
+
+def group_names(class_names, grouping='class', label_map=None):
+    """
+    The label each model class is scored as. 'plant' keeps the part before '___'
+    ('Apple___Black_rot' -> 'Apple'); 'health' is healthy / diseased. A label_map
+    {class name: label} overrides either, for custom merges.
+    """
+    if grouping == 'plant':
+        groups = [name.split('___')[0] for name in class_names]
+    elif grouping == 'health':
+        groups = ['healthy' if name.lower().endswith('healthy') else 'diseased' for name in class_names]
+    else:
+        groups = list(class_names)
+    return [(label_map or {}).get(name, group) for name, group in zip(class_names, groups)]
+
+
+def regroup(scores, labels, class_groups):
+    """
+    Map class scores and labels onto coarser groups: a group's score is the sum
+    of its classes' probabilities. Returns (scores, labels, group names).
+    """
+    names = list(dict.fromkeys(class_groups))
+    group_index = np.array([names.index(group) for group in class_groups])
+    membership = np.zeros((len(class_groups), len(names)), dtype=np.float32)
+    membership[np.arange(len(class_groups)), group_index] = 1.0
+    return scores @ membership, group_index[labels], names
+
+
+def confusion_matrix(labels, predictions, num_classes):
+    """(true, predicted) counts via a single bincount."""
+    return np.bincount(labels * num_classes + predictions,
+                       minlength=num_classes * num_classes).reshape(num_classes, num_classes)
+
+
+def per_class_metrics(matrix, support):
+    """
+    Precision, recall and F1 per class from a confusion matrix. support counts
+    every labelled image, so images rejected by a threshold lower recall.
+    """
+    true_positives = np.diag(matrix).astype(np.float64)
+    predicted = matrix.sum(axis=0)
+    precision = np.divide(true_positives, predicted, out=np.zeros_like(true_positives), where=predicted > 0)
+    recall = np.divide(true_positives, support, out=np.zeros_like(true_positives), where=support > 0)
+    total = precision + recall
+    f1 = np.divide(2 * precision * recall, total, out=np.zeros_like(true_positives), where=total > 0)
+    return precision, recall, f1
+
+
+def top_k_accuracy(scores, labels, ks=TOP_K):
+    """
+    {k: accuracy}: an image counts for k if fewer than k other classes score at least as
+    high as its true class. Ties count against the image, since quantized models often
+    output several equal scores (e.g. all 0.0).
+    """
+    true_scores = scores[np.arange(len(labels)), labels]
+    rank = np.count_nonzero(scores >= true_scores[:, None], axis=1) - 1
+    return {k: float(np.mean(rank < k)) for k in ks if k <= scores.shape[1]}
+
+
+def calibration(confidence, correct, bins=CALIBRATION_BINS):
+    """
+    Expected calibration error over equal-width confidence bins, plus the
+    per-bin (count, mean confidence, accuracy) reliability table.
+    """
+    bin_ids = np.minimum((confidence * bins).astype(np.int64), bins - 1)
+    counts = np.bincount(bin_ids, minlength=bins)
+    confidence_sum = np.bincount(bin_ids, weights=confidence, minlength=bins)
+    correct_sum = np.bincount(bin_ids, weights=correct.astype(np.float64), minlength=bins)
+    ece = float(np.abs(correct_sum - confidence_sum).sum() / max(len(confidence), 1))
+    nonzero = np.maximum(counts, 1)
+    table = [{'lower': i / bins, 'upper': (i + 1) / bins, 'count': int(counts[i]),
+              'confidence': float(confidence_sum[i] / nonzero[i]), 'accuracy': float(correct_sum[i] / nonzero[i])}
+             for i in range(bins)]
+    return ece, table
+
+
+def threshold_sweep(confidence, correct, thresholds=THRESHOLD_SWEEP):
+    """Coverage and accuracy on the accepted images at each confidence threshold."""
+    accepted = confidence[None, :] >= np.asarray(thresholds)[:, None]
+    kept = accepted.sum(axis=1)
+    hits = (accepted & correct[None, :]).sum(axis=1)
+    return [{'threshold': float(t), 'coverage': float(k / len(confidence)),
+             'accuracy': float(h / k) if k else 0.0} for t, k, h in zip(thresholds, kept, hits)]
+
+
+def top_confusions(matrix, names, limit=10):
+    """The largest off-diagonal cells as (true, predicted, count)."""
+    off_diagonal = matrix.copy()
+    np.fill_diagonal(off_diagonal, 0)
+    order = np.argsort(off_diagonal, axis=None)[::-1][:limit]
+    return [{'true': names[t], 'predicted': names[p], 'count': int(off_diagonal[t, p])}
+            for t, p in zip(*np.unravel_index(order, matrix.shape)) if off_diagonal[t, p] > 0]
+
+
+def evaluate_scores(scores, labels, names, threshold=0.0, ks=TOP_K, bins=CALIBRATION_BINS):
+    """
+    The full report for (N, C) scores and integer labels. Predictions below
+    threshold are rejected: they count against recall but not precision.
+    """
+    num_classes = len(names)
+    predictions = np.argmax(scores, axis=1)
+    confidence = scores[np.arange(len(labels)), predictions].astype(np.float64)
+    correct = predictions == labels
+    accepted = confidence >= threshold
+
+    support = np.bincount(labels, minlength=num_classes)
+    matrix = confusion_matrix(labels[accepted], predictions[accepted], num_classes)
+    precision, recall, f1 = per_class_metrics(matrix, support)
+    ece, reliability = calibration(confidence, correct, bins)
+    return {
+        'num_images': int(len(labels)),
+        'accuracy': float(np.mean(correct)),
+        'top_k_accuracy': top_k_accuracy(scores, labels, ks),
+        'macro_precision': float(precision[support > 0].mean()),
+        'macro_recall': float(recall[support > 0].mean()),
+        'macro_f1': float(f1[support > 0].mean()),
+        'ece': ece,
+        'mean_confidence': float(confidence.mean()),
+        'threshold': float(threshold),
+        'coverage': float(np.mean(accepted)),
+        'accepted_accuracy': float(np.mean(correct[accepted])) if accepted.any() else 0.0,
+        'per_class': [{'name': name, 'support': int(support[i]), 'precision': float(precision[i]),
+                       'recall': float(recall[i]), 'f1': float(f1[i]),
+                       'rejected': int(support[i] - matrix[i].sum())}
+                      for i, name in enumerate(names)],
+        'top_confusions': top_confusions(matrix, names),
+        'reliability': reliability,
+        'threshold_sweep': threshold_sweep(confidence, correct),
+        'class_names': list(names),
+        'confusion_matrix': matrix.tolist(),
+    }
+
+
+def print_report(report, worst=15):
+    print(f"\n{'Images:':<20}{report['num_images']}")
+    print(f"{'Accuracy:':<20}{report['accuracy'] * 100:.2f}%")
+    for k, accuracy in report['top_k_accuracy'].items():
+        print(f"{f'Top-{k} accuracy:':<20}{accuracy * 100:.2f}%")
+    print(f"{'Macro P / R / F1:':<20}{report['macro_precision'] * 100:.2f}% / "
+          f"{report['macro_recall'] * 100:.2f}% / {report['macro_f1'] * 100:.2f}%")
+    print(f"{'ECE:':<20}{report['ece'] * 100:.2f}% (mean confidence {report['mean_confidence'] * 100:.2f}%)")
+    if report['threshold'] > 0:
+        print(f"{'Threshold:':<20}{report['threshold']:.2f} → coverage {report['coverage'] * 100:.2f}%, "
+              f"accuracy on accepted {report['accepted_accuracy'] * 100:.2f}%")
+
+    rows = sorted(report['per_class'], key=lambda r: (r['f1'], r['name']))
+    rows = [r for r in rows if r['support'] > 0][:worst]
+    print(f"\n{'Class (lowest F1 first)':<40} {'N':>5} {'Prec':>7} {'Recall':>7} {'F1':>7}")
+    print("-" * 70)
+    for r in rows:
+        print(f"{r['name'][:40]:<40} {r['support']:>5} {r['precision'] * 100:>6.1f}% "
+              f"{r['recall'] * 100:>6.1f}% {r['f1'] * 100:>6.1f}%")
+
+    if report['top_confusions']:
+        print("\n🔀 Most frequent confusions:")
+        for c in report['top_confusions']:
+            print(f"   {c['count']:>4} × {c['true']} → {c['predicted']}")
+
+    print(f"\n{'Threshold':>9} {'Coverage':>9} {'Accuracy':>9}")
+    for s in report['threshold_sweep']:
+        print(f"{s['threshold']:>9.2f} {s['coverage'] * 100:>8.2f}% {s['accuracy'] * 100:>8.2f}%")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate a Keras or TFLite model on a dataset split")
+    parser.add_argument('--data-path', required=True, help="PlantVillage 'color' folder")
+    parser.add_argument('--model', default=MODEL_PATH, help=".keras, .h5, SavedModel directory or .tflite")
+    parser.add_argument('--class-names', default=None,
+                        help=f"the model's output order (default: {CLASS_NAMES_PATH} if present, "
+                             f"else the dataset's sorted class folders)")
+    parser.add_argument('--split', choices=('train', 'val', 'test'), default='test')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--top-k', default=','.join(str(k) for k in TOP_K), help="comma-separated k values")
+    parser.add_argument('--bins', type=int, default=CALIBRATION_BINS, help="calibration bins")
+    parser.add_argument('--threshold', type=float, default=0.0,
+                        help="reject predictions below this confidence (rescored from cached scores)")
+    parser.add_argument('--group-by', choices=GROUPINGS, default='class',
+                        help="score as plant species or healthy/diseased instead of per class")
+    parser.add_argument('--label-map', default=None, metavar='JSON',
+                        help="{class name: label} merges applied on top of --group-by")
+    parser.add_argument('--cache-dir', default=SCORE_CACHE_DIR)
+    parser.add_argument('--output', default=REPORT_PATH)
+    args = parser.parse_args()
+
+    for path in (args.data_path, args.model):
+        if not os.path.exists(path):
+            print(f"❌ Not found: {path}")
+            exit(1)
+
+    manifest = build_manifest(args.data_path, MANIFEST_PATH)
+    class_names_path = args.class_names or (CLASS_NAMES_PATH if os.path.exists(CLASS_NAMES_PATH) else None)
+    if class_names_path:
+        with open(class_names_path, 'r', encoding='utf-8') as f:
+            class_names = [line.strip() for line in f if line.strip()]
+    else:
+        class_names = class_names_from(manifest)
+    class_index = {name: i for i, name in enumerate(class_names)}
+
+    rows = split_rows(manifest, args.split)
+    unknown = sorted({row['class'] for row in rows} - set(class_index))
+    if unknown:
+        print(f"⚠️  Skipping {len(unknown)} classes the model does not know: {', '.join(unknown)}")
+        rows = [row for row in rows if row['class'] in class_index]
+    if not rows:
+        print(f"❌ No {args.split} images to evaluate")
+        exit(1)
+
+    model_sha256 = sha256_of(args.model)
+    store = FeatureStore(args.cache_dir, score_key(args.model, model_sha256), dtype=np.float32)
+    update_scores(store, rows, args.data_path, args.model, args.batch_size)
+    failed = read_failed(store)
+    unreadable = [row for row in rows if row['sha256'] in failed]
+    if unreadable:
+        rows = [row for row in rows if row['sha256'] not in failed]
+        print(f"⚠️  Leaving out {len(unreadable)} images that failed to decode "
+              f"(listed in {os.path.join(store.path, FAILED_LIST)})")
+    scores = store.get([row['sha256'] for row in rows])
+    labels = np.array([class_index[row['class']] for row in rows], dtype=np.int64)
+    if scores.shape[1] != len(class_names):
+        print(f"❌ {args.model} has {scores.shape[1]} outputs but {len(class_names)} class names are known; "
+              f"pass --class-names")
+        exit(1)
+
+    names = class_names
+    if args.group_by != 'class' or args.label_map:
+        label_map = None
+        if args.label_map:
+            with open(args.label_map, 'r', encoding='utf-8') as f:
+                label_map = json.load(f)
+        scores, labels, names = regroup(scores, labels, group_names(class_names, args.group_by, label_map))
+        print(f"🏷️  Scoring {len(class_names)} classes as {len(names)} labels")
+
+    ks = tuple(int(k) for k in args.top_k.split(','))
+    report = evaluate_scores(scores, labels, names, args.threshold, ks, args.bins)
+    report.update({'model': args.model, 'model_sha256': model_sha256, 'split': args.split,
+                   'group_by': args.group_by, 'label_map': args.label_map})
+    print_report(report)
+
+    with open(args.output + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    os.replace(args.output + '.tmp', args.output)
+    print(f"\n📄 Report written to {args.output}")
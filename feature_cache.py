@@ -0,0 +1,175 @@
+"""
+Frozen-Backbone Feature Cache for Head-only Retraining
+Stores pooled backbone embeddings as float16, keyed by image content hash
+"""
+
+import os
+import time
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.callbacks import EarlyStopping
+from tensorflow.keras.optimizers import Adam
+from dataset_manifest import split_rows
+from input_pipeline import AUTOTUNE, decode_and_resize
+from model_factory import BACKBONE_NAME, BACKBONE_POOLING, BACKBONES, attach_head, build_backbone, \
+    build_head_model, copy_head_weights
+
+FEATURE_CACHE_DIR = 'feature_cache'
+EMBED_BATCH_SIZE = 64
+HEAD_BATCH_SIZE = 256
+HEAD_EPOCHS = 30
+HEAD_LEARNING_RATE = 0.001
+
+
+def backbone_key(img_size, backbone_name=BACKBONE_NAME, pooling=BACKBONE_POOLING, input_scale=255.0):
+    """
+    Embeddings are only reusable for the same backbone, pooling, input scaling,
+    weights and input size. Keys without the scale hold embeddings of images fed
+    at 1/255 of the backbone's range and are never read again.
+    """
+    return f"{backbone_name}_{pooling}_{img_size[0]}x{img_size[1]}_x{input_scale:g}_imagenet"
+
+
+class FeatureStore:
+    """
+    Append-only embedding store. Each update writes a new chunk
+    (features_NNNN.npy + features_NNNN.txt listing one content hash per row),
+    so adding images never rewrites what is already cached.
+    """
+
+    def __init__(self, root, key, dtype=np.float16):
+        self.path = os.path.join(root, key)
+        self.dtype = dtype
+        os.makedirs(self.path, exist_ok=True)
+        self._chunks = []
+        self._index = {}
+        chunk_id = 0
+        while os.path.exists(self._chunk_path(chunk_id, '.txt')):
+            with open(self._chunk_path(chunk_id, '.txt'), 'r', encoding='utf-8') as f:
+                hashes = f.read().split()
+            self._chunks.append(np.load(self._chunk_path(chunk_id, '.npy'), mmap_mode='r'))
+            for row, sha256 in enumerate(hashes):
+                self._index[sha256] = (chunk_id, row)
+            chunk_id += 1
+
+    def _chunk_path(self, chunk_id, ext):
+        return os.path.join(self.path, f"features_{chunk_id:04d}{ext}")
+
+    def __len__(self):
+        return len(self._index)
+
+    def missing(self, hashes):
+        """Content hashes (deduplicated, in first-seen order) without a cached embedding."""
+        return [h for h in dict.fromkeys(hashes) if h not in self._index]
+
+    def add(self, hashes, embeddings):
+        """Write one new chunk. The .txt file is renamed last and marks the chunk complete."""
+        if len(hashes) == 0:
+            return
+        chunk_id = len(self._chunks)
+        npy_path = self._chunk_path(chunk_id, '.npy')
+        txt_path = self._chunk_path(chunk_id, '.txt')
+        np.save(npy_path, np.asarray(embeddings, dtype=self.dtype))
+        with open(txt_path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write('\n'.join(hashes) + '\n')
+        os.replace(txt_path + '.tmp', txt_path)
+
+        self._chunks.append(np.load(npy_path, mmap_mode='r'))
+        for row, sha256 in enumerate(hashes):
+            self._index[sha256] = (chunk_id, row)
+
+    def get(self, hashes):
+        """(N, D) embeddings, in the store's dtype, for the given content hashes."""
+        locations = np.array([self._index[h] for h in hashes], dtype=np.int64).reshape(-1, 2)
+        dim = self._chunks[0].shape[1]
+        result = np.empty((len(hashes), dim), dtype=self.dtype)
+        for chunk_id, chunk in enumerate(self._chunks):
+            mask = locations[:, 0] == chunk_id
+            if mask.any():
+                result[mask] = chunk[locations[mask, 1]]
+        return result
+
+
+def compute_embeddings(base_model, paths, img_size, batch_size=EMBED_BATCH_SIZE):
+    """
+    Run non-augmented images through the frozen backbone (same decode and [0, 1]
+    rescale as training; build_backbone maps them to the backbone's own range).
+    """
+    img_height, img_width = img_size
+    dataset = tf.data.Dataset.from_tensor_slices(paths).map(
+        lambda path: tf.cast(decode_and_resize(path, img_height, img_width), tf.float32) / 255.0,
+        num_parallel_calls=AUTOTUNE
+    ).batch(batch_size).prefetch(AUTOTUNE)
+    return base_model.predict(dataset, verbose=1)
+
+
+def update_features(store, rows, data_path, base_model, img_size):
+    """Embed only the images whose content hash is not in the store yet."""
+    missing = store.missing([row['sha256'] for row in rows])
+    if not missing:
+        print(f"♻️  Embeddings for all {len(rows)} images already cached")
+        return 0
+    first_path = {}
+    for row in rows:
+        first_path.setdefault(row['sha256'], os.path.join(data_path, row['path']))
+    print(f"🧮 Computing {len(missing)} new embeddings ({len(store)} cached)...")
+    embeddings = compute_embeddings(base_model, [first_path[h] for h in missing], img_size)
+    store.add(missing, embeddings)
+    return len(missing)
+
+
+def _head_dataset(store, rows, class_index, num_classes, training, seed):
+    features = store.get([row['sha256'] for row in rows])
+    labels = np.array([class_index[row['class']] for row in rows], dtype=np.int32)
+    dataset = tf.data.Dataset.from_tensor_slices((features, labels))
+    if training:
+        dataset = dataset.shuffle(len(rows), seed=seed, reshuffle_each_iteration=True)
+    return dataset.batch(HEAD_BATCH_SIZE).map(
+        lambda x, y: (tf.cast(x, tf.float32), tf.one_hot(y, num_classes))
+    ).prefetch(AUTOTUNE)
+
+
+def train_head_only(manifest, data_path, class_names, img_size,
+                    cache_dir=FEATURE_CACHE_DIR, epochs=HEAD_EPOCHS, seed=42, backbone=BACKBONE_NAME):
+    """
+    Train the classification head on cached embeddings of the frozen backbone
+    and return the full (backbone + trained head) model, compiled.
+    """
+    num_classes = len(class_names)
+    class_index = {name: i for i, name in enumerate(class_names)}
+    start = time.perf_counter()
+
+    base_model = build_backbone(img_size, backbone=backbone)
+    base_model.trainable = False
+    spec = BACKBONES[backbone]
+    store = FeatureStore(cache_dir, backbone_key(img_size, backbone, spec.pooling, spec.input_scale))
+    update_features(store, manifest, data_path, base_model, img_size)
+    print(f"   Embeddings ready in {time.perf_counter() - start:.1f}s")
+
+    train_rows = split_rows(manifest, 'train')
+    val_rows = split_rows(manifest, 'val')
+    head = build_head_model(base_model.output_shape[-1], num_classes)
+    head.compile(
+        optimizer=Adam(learning_rate=HEAD_LEARNING_RATE),
+        loss='categorical_crossentropy',
+        metrics=['accuracy']
+    )
+
+    fit_start = time.perf_counter()
+    head.fit(
+        _head_dataset(store, train_rows, class_index, num_classes, True, seed),
+        epochs=epochs,
+        validation_data=_head_dataset(store, val_rows, class_index, num_classes, False, seed),
+        callbacks=[EarlyStopping(monitor='val_loss', patience=3, restore_best_weights=True, verbose=1)],
+        verbose=2
+    )
+    print(f"   Head trained in {time.perf_counter() - fit_start:.1f}s")
+
+    model = attach_head(base_model, num_classes)
+    copy_head_weights(head, model)
+    model.compile(
+        optimizer=Adam(learning_rate=HEAD_LEARNING_RATE),
+        loss='categorical_crossentropy',
+        metrics=['accuracy']
+    )
+    return model
@@ -0,0 +1,121 @@
+"""
+Incremental Retraining Helpers
+Warm-start from the last saved model: keep its class order, widen the classifier for new
+classes, and train on the images it has not seen plus a replay sample of the ones it has
+"""
+
+import math
+import os
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.layers import Dense
+from tensorflow.keras.models import Model
+from model_factory import classifier_layer
+
+PREVIOUS_MODEL = 'plant_model_tf214.keras'
+CLASS_NAMES_PATH = 'class_names_new.txt'
+TRAINED_SUFFIX = '_trained.txt'   # content hashes of the images a saved model was trained on
+
+INCREMENTAL_EPOCHS = 3
+INCREMENTAL_LEARNING_RATE = 1e-5
+REPLAY_RATIO = 1.0                # replayed old images per new image
+REPLAY_MIN_PER_CLASS = 20
+
+
+def trained_record_path(model_path):
+    """plant_model_tf214.keras -> plant_model_tf214_trained.txt"""
+    return os.path.splitext(model_path)[0] + TRAINED_SUFFIX
+
+
+def read_trained_record(model_path):
+    """Set of content hashes the model was trained on, or None for a model saved without a record."""
+    path = trained_record_path(model_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return set(f.read().split())
+
+
+def write_trained_record(model_path, hashes):
+    path = trained_record_path(model_path)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        f.write('\n'.join(sorted(set(hashes))) + '\n')
+    os.replace(path + '.tmp', path)
+
+
+def read_class_names(path=CLASS_NAMES_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def merge_class_names(previous, current):
+    """
+    The previous model's classes in their original output order, then any new
+    class folders (sorted) appended. Classes whose folders disappeared keep
+    their output index.
+    """
+    known = set(previous)
+    return list(previous) + sorted(name for name in current if name not in known)
+
+
+def expand_classifier(model, num_classes):
+    """
+    The same model with its classifier widened to num_classes (and named
+    'predictions'). Existing class columns keep their weights; new ones start
+    from the layer's initializer with a bias equal to the mean existing bias.
+    """
+    predictions = classifier_layer(model)
+    kernel, bias = predictions.get_weights()
+    old_classes = kernel.shape[1]
+    if num_classes == old_classes:
+        return model
+
+    wider = Dense(num_classes, activation='softmax', dtype='float32', name='predictions')
+    outputs = wider(predictions.input)
+    new_kernel, new_bias = wider.get_weights()
+    new_kernel[:, :old_classes] = kernel
+    new_bias[:old_classes] = bias
+    new_bias[old_classes:] = bias.mean()
+    wider.set_weights([new_kernel, new_bias])
+    return Model(inputs=model.input, outputs=outputs)
+
+
+def select_training_rows(train_rows, trained_hashes, previous_classes, replay_ratio=REPLAY_RATIO,
+                         min_per_class=REPLAY_MIN_PER_CLASS, seed=42):
+    """
+    Split the train rows into (new rows, replay rows). New rows are images the
+    previous model was not trained on - or, without a trained record, every
+    image of a new class. The replay sample takes the same fraction of every
+    old class (at least min_per_class images each), deterministically per seed.
+    """
+    if trained_hashes is None:
+        previous = set(previous_classes)
+        is_new = [row['class'] not in previous for row in train_rows]
+    else:
+        is_new = [row['sha256'] not in trained_hashes for row in train_rows]
+    new_rows = [row for row, new in zip(train_rows, is_new) if new]
+    old_rows = [row for row, new in zip(train_rows, is_new) if not new]
+    if not new_rows or not old_rows:
+        return new_rows, []
+
+    fraction = min(1.0, replay_ratio * len(new_rows) / len(old_rows))
+    by_class = {}
+    for row in old_rows:
+        by_class.setdefault(row['class'], []).append(row)
+    rng = np.random.RandomState(seed)
+    replay_rows = []
+    for class_name in sorted(by_class):
+        rows = by_class[class_name]
+        count = min(len(rows), max(math.ceil(fraction * len(rows)), min_per_class))
+        replay_rows.extend(rows[i] for i in sorted(rng.choice(len(rows), count, replace=False)))
+    return new_rows, replay_rows
+
+
+def load_previous_model(model_path, num_classes):
+    """The last saved model, widened to num_classes outputs if new classes appeared."""
+    model = tf.keras.models.load_model(model_path, compile=False)
+    old_classes = model.output_shape[-1]
+    if num_classes < old_classes:
+        raise ValueError(f"{model_path} has {old_classes} outputs but only {num_classes} classes are known; "
+                         f"{CLASS_NAMES_PATH} must list the model's classes")
+    return expand_classifier(model, num_classes)
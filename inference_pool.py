@@ -0,0 +1,145 @@
+"""
+Multi-process TFLite Inference Pool
+One interpreter per worker process; batches fan out and results come back in order
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import time
+import numpy as np
+from batch_predict import DEFAULT_MODEL, TOP_K, ResultWriter, batch_results, list_images, top_k
+from label_table import load_label_table
+from tflite_runner import TFLiteRunner, output_size
+
+BATCH_SIZE = 16
+THREADS_PER_WORKER = 1
+
+# Model bytes read once in the parent. Forked workers inherit them copy-on-write,
+# so N workers share one read-only copy instead of each holding their own.
+_MODEL_BYTES = None
+
+# Per-process interpreter state, filled in by _init_worker
+_worker = {}
+
+
+def _read_model(model_path):
+    with open(model_path, 'rb') as f:
+        return f.read()
+
+
+def _init_worker(model_path, batch_size, num_threads):
+    model_content = _MODEL_BYTES if _MODEL_BYTES is not None else _read_model(model_path)
+    _worker['runner'] = TFLiteRunner(model_path, batch_size, num_threads, model_content)
+
+
+def _score_batch(task):
+    """Worker: decode and score one task's paths; returns top-k arrays and decode errors."""
+    batch_paths, k = task
+    runner = _worker['runner']
+    all_indices, all_scores, all_errors = [], [], {}
+    # Models stuck at batch 1 score the task in interpreter-sized chunks
+    for start in range(0, len(batch_paths), runner.batch_size):
+        scores, errors = runner.run_paths(batch_paths[start:start + runner.batch_size])
+        indices, top_scores = top_k(scores, k)
+        all_indices.append(indices)
+        all_scores.append(top_scores)
+        all_errors.update({start + i: error for i, error in errors.items()})
+    return batch_paths, np.concatenate(all_indices), np.concatenate(all_scores), all_errors
+
+
+class InferencePool:
+    """
+    Process pool with one TFLite interpreter per worker.
+    Uses fork where available so workers share the parent's model bytes;
+    with spawn (Windows) each worker reads the file itself.
+    """
+
+    def __init__(self, model_path, workers=None, batch_size=BATCH_SIZE, num_threads=THREADS_PER_WORKER):
+        global _MODEL_BYTES
+        self.workers = workers or os.cpu_count()
+        self.batch_size = batch_size
+        method = 'fork' if 'fork' in mp.get_all_start_methods() else 'spawn'
+        if method == 'fork':
+            _MODEL_BYTES = _read_model(model_path)
+        self._pool = mp.get_context(method).Pool(
+            self.workers, initializer=_init_worker, initargs=(model_path, batch_size, num_threads)
+        )
+
+    def predict(self, paths, labels, k=TOP_K):
+        """Yield one result dict per path, in input order."""
+        tasks = ((paths[start:start + self.batch_size], k) for start in range(0, len(paths), self.batch_size))
+        for batch_paths, indices, top_scores, errors in self._pool.imap(_score_batch, tasks):
+            yield from batch_results(batch_paths, indices, top_scores, errors, labels)
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def measure_scaling(model_path, paths, labels, max_workers, batch_size, num_threads):
+    """Images/sec for 1, 2, 4, ... max_workers workers (pool startup excluded)."""
+    counts = sorted({1, max_workers} | {2 ** i for i in range(1, max_workers.bit_length()) if 2 ** i < max_workers})
+    rows = []
+    for workers in counts:
+        with InferencePool(model_path, workers, batch_size, num_threads) as pool:
+            # Warm-up batch per worker so interpreter creation is not timed
+            list(pool.predict(paths[:batch_size * workers], labels))
+            start = time.perf_counter()
+            scored = sum('error' not in result for result in pool.predict(paths, labels))
+            elapsed = time.perf_counter() - start
+        rows.append((workers, scored / elapsed))
+
+    base = rows[0][1]
+    print(f"\n{'Workers':>8} {'Images/sec':>12} {'Speedup':>9} {'Efficiency':>11}")
+    print("-" * 43)
+    for workers, rate in rows:
+        print(f"{workers:>8} {rate:>12.1f} {rate / base:>8.2f}x {rate / base / workers * 100:>10.0f}%")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score leaf photos on a pool of TFLite worker processes")
+    parser.add_argument('inputs', nargs='+', help="image folders, image files or .txt file lists")
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--labels', help="label table or list (default: the table next to the model)")
+    parser.add_argument('--output', default='predictions.csv', help=".csv or .jsonl")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--threads', type=int, default=THREADS_PER_WORKER, help="interpreter threads per worker")
+    parser.add_argument('--top-k', type=int, default=TOP_K)
+    parser.add_argument('--scaling', action='store_true', help="report throughput from 1 to --workers workers")
+    args = parser.parse_args()
+
+    paths = list_images(args.inputs)
+    try:
+        labels = load_label_table(args.labels, args.model, output_size(args.model)).names
+    except ValueError as e:
+        print(f"❌ {e}")
+        exit(1)
+    print(f"📸 Found {len(paths)} images")
+
+    if args.scaling:
+        measure_scaling(args.model, paths, labels, args.workers, args.batch_size, args.threads)
+    else:
+        print(f"🧠 Starting {args.workers} workers x {args.threads} threads ({args.model})")
+        writer = ResultWriter(args.output, args.top_k)
+        start = time.perf_counter()
+        failed = 0
+        with InferencePool(args.model, args.workers, args.batch_size, args.threads) as pool:
+            for result in pool.predict(paths, labels, args.top_k):
+                writer.write(result)
+                failed += 'error' in result
+        writer.close()
+        elapsed = time.perf_counter() - start
+        scored = len(paths) - failed
+        print(f"\n✅ Scored {scored} images in {elapsed:.1f}s ({scored / elapsed:.1f} images/sec)")
+        if failed:
+            print(f"⚠️  {failed} images could not be decoded (see 'error' column)")
+        print(f"📄 Predictions written to {args.output}")
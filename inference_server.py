@@ -0,0 +1,365 @@
+"""
+Plant Disease Inference Server
+asyncio HTTP service that coalesces concurrent uploads into micro-batches for a
+pool of TFLite worker processes and answers like TFLiteModelHelper.predict
+"""
+
+import argparse
+import asyncio
+import collections
+import email
+import io
+import json
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+from batch_predict import DEFAULT_MODEL
+from label_table import load_label_table
+from prediction_cache import DB_MAX_MB, MEMORY_ENTRIES, PredictionCache, sha256_bytes
+from tflite_runner import TFLiteRunner, output_size
+
+HOST = '127.0.0.1'
+PORT = 8080
+MAX_BATCH_SIZE = 16
+MAX_WAIT_MS = 5            # how long the first request in a batch waits for company
+THREADS_PER_WORKER = 1
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+LATENCY_WINDOW = 10000     # recent requests kept for latency percentiles
+
+# Per-process model bytes and runners, filled in by _init_worker
+_worker = {}
+
+
+def _init_worker(model_path, max_batch_size, num_threads):
+    with open(model_path, 'rb') as f:
+        _worker.update(model_path=model_path, model_content=f.read(), num_threads=num_threads, runners={})
+    # Models with a hardcoded batch come back at batch 1; never ask them for more
+    _worker['max_batch_size'] = _runner(max_batch_size).batch_size
+    # Build every smaller size now, so no request waits for an interpreter to be created
+    for count in range(1, _worker['max_batch_size']):
+        _runner(_batch_size_for(count))
+
+
+def _runner(batch_size):
+    """This worker's runner for batch_size, created once and kept."""
+    runners = _worker['runners']
+    if batch_size not in runners:
+        runners[batch_size] = TFLiteRunner(_worker['model_path'], batch_size, _worker['num_threads'],
+                                           _worker['model_content'])
+    return runners[batch_size]
+
+
+def _batch_size_for(count):
+    """
+    Smallest power of two holding count images, capped at the maximum batch size.
+    A lone request then invokes at batch 1 rather than a padded full batch, while
+    each worker keeps at most five interpreters (1, 2, 4, 8, 16) instead of one per size.
+    """
+    size = 1
+    while size < count:
+        size *= 2
+    return min(size, _worker['max_batch_size'])
+
+
+def _model_info():
+    runner = _runner(_worker['max_batch_size'])
+    return {'batch_size': runner.batch_size, 'num_classes': runner.num_classes, 'img_size': runner.img_size}
+
+
+def _score_uploads(uploads):
+    """Worker: decode and score a batch of uploaded image bytes; returns a score vector or an error string each."""
+    max_batch_size = _worker['max_batch_size']
+    start = time.perf_counter()
+    results = []
+    for chunk_start in range(0, len(uploads), max_batch_size):
+        chunk = [io.BytesIO(data) for data in uploads[chunk_start:chunk_start + max_batch_size]]
+        scores, errors = _runner(_batch_size_for(len(chunk))).run_paths(chunk)
+        results.extend(errors[i] if i in errors else scores[i].copy() for i in range(len(chunk)))
+    return results, (time.perf_counter() - start) * 1000
+
+
+class ServerMetrics:
+    """Request latency percentiles, throughput and batch-size distribution."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.batch_sizes = collections.Counter()
+        self.latencies_ms = collections.deque(maxlen=window)
+        self.inference_ms = collections.deque(maxlen=window)
+
+    def record_request(self, latency_ms, ok):
+        self.requests += 1
+        self.errors += not ok
+        self.latencies_ms.append(latency_ms)
+
+    def record_batch(self, size, inference_ms):
+        self.batches += 1
+        self.batch_sizes[size] += 1
+        self.inference_ms.append(inference_ms)
+
+    def snapshot(self):
+        uptime = time.perf_counter() - self.started
+        latencies = np.array(self.latencies_ms) if self.latencies_ms else np.zeros(1)
+        images = sum(size * count for size, count in self.batch_sizes.items())
+        return {
+            'uptime_s': uptime,
+            'requests': self.requests,
+            'errors': self.errors,
+            'throughput_rps': self.requests / uptime if uptime > 0 else 0.0,
+            'latency_p50_ms': float(np.percentile(latencies, 50)),
+            'latency_p95_ms': float(np.percentile(latencies, 95)),
+            'latency_p99_ms': float(np.percentile(latencies, 99)),
+            'batches': self.batches,
+            'mean_batch_size': images / self.batches if self.batches else 0.0,
+            'batch_size_histogram': {str(size): count for size, count in sorted(self.batch_sizes.items())},
+            'mean_batch_inference_ms': float(np.mean(self.inference_ms)) if self.inference_ms else 0.0,
+        }
+
+
+class MicroBatcher:
+    """
+    Collects queued uploads into batches of up to max_batch_size, waiting at most
+    max_wait_ms after the first one, and keeps at most one batch per worker in flight.
+    """
+
+    def __init__(self, executor, workers, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS, metrics=None):
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.metrics = metrics or ServerMetrics()
+        self.queue = asyncio.Queue()
+        self.slots = asyncio.Semaphore(workers)
+        self._in_flight = set()     # strong references so dispatch tasks are not garbage-collected
+
+    async def submit(self, data):
+        """Score one upload; returns its score vector or raises ValueError if it cannot be decoded."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((data, future))
+        result = await future
+        if isinstance(result, str):
+            raise ValueError(result)
+        return result
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Wait for a free worker first, so requests pile up into fuller batches under load
+            await self.slots.acquire()
+            items = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(items) < self.max_batch_size:
+                if not self.queue.empty():
+                    items.append(self.queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            task = loop.create_task(self._dispatch(items))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _dispatch(self, items):
+        try:
+            results, inference_ms = await asyncio.get_running_loop().run_in_executor(
+                self.executor, _score_uploads, [data for data, _ in items])
+            self.metrics.record_batch(len(items), inference_ms)
+            for (_, future), result in zip(items, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self.slots.release()
+
+
+def extract_upload(body, content_type):
+    """Image bytes from a raw body or the first file part of a multipart/form-data upload."""
+    if not content_type.lower().startswith('multipart/form-data'):
+        return body
+    message = email.message_from_bytes(f'Content-Type: {content_type}\r\n\r\n'.encode('latin-1') + body)
+    for part in message.walk():
+        if part.get_filename() or part.get_param('name', header='content-disposition'):
+            payload = part.get_payload(decode=True)
+            if payload:
+                return payload
+    return b''
+
+
+class InferenceServer:
+    """
+    POST /predict  image bytes (raw body or multipart "image" field)
+    GET  /metrics  latency, throughput and batching statistics
+    GET  /health   model and label summary
+    """
+
+    def __init__(self, model_path, label_table, workers, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS,
+                 num_threads=THREADS_PER_WORKER, cache=None):
+        self.model_path = model_path
+        self.cache = cache
+        self.labels = label_table
+        self.workers = workers
+        self.metrics = ServerMetrics()
+        self.executor = ProcessPoolExecutor(workers, mp_context=mp.get_context('spawn'), initializer=_init_worker,
+                                            initargs=(model_path, max_batch_size, num_threads))
+        self.batcher = MicroBatcher(self.executor, workers, max_batch_size, max_wait_ms, self.metrics)
+        # Hashing and SQLite lookups block, so they run on one thread off the event loop
+        self.cache_thread = ThreadPoolExecutor(1, thread_name_prefix='prediction-cache') if cache else None
+        self.model_info = None
+
+    async def start(self, host=HOST, port=PORT):
+        self.model_info = await asyncio.get_running_loop().run_in_executor(self.executor, _model_info)
+        self._batcher_task = asyncio.create_task(self.batcher.run())
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+    def close(self):
+        self._batcher_task.cancel()
+        self.executor.shutdown(cancel_futures=True)
+        if self.cache is not None:
+            self.cache_thread.shutdown()    # waits for pending stores before the database closes
+            self.cache.close()
+
+    def _lookup(self, data):
+        """Cache thread: (image key, cached scores or None)."""
+        key = sha256_bytes(data)
+        return key, self.cache.get_many([key]).get(key)
+
+    async def predict(self, data):
+        loop = asyncio.get_running_loop()
+        try:
+            key, scores = None, None
+            if self.cache is not None:
+                key, scores = await loop.run_in_executor(self.cache_thread, self._lookup, data)
+            if scores is None:
+                scores = await self.batcher.submit(data)
+                if key is not None:
+                    # Stored in the background: the response does not wait for the SQLite commit
+                    loop.run_in_executor(self.cache_thread, self.cache.put_many, {key: scores})
+        except ValueError as e:
+            return 400, {'success': False, 'error': f"Could not decode image: {e}"}
+        except Exception as e:
+            return 500, {'success': False, 'error': f"Inference failed: {e}"}
+        index = int(np.argmax(scores))
+        result = self.labels.describe(index)
+        result.update(confidence=float(scores[index]), success=True, label=self.labels.names[index], index=index)
+        return 200, result
+
+    async def _route(self, method, target, headers, body):
+        path = target.split('?', 1)[0]
+        if method == 'POST' and path == '/predict':
+            data = extract_upload(body, headers.get('content-type', ''))
+            if not data:
+                return 400, {'success': False, 'error': "Empty upload"}
+            start = time.perf_counter()
+            status, result = await self.predict(data)
+            self.metrics.record_request((time.perf_counter() - start) * 1000, status == 200)
+            return status, result
+        if method == 'GET' and path == '/metrics':
+            metrics = self.metrics.snapshot()
+            if self.cache is not None:
+                metrics['cache'] = self.cache.stats()
+            return 200, metrics
+        if method == 'GET' and path == '/health':
+            return 200, {'model': self.model_path, 'labels': len(self.labels), 'workers': self.workers,
+                         **self.model_info}
+        return 404, {'success': False, 'error': f"No route for {method} {path}"}
+
+    async def _handle_connection(self, reader, writer):
+        """Minimal HTTP/1.1 with keep-alive: one request at a time per connection."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_UPLOAD_BYTES:
+                    self._respond(writer, 413, {'success': False, 'error': "Upload too large"}, keep_alive=False)
+                    await writer.drain()
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                status, payload = await self._route(method, target, headers, body)
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                self._respond(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _respond(writer, status, payload, keep_alive):
+        reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 413: 'Payload Too Large',
+                  500: 'Internal Server Error'}[status]
+        body = json.dumps(payload).encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + body
+        )
+
+
+async def serve(args):
+    cache = None
+    if args.cache_entries > 0 or args.cache_db:
+        cache = PredictionCache(args.model, args.cache_entries, args.cache_db, args.cache_db_mb)
+    try:
+        labels = load_label_table(args.labels, args.model, output_size(args.model))
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    server = InferenceServer(args.model, labels, args.workers, args.max_batch_size,
+                             args.max_wait_ms, args.threads, cache)
+    listener = await server.start(args.host, args.port)
+    print(f"🌐 Serving {args.model} on http://{args.host}:{args.port} "
+          f"({args.workers} workers, batch <= {args.max_batch_size}, wait <= {args.max_wait_ms} ms)")
+    print("   POST /predict, GET /metrics, GET /health")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve leaf-disease predictions over HTTP with micro-batching")
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--labels', help="label table or list (default: the table next to the model)")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--max-batch-size', type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT_MS)
+    parser.add_argument('--threads', type=int, default=THREADS_PER_WORKER, help="interpreter threads per worker")
+    parser.add_argument('--cache-entries', type=int, default=MEMORY_ENTRIES,
+                        help="in-memory prediction cache size (0 disables)")
+    parser.add_argument('--cache-db', help="SQLite prediction cache shared across restarts")
+    parser.add_argument('--cache-db-mb', type=float, default=DB_MAX_MB)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("\n👋 Server stopped")
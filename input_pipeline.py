@@ -0,0 +1,222 @@
+"""
+tf.data Input Pipeline for PlantVillage Retraining
+Parallel JPEG decode, on-graph batch augmentation and AUTOTUNE prefetching
+"""
+
+import math
+import os
+import time
+import numpy as np
+import tensorflow as tf
+
+AUTOTUNE = tf.data.AUTOTUNE
+
+# Augmentation settings - same values the ImageDataGenerator used
+ROTATION_RANGE = 20        # degrees
+WIDTH_SHIFT_RANGE = 0.2    # fraction of image width
+HEIGHT_SHIFT_RANGE = 0.2   # fraction of image height
+SHEAR_RANGE = 0.2          # degrees (Keras convention)
+ZOOM_RANGE = 0.2
+HORIZONTAL_FLIP = True
+
+
+def paths_and_labels(rows, data_path, class_names):
+    """Absolute image paths and integer labels for a list of manifest rows."""
+    class_index = {name: i for i, name in enumerate(class_names)}
+    paths = [os.path.join(data_path, row['path']) for row in rows]
+    labels = [class_index[row['class']] for row in rows]
+    return paths, labels
+
+
+def decode_and_resize(path, img_height, img_width):
+    """Read one image file and return a uint8 (H, W, 3) tensor."""
+    image = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+    image = tf.image.resize(image, (img_height, img_width), method='bilinear')
+    return tf.cast(tf.round(tf.clip_by_value(image, 0.0, 255.0)), tf.uint8)
+
+
+def _affine_transforms(batch_size, img_height, img_width, seed):
+    """
+    Per-image projective transforms (output -> input pixel mapping) combining
+    rotation, shift, shear, zoom and horizontal flip around the image centre.
+    """
+    seeds = tf.random.experimental.stateless_split(seed, 7)
+
+    def uniform(i, low, high):
+        return tf.random.stateless_uniform([batch_size], seed=seeds[i], minval=low, maxval=high)
+
+    deg = math.pi / 180.0
+    theta = uniform(0, -ROTATION_RANGE, ROTATION_RANGE) * deg
+    tx = uniform(1, -WIDTH_SHIFT_RANGE, WIDTH_SHIFT_RANGE) * img_width
+    ty = uniform(2, -HEIGHT_SHIFT_RANGE, HEIGHT_SHIFT_RANGE) * img_height
+    shear = uniform(3, -SHEAR_RANGE, SHEAR_RANGE) * deg
+    zx = uniform(4, 1.0 - ZOOM_RANGE, 1.0 + ZOOM_RANGE)
+    zy = uniform(5, 1.0 - ZOOM_RANGE, 1.0 + ZOOM_RANGE)
+    if HORIZONTAL_FLIP:
+        zx = tf.where(uniform(6, 0.0, 1.0) < 0.5, -zx, zx)
+
+    zeros = tf.zeros_like(theta)
+    ones = tf.ones_like(theta)
+
+    def matrices(*entries):
+        return tf.reshape(tf.stack(entries, axis=1), [-1, 3, 3])
+
+    rotation = matrices(tf.cos(theta), -tf.sin(theta), zeros,
+                        tf.sin(theta), tf.cos(theta), zeros,
+                        zeros, zeros, ones)
+    shift = matrices(ones, zeros, tx,
+                     zeros, ones, ty,
+                     zeros, zeros, ones)
+    shearing = matrices(ones, -tf.sin(shear), zeros,
+                        zeros, tf.cos(shear), zeros,
+                        zeros, zeros, ones)
+    zoom = matrices(zx, zeros, zeros,
+                    zeros, zy, zeros,
+                    zeros, zeros, ones)
+
+    cx = (img_width - 1) / 2.0
+    cy = (img_height - 1) / 2.0
+    to_center = matrices(ones, zeros, cx * ones, zeros, ones, cy * ones, zeros, zeros, ones)
+    from_center = matrices(ones, zeros, -cx * ones, zeros, ones, -cy * ones, zeros, zeros, ones)
+
+    transform = to_center @ rotation @ shift @ shearing @ zoom @ from_center
+    return tf.reshape(transform, [-1, 9])[:, :8]
+
+
+def augment_batch(images, seed):
+    """Random affine augmentation of a float32 (B, H, W, 3) batch in a single op."""
+    shape = tf.shape(images)
+    img_height, img_width = images.shape[1], images.shape[2]
+    transforms = _affine_transforms(shape[0], img_height, img_width, seed)
+    return tf.raw_ops.ImageProjectiveTransformV3(
+        images=images,
+        transforms=transforms,
+        output_shape=[img_height, img_width],
+        fill_value=0.0,
+        interpolation='BILINEAR',
+        fill_mode='NEAREST'
+    )
+
+
+def batch_pipeline(dataset, num_classes, training, seed):
+    """
+    Finish a dataset of batched (uint8 images, int labels): augment when
+    training, rescale to [0, 1], one-hot the labels and prefetch.
+    Training batches also carry their position in the sample stream, which
+    seeds their augmentation so a resumed run repeats it exactly.
+    """
+    if training:
+        dataset = dataset.map(
+            lambda images, labels, position: (
+                augment_batch(tf.cast(images, tf.float32), tf.stack([tf.constant(seed, tf.int64), position])),
+                labels
+            ),
+            num_parallel_calls=AUTOTUNE
+        )
+    dataset = dataset.map(
+        lambda images, labels: (tf.cast(images, tf.float32) / 255.0, tf.one_hot(labels, num_classes)),
+        num_parallel_calls=AUTOTUNE
+    )
+    options = tf.data.Options()
+    options.deterministic = True
+    # Multi-worker training shards by element: file sharding does not apply to these sources
+    options.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.DATA
+    return dataset.with_options(options).prefetch(AUTOTUNE)
+
+
+def epoch_order(num_samples, batch_size, seed, start_epoch=0, start_step=0):
+    """
+    Generator factory for a training order that depends only on the epoch:
+    each call yields (sample index, stream position) for one epoch, shuffled
+    by RandomState(seed + epoch). Calls walk through the epochs from
+    start_epoch; with start_step, every call is instead the rest of
+    start_epoch after the start_step batches already trained on.
+    """
+    epoch = [start_epoch]
+
+    def generate():
+        order = np.random.RandomState(seed + epoch[0]).permutation(num_samples)
+        first_position = epoch[0] * num_samples
+        if not start_step:
+            epoch[0] += 1
+        for offset in range(start_step * batch_size, num_samples):
+            yield order[offset], first_position + offset
+
+    return generate
+
+
+def make_dataset(paths, labels, num_classes, batch_size, img_size, training=False, seed=42,
+                 start_epoch=0, start_step=0):
+    """
+    Build a tf.data pipeline over image files.
+    Training datasets are reshuffled every epoch and augmented; the order and
+    augmentations are fully determined by `seed` and the epoch. Training
+    starts at start_epoch; with start_step the dataset is just the rest of
+    that epoch, for finishing an interrupted one.
+    """
+    img_height, img_width = img_size
+    if training:
+        all_paths = tf.constant(paths)
+        all_labels = tf.constant(labels, dtype=tf.int32)
+        dataset = tf.data.Dataset.from_generator(
+            epoch_order(len(paths), batch_size, seed, start_epoch, start_step),
+            output_signature=(tf.TensorSpec(shape=(), dtype=tf.int64), tf.TensorSpec(shape=(), dtype=tf.int64))
+        )
+        dataset = dataset.map(
+            lambda index, position: (decode_and_resize(tf.gather(all_paths, index), img_height, img_width),
+                                     tf.gather(all_labels, index), position),
+            num_parallel_calls=AUTOTUNE
+        )
+        dataset = dataset.batch(batch_size).map(lambda images, labels, positions: (images, labels, positions[0]))
+        # Every pass has the same length, so Keras knows the epoch length up front
+        num_batches = math.ceil(len(paths) / batch_size) - start_step
+        dataset = dataset.apply(tf.data.experimental.assert_cardinality(num_batches))
+    else:
+        dataset = tf.data.Dataset.from_tensor_slices((paths, labels))
+        dataset = dataset.map(
+            lambda path, label: (decode_and_resize(path, img_height, img_width), label),
+            num_parallel_calls=AUTOTUNE
+        )
+        dataset = dataset.batch(batch_size)
+    return batch_pipeline(dataset, num_classes, training, seed)
+
+
+class ThroughputCallback(tf.keras.callbacks.Callback):
+    """
+    Reports training images/second at the end of each epoch. With batch_size,
+    an epoch resumed part-way counts only the batches it actually ran.
+    """
+
+    def __init__(self, num_samples, batch_size=None):
+        super().__init__()
+        self.num_samples = num_samples
+        self.batch_size = batch_size
+        self._epoch_start = None
+        self._train_end = None
+        self._batches = 0
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._epoch_start = time.perf_counter()
+        self._train_end = None
+        self._batches = 0
+
+    def on_train_batch_end(self, batch, logs=None):
+        self._batches += 1
+
+    def on_test_begin(self, logs=None):
+        # Validation runs inside the epoch; exclude it from the training rate
+        if self._epoch_start is not None and self._train_end is None:
+            self._train_end = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        train_end = self._train_end or time.perf_counter()
+        elapsed = train_end - self._epoch_start
+        num_images = self.num_samples
+        if self.batch_size:
+            skipped_batches = max(math.ceil(self.num_samples / self.batch_size) - self._batches, 0)
+            num_images = max(self.num_samples - skipped_batches * self.batch_size, 0)
+        images_per_sec = num_images / elapsed if elapsed > 0 else 0.0
+        if logs is not None:
+            logs['images_per_sec'] = images_per_sec
+        print(f"\n⚡ Epoch {epoch + 1}: {num_images} images in {elapsed:.1f}s "
+              f"→ {images_per_sec:.1f} images/sec")
@@ -0,0 +1,198 @@
+"""
+Label Metadata Table
+Parses plant_labels.txt / class_names.txt once, the way TFLiteModelHelper.java does,
+into a versioned JSON table shipped next to the model for O(1) lookups
+"""
+
+import argparse
+import hashlib
+import json
+import os
+
+LABEL_TABLE_VERSION = 1
+DEFAULT_LABELS = 'class_names.txt'      # 39 labels, matches CNN_PV_model.tflite
+BACKGROUND_CLASS = 'Background_without_leaves'
+TABLE_SUFFIX = '_labels.json'
+
+# Multi-word plant names in plant_labels.txt, as special-cased in TFLiteModelHelper.java:
+# (label prefix, plantType reported for diseased leaves)
+PLANT_PREFIXES = (
+    ('corn maize', 'corn maize'),
+    ('cherry including sour', 'cherry'),
+    ('pepper bell', 'pepper bell'),
+)
+
+
+def read_lines(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def capitalize_words(text):
+    return ' '.join(word[:1].upper() + word[1:].lower() for word in text.split(' '))
+
+
+def flatten_class_name(class_name):
+    """'Pepper,_bell___healthy' -> 'pepper bell healthy' (the plant_labels.txt form)."""
+    return ' '.join(''.join(c if c.isalnum() else ' ' for c in class_name).lower().split())
+
+
+def parse_label(label):
+    """
+    plantType / condition / isHealthy for one plant_labels.txt label, exactly as
+    TFLiteModelHelper.predict derives them.
+    """
+    label = label.strip()
+    is_healthy = 'healthy' in label.lower()
+    if is_healthy:
+        plant_type, condition = label.lower().replace('healthy', '').strip(), 'Healthy'
+    else:
+        for prefix, plant in PLANT_PREFIXES:
+            if label.startswith(prefix):
+                plant_type, condition = plant, label[len(prefix):].strip()
+                break
+        else:
+            words = label.split(' ')
+            plant_type, condition = words[0], ' '.join(words[1:])
+    return {
+        'plantType': capitalize_words(plant_type),
+        'condition': capitalize_words(condition),
+        'isHealthy': is_healthy,
+    }
+
+
+def _entry(index, class_name, label):
+    if class_name == BACKGROUND_CLASS:
+        parsed = {'plantType': '', 'condition': 'No Leaf Detected', 'isHealthy': False}
+    else:
+        parsed = parse_label(label)
+    display = f"{parsed['plantType']} - {parsed['condition']}" if parsed['plantType'] else parsed['condition']
+    return {'index': index, 'class_name': class_name, 'label': label, **parsed,
+            'isBackground': class_name == BACKGROUND_CLASS, 'displayName': display}
+
+
+def build_label_table(class_names_path=None, plant_labels_path=None):
+    """
+    Table entries in model output order. class_names.txt (which may include the
+    Background_without_leaves class) fixes the order; plant_labels.txt supplies the
+    Java-style label text for every other class, in the same order.
+    """
+    if class_names_path is None and plant_labels_path is None:
+        raise ValueError("need class_names.txt, plant_labels.txt or both")
+
+    class_names = read_lines(class_names_path) if class_names_path else None
+    plant_labels = read_lines(plant_labels_path) if plant_labels_path else None
+    if class_names is None:
+        class_names = plant_labels
+    leaf_classes = [name for name in class_names if name != BACKGROUND_CLASS]
+    if plant_labels is None:
+        plant_labels = [flatten_class_name(name) for name in leaf_classes]
+    elif len(plant_labels) != len(leaf_classes):
+        raise ValueError(f"{plant_labels_path} has {len(plant_labels)} labels but {class_names_path} "
+                         f"has {len(leaf_classes)} leaf classes")
+
+    labels = iter(plant_labels)
+    entries = [_entry(i, name, '' if name == BACKGROUND_CLASS else next(labels))
+               for i, name in enumerate(class_names)]
+
+    digest = hashlib.sha256()
+    for path in (class_names_path, plant_labels_path):
+        if path:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return {
+        'version': LABEL_TABLE_VERSION,
+        'source_sha256': digest.hexdigest(),
+        'sources': [os.path.basename(p) for p in (class_names_path, plant_labels_path) if p],
+        'num_classes': len(entries),
+        'entries': entries,
+    }
+
+
+def table_path_for(model_path):
+    """Where the table for a model lives: CNN_PV_model.tflite -> CNN_PV_model_labels.json."""
+    return os.path.splitext(model_path)[0] + TABLE_SUFFIX
+
+
+class LabelTable:
+    """Index -> entry lookups, checked against the model's output count when loaded."""
+
+    def __init__(self, table, num_outputs=None):
+        entries = table['entries']
+        if num_outputs is not None and num_outputs != len(entries):
+            background = [e for e in entries if e['isBackground']]
+            if background and num_outputs == len(entries) - len(background):
+                # 38-output model with a 39-class table: same order without the background class
+                entries = [dict(e, index=i) for i, e in enumerate(e for e in entries if not e['isBackground'])]
+            else:
+                hint = (f" (the model likely includes '{BACKGROUND_CLASS}'; use class_names.txt)"
+                        if num_outputs == len(entries) + 1 else "")
+                raise ValueError(f"Model has {num_outputs} outputs but the label table has "
+                                 f"{len(entries)} classes{hint}")
+        self.version = table.get('version')
+        self.entries = entries
+        self.names = [e['class_name'] for e in entries]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, index):
+        return self.entries[index]
+
+    def describe(self, index):
+        """The plantType / condition / isHealthy fields TFLiteModelHelper.predict returns."""
+        entry = self.entries[index]
+        return {'plantType': entry['plantType'], 'condition': entry['condition'], 'isHealthy': entry['isHealthy']}
+
+
+def load_label_table(labels_path=None, model_path=None, num_outputs=None):
+    """
+    Load a label table, checked against num_outputs. Uses labels_path (.json table
+    or a .txt label list), else the table shipped next to the model, else DEFAULT_LABELS.
+    Raises ValueError on a class-count mismatch.
+    """
+    if labels_path is None:
+        labels_path = table_path_for(model_path) if model_path else DEFAULT_LABELS
+        if not os.path.exists(labels_path):
+            labels_path = DEFAULT_LABELS
+    if labels_path.lower().endswith('.json'):
+        with open(labels_path, 'r', encoding='utf-8') as f:
+            table = json.load(f)
+        if table.get('version') != LABEL_TABLE_VERSION:
+            raise ValueError(f"{labels_path} is label table version {table.get('version')}, "
+                             f"expected {LABEL_TABLE_VERSION}; rebuild it with label_table.py")
+    else:
+        lines = read_lines(labels_path)
+        # class_names.txt style names carry underscores; plant_labels.txt is plain words
+        if any('_' in line for line in lines):
+            table = build_label_table(class_names_path=labels_path)
+        else:
+            table = build_label_table(plant_labels_path=labels_path)
+    return LabelTable(table, num_outputs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the label metadata table shipped next to a model")
+    parser.add_argument('--class-names', default='class_names.txt')
+    parser.add_argument('--plant-labels', default='plant_labels.txt')
+    parser.add_argument('--model', help=".tflite model: checks its output count and names the table after it")
+    parser.add_argument('--output', help=f"default: <model>{TABLE_SUFFIX}")
+    args = parser.parse_args()
+
+    table = build_label_table(args.class_names, args.plant_labels)
+    print(f"📋 {table['num_classes']} classes from {', '.join(table['sources'])}")
+
+    if args.model:
+        from tflite_runner import output_size
+        num_outputs = output_size(args.model)
+        try:
+            LabelTable(table, num_outputs)
+        except ValueError as e:
+            print(f"❌ {e}")
+            exit(1)
+        print(f"✅ Matches {args.model} ({num_outputs} outputs)")
+
+    output = args.output or (table_path_for(args.model) if args.model else 'labels.json')
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(table, f, indent=2)
+    print(f"📄 Label table written to {output}")
@@ -0,0 +1,167 @@
+"""
+Load Generator for the Inference Server
+Replays leaf photos against POST /predict at several concurrency levels and reports
+throughput, latency percentiles and the server's batching statistics.
+Every request uploads a distinct image, so this measures the uncached inference path
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import time
+import numpy as np
+from PIL import Image
+from dataset_manifest import IMAGE_EXTENSIONS
+from inference_server import HOST, PORT
+
+CONCURRENCY_LEVELS = '1,4,16,64'
+REQUESTS_PER_LEVEL = 500
+SYNTHETIC_IMAGES = 32
+
+
+def load_payloads(image_dir, num_images=SYNTHETIC_IMAGES, seed=0):
+    """JPEG bytes of every image in image_dir, or seeded random JPEGs when none is given."""
+    if image_dir:
+        paths = []
+        for root, dirs, files in os.walk(image_dir):
+            dirs.sort()
+            paths.extend(os.path.join(root, f) for f in sorted(files) if f.lower().endswith(IMAGE_EXTENSIONS))
+        payloads = []
+        for path in paths:
+            with open(path, 'rb') as f:
+                payloads.append(f.read())
+        return payloads
+
+    rng = np.random.RandomState(seed)
+    payloads = []
+    for _ in range(num_images):
+        buffer = io.BytesIO()
+        Image.fromarray(rng.randint(0, 256, (256, 256, 3), dtype=np.uint8)).save(buffer, format='JPEG')
+        payloads.append(buffer.getvalue())
+    return payloads
+
+
+def unique_payload(payloads, number, run_id):
+    """
+    Request `number` of this run: a source image with the run id and request number appended
+    after its last byte. Decoders stop at the image's end marker (JPEG EOI, PNG IEND), so the
+    server scores unchanged pixels, but every upload hashes differently and misses the cache.
+    """
+    return payloads[number % len(payloads)] + f"\0load-test {run_id} {number}".encode('ascii')
+
+
+async def request(reader, writer, host, method, path, body=b''):
+    """One HTTP/1.1 keep-alive request; returns (status, parsed JSON body)."""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/octet-stream\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def fetch(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        return (await request(reader, writer, host, 'GET', path))[1]
+    finally:
+        writer.close()
+
+
+async def run_level(host, port, payloads, concurrency, num_requests, run_id, first_request=0):
+    """
+    num_requests distinct uploads, numbered from first_request, spread over `concurrency`
+    keep-alive connections.
+    """
+    latencies, errors = [], 0
+    next_request = iter(range(num_requests))
+
+    async def client():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for i in next_request:
+                start = time.perf_counter()
+                body = unique_payload(payloads, first_request + i, run_id)
+                status, _ = await request(reader, writer, host, 'POST', '/predict', body)
+                latencies.append((time.perf_counter() - start) * 1000)
+                errors += status != 200
+        finally:
+            writer.close()
+
+    before = await fetch(host, port, '/metrics')
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    after = await fetch(host, port, '/metrics')
+
+    batches = after['batches'] - before['batches']
+    cache_hits = 0
+    if 'cache' in after:
+        cache_hits = sum(after['cache'][k] - before['cache'][k] for k in ('memory_hits', 'disk_hits'))
+    batched_images = sum(int(size) * (count - before['batch_size_histogram'].get(size, 0))
+                         for size, count in after['batch_size_histogram'].items())
+    return {
+        'concurrency': concurrency,
+        'requests': num_requests,
+        'errors': errors,
+        'throughput_rps': num_requests / elapsed,
+        'latency_p50_ms': float(np.percentile(latencies, 50)),
+        'latency_p95_ms': float(np.percentile(latencies, 95)),
+        'latency_p99_ms': float(np.percentile(latencies, 99)),
+        'mean_batch_size': batched_images / batches if batches else 0.0,
+        'cache_hits': cache_hits,
+    }
+
+
+async def main(args):
+    levels = [int(c) for c in args.concurrency.split(',')]
+    health = await fetch(args.host, args.port, '/health')
+    print(f"🎯 {args.host}:{args.port} serving {health['model']} with {health['workers']} workers")
+    payloads = load_payloads(args.images)
+    # A fresh run id keeps uploads distinct from earlier runs against the same server too
+    run_id = os.urandom(8).hex()
+    print(f"📸 {len(payloads)} source images, {args.requests} distinct uploads per level")
+
+    rows = []
+    for n, concurrency in enumerate(levels):
+        # Requests are numbered across levels: a repeat from an earlier level would be a cache hit
+        rows.append(await run_level(args.host, args.port, payloads, concurrency, args.requests, run_id,
+                                    n * args.requests))
+
+    print(f"\n{'Clients':>8} {'Req/s':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'Batch':>7} {'Errors':>7} {'Hits':>6}")
+    print("-" * 71)
+    for r in rows:
+        print(f"{r['concurrency']:>8} {r['throughput_rps']:>9.1f} {r['latency_p50_ms']:>7.1f}ms "
+              f"{r['latency_p95_ms']:>7.1f}ms {r['latency_p99_ms']:>7.1f}ms {r['mean_batch_size']:>7.1f} "
+              f"{r['errors']:>7} {r['cache_hits']:>6}")
+    if any(r['cache_hits'] for r in rows):
+        print("⚠️  Some requests were answered from the prediction cache; restart the server "
+              "with --cache-entries 0 for uncached numbers")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'server': health, 'levels': rows}, f, indent=2)
+        print(f"📄 Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the inference server")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--images', help="folder of leaf photos (default: random JPEGs)")
+    parser.add_argument('--concurrency', default=CONCURRENCY_LEVELS, help="comma-separated client counts")
+    parser.add_argument('--requests', type=int, default=REQUESTS_PER_LEVEL, help="requests per concurrency level")
+    parser.add_argument('--output', help="optional JSON report path")
+    asyncio.run(main(parser.parse_args()))
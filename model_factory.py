@@ -0,0 +1,156 @@
+"""
+PlantVillage Model Definition
+Selectable ImageNet backbone (EfficientNetB5 by default) plus the dense classification
+head used for retraining
+"""
+
+import collections
+from tensorflow.keras import applications
+from tensorflow.keras.models import Model
+from tensorflow.keras.layers import BatchNormalization, Dense, Dropout, Input, Rescaling
+from tensorflow.keras.regularizers import l2
+
+BACKBONE_NAME = 'efficientnetb5'
+BACKBONE_POOLING = 'max'
+
+# Head layers in order; names let head weights move between models
+HEAD_LAYER_NAMES = ['head_dense', 'head_dropout', 'head_dense_1', 'head_dropout_1', 'predictions']
+
+# Backbone layer-name prefixes from the top of the network down, unfrozen in this order
+BACKBONE_BLOCKS = ('top', 'block7', 'block6', 'block5', 'block4', 'block3', 'block2', 'block1', 'stem')
+
+
+def mobilenet_v3_blocks(num_blocks):
+    """
+    MobileNetV3 layer-name prefixes, top down: the last 1x1 conv, each inverted
+    residual block, then the stem. Names are matched lowercased with '/' as '_',
+    so Keras 2 ('expanded_conv_3/expand') and Keras 3 ('expanded_conv_3_expand') agree.
+    """
+    blocks = [f"expanded_conv_{i}_" for i in range(num_blocks, 0, -1)]
+    # the unnumbered first block and the stem conv are the last groups, when everything else already trains
+    return tuple(['conv_1'] + blocks + ['expanded_conv_', 'conv'])
+
+
+# source: a tf.keras.applications constructor, or a TF Hub feature-vector URL (needs tensorflow_hub);
+# blocks: unfreezing order as above; pooling: how the backbone reduces to one feature vector;
+# input_scale: turns the models' [0, 1] input into the range the backbone expects. keras.applications
+# EfficientNet and MobileNetV3 rescale [0, 255] pixels themselves; the Hub models take [0, 1]
+Backbone = collections.namedtuple('Backbone', ['source', 'blocks', 'pooling', 'input_scale'])
+EFFICIENTNET_LITE_URL = 'https://tfhub.dev/tensorflow/efficientnet/{}/feature-vector/2'
+BACKBONES = {
+    'mobilenetv3small': Backbone('MobileNetV3Small', mobilenet_v3_blocks(10), 'max', 255.0),
+    'mobilenetv3large': Backbone('MobileNetV3Large', mobilenet_v3_blocks(14), 'max', 255.0),
+    'efficientnetb0': Backbone('EfficientNetB0', BACKBONE_BLOCKS, 'max', 255.0),
+    'efficientnetb1': Backbone('EfficientNetB1', BACKBONE_BLOCKS, 'max', 255.0),
+    'efficientnetb2': Backbone('EfficientNetB2', BACKBONE_BLOCKS, 'max', 255.0),
+    'efficientnetb3': Backbone('EfficientNetB3', BACKBONE_BLOCKS, 'max', 255.0),
+    'efficientnetb5': Backbone('EfficientNetB5', BACKBONE_BLOCKS, BACKBONE_POOLING, 255.0),
+    # EfficientNet-Lite is not in keras.applications; the Hub models are one opaque
+    # layer (so unfreezing is all or nothing) and come average-pooled
+    'efficientnet-lite0': Backbone(EFFICIENTNET_LITE_URL.format('lite0'), ('efficientnet_lite',), 'avg', 1.0),
+    'efficientnet-lite1': Backbone(EFFICIENTNET_LITE_URL.format('lite1'), ('efficientnet_lite',), 'avg', 1.0),
+    'efficientnet-lite2': Backbone(EFFICIENTNET_LITE_URL.format('lite2'), ('efficientnet_lite',), 'avg', 1.0),
+    'efficientnet-lite3': Backbone(EFFICIENTNET_LITE_URL.format('lite3'), ('efficientnet_lite',), 'avg', 1.0),
+    'efficientnet-lite4': Backbone(EFFICIENTNET_LITE_URL.format('lite4'), ('efficientnet_lite',), 'avg', 1.0),
+}
+
+
+def _hub_backbone(url, name, img_size):
+    """A TF Hub feature-vector model wrapped as a Keras backbone (always pretrained)."""
+    try:
+        import tensorflow_hub as hub
+    except ImportError:
+        raise ImportError(f"the {name} backbone needs tensorflow_hub: pip install tensorflow-hub")
+    inputs = Input(shape=(img_size[0], img_size[1], 3))
+    features = hub.KerasLayer(url, trainable=True, name=name.replace('-', '_'))(inputs)
+    return Model(inputs=inputs, outputs=features, name=name)
+
+
+def build_backbone(img_size, weights='imagenet', backbone=BACKBONE_NAME):
+    """
+    The named backbone without its top, pooled to a single feature vector.
+    It takes [0, 1] pixels like every pipeline, the TFLite models and the app;
+    an 'input_scaling' layer maps them to the backbone's own input range.
+    Hub backbones ignore weights=None and always load their pretrained weights.
+    """
+    if backbone not in BACKBONES:
+        raise ValueError(f"unknown backbone '{backbone}'; choose from {', '.join(BACKBONES)}")
+    source, _, pooling, input_scale = BACKBONES[backbone]
+    if source.startswith('https://'):
+        return _hub_backbone(source, backbone, img_size)
+    img_height, img_width = img_size
+    inputs = Input(shape=(img_height, img_width, 3))
+    scaled = Rescaling(input_scale, name='input_scaling')(inputs) if input_scale != 1.0 else inputs
+    base_model = getattr(applications, source)(
+        weights=weights,
+        include_top=False,
+        input_tensor=scaled,
+        pooling=pooling
+    )
+    # rewrap so the model has the single [0, 1] input rather than the list input_tensor produces
+    return Model(inputs=inputs, outputs=base_model.output, name=base_model.name)
+
+
+def add_classification_head(x, num_classes):
+    """
+    Dense(1024) -> Dropout -> Dense(512) -> Dropout -> Dense(num_classes, softmax).
+    The softmax stays float32 under a mixed-precision policy so the loss is computed stably.
+    """
+    x = Dense(1024, activation='relu', kernel_regularizer=l2(0.001), name='head_dense')(x)
+    x = Dropout(0.5, name='head_dropout')(x)
+    x = Dense(512, activation='relu', kernel_regularizer=l2(0.001), name='head_dense_1')(x)
+    x = Dropout(0.3, name='head_dropout_1')(x)
+    return Dense(num_classes, activation='softmax', dtype='float32', name='predictions')(x)
+
+
+def attach_head(base_model, num_classes):
+    """Full classifier on top of an existing backbone."""
+    predictions = add_classification_head(base_model.output, num_classes)
+    return Model(inputs=base_model.input, outputs=predictions)
+
+
+def classifier_layer(model):
+    """
+    The model's final Dense layer: 'predictions' in models built here, else the
+    last layer (unnamed 'dense_N' in models from the original training scripts).
+    Raises ValueError when neither is a Dense layer.
+    """
+    if 'predictions' in [layer.name for layer in model.layers]:
+        return model.get_layer('predictions')
+    if isinstance(model.layers[-1], Dense):
+        return model.layers[-1]
+    raise ValueError(f"cannot find the classifier: the model has no 'predictions' layer and its last layer "
+                     f"'{model.layers[-1].name}' is a {type(model.layers[-1]).__name__}, not Dense")
+
+
+def build_model(num_classes, img_size, weights='imagenet', backbone=BACKBONE_NAME):
+    """Full classifier; returns (model, base_model)."""
+    base_model = build_backbone(img_size, weights=weights, backbone=backbone)
+    return attach_head(base_model, num_classes), base_model
+
+
+def set_backbone_trainable(base_model, blocks=None):
+    """
+    Make only the backbone layers whose names start with one of `blocks`
+    trainable; None makes the whole backbone trainable, () freezes it.
+    BatchNormalization layers stay frozen in a partly unfrozen backbone so
+    their ImageNet statistics are kept. Recompile the model afterwards.
+    """
+    base_model.trainable = True
+    if blocks is None:
+        return
+    for layer in base_model.layers:
+        name = layer.name.lower().replace('/', '_')
+        layer.trainable = name.startswith(tuple(blocks)) and not isinstance(layer, BatchNormalization)
+
+
+def build_head_model(feature_dim, num_classes):
+    """The classification head alone, taking pooled backbone features as input."""
+    features = Input(shape=(feature_dim,), name='backbone_features')
+    return Model(inputs=features, outputs=add_classification_head(features, num_classes))
+
+
+def copy_head_weights(source, target):
+    """Copy the head layers' weights between any two models that share HEAD_LAYER_NAMES."""
+    for name in HEAD_LAYER_NAMES:
+        target.get_layer(name).set_weights(source.get_layer(name).get_weights())
@@ -0,0 +1,147 @@
+"""
+Content-addressed Prediction Cache
+Scores keyed by (image SHA-256, model SHA-256, preprocessing version), held in an
+in-memory LRU with an optional size-bounded SQLite tier behind it
+"""
+
+import collections
+import hashlib
+import sqlite3
+import threading
+import time
+import numpy as np
+from preprocessing import PREPROCESSING_VERSION
+
+MEMORY_ENTRIES = 10000
+DB_MAX_MB = 256
+EVICT_TO = 0.9             # SQLite eviction trims down to this fraction of the size limit
+
+
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """
+    Score vectors for exact image contents under one model and preprocessing
+    version, so a re-uploaded photo skips decode and inference.
+    Thread-safe: the batch CLI looks up on its decode thread and stores on the main one.
+    """
+
+    def __init__(self, model_path, max_entries=MEMORY_ENTRIES, db_path=None, db_max_mb=DB_MAX_MB):
+        self.model_sha256 = sha256_file(model_path)
+        self.max_entries = max_entries
+        self.db_max_bytes = int(db_max_mb * 1024 * 1024)
+        self._memory = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                " image_sha256 TEXT, model_sha256 TEXT, preprocessing_version INTEGER,"
+                " scores BLOB, last_used REAL,"
+                " PRIMARY KEY (image_sha256, model_sha256, preprocessing_version))"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS predictions_last_used ON predictions (last_used)")
+            self._db_bytes = self._db.execute(
+                "SELECT COALESCE(SUM(LENGTH(scores)), 0) FROM predictions").fetchone()[0]
+
+    def get_many(self, image_keys):
+        """{image key: scores} for every key found in memory or on disk."""
+        found, missing = {}, []
+        with self._lock:
+            for key in image_keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                    self.memory_hits += 1
+                else:
+                    missing.append(key)
+
+            if self._db is not None and missing:
+                for key in missing:
+                    row = self._db.execute(
+                        "SELECT scores FROM predictions"
+                        " WHERE image_sha256 = ? AND model_sha256 = ? AND preprocessing_version = ?",
+                        (key, self.model_sha256, PREPROCESSING_VERSION)).fetchone()
+                    if row is not None:
+                        found[key] = np.frombuffer(row[0], dtype=np.float32)
+                        self._remember(key, found[key])
+                        self.disk_hits += 1
+                disk_found = [key for key in missing if key in found]
+                if disk_found:
+                    now = time.time()
+                    self._db.executemany(
+                        "UPDATE predictions SET last_used = ?"
+                        " WHERE image_sha256 = ? AND model_sha256 = ? AND preprocessing_version = ?",
+                        [(now, key, self.model_sha256, PREPROCESSING_VERSION) for key in disk_found])
+                    self._db.commit()
+            self.misses += len(missing) - sum(key in found for key in missing)
+        return found
+
+    def put_many(self, items):
+        """Store {image key: scores}; scores are copied, so reused buffers are safe to pass."""
+        with self._lock:
+            rows = []
+            now = time.time()
+            for key, scores in items.items():
+                scores = np.array(scores, dtype=np.float32)
+                self._remember(key, scores)
+                rows.append((key, self.model_sha256, PREPROCESSING_VERSION, scores.tobytes(), now))
+            if self._db is not None and rows:
+                # Same key means same image, model and preprocessing, so existing rows are kept
+                inserted = self._db.executemany("INSERT OR IGNORE INTO predictions VALUES (?, ?, ?, ?, ?)", rows)
+                self._db_bytes += inserted.rowcount * len(rows[0][3])
+                if self._db_bytes > self.db_max_bytes:
+                    self._evict()
+                self._db.commit()
+
+    def _remember(self, key, scores):
+        self._memory[key] = scores
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self):
+        """Drop least recently used rows until the tier is back under EVICT_TO of its limit."""
+        target = self.db_max_bytes * EVICT_TO
+        while self._db_bytes > target:
+            rows = self._db.execute(
+                "SELECT rowid, LENGTH(scores) FROM predictions ORDER BY last_used LIMIT 256").fetchall()
+            if not rows:
+                break
+            self._db.executemany("DELETE FROM predictions WHERE rowid = ?", [(rowid,) for rowid, _ in rows])
+            self._db_bytes -= sum(size for _, size in rows)
+            self.evictions += len(rows)
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            'lookups': lookups,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            'memory_entries': len(self._memory),
+            'disk_mb': self._db_bytes / (1024 * 1024) if self._db is not None else None,
+            'evictions': self.evictions,
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
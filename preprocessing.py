@@ -0,0 +1,204 @@
+"""
+Shared Image Preprocessing
+Decode, Android-style bilinear resize, normalize and quantize whole batches into reusable buffers
+"""
+
+import threading
+from functools import lru_cache
+import numpy as np
+from PIL import Image
+
+# Bump whenever any step below changes output pixels, so cached predictions are invalidated
+PREPROCESSING_VERSION = 1
+
+_resize_scratch = threading.local()   # decode_batch resizes on pool threads
+
+
+@lru_cache(maxsize=64)
+def _resize_taps(in_size, out_size):
+    """
+    Source indices and weights for one axis, using half-pixel centres like
+    Bitmap.createScaledBitmap(..., true) and tf.image.resize(method='bilinear').
+    """
+    centres = np.clip((np.arange(out_size) + 0.5) * (in_size / out_size) - 0.5, 0, in_size - 1)
+    low = np.floor(centres).astype(np.intp)
+    high = np.minimum(low + 1, in_size - 1)
+    return low, high, (centres - low).astype(np.float32)
+
+
+def _resize_buffers(in_shape, img_size):
+    """
+    This thread's scratch arrays for resize_bilinear, reused while the input
+    and output sizes stay the same (PlantVillage and camera frames rarely vary).
+    """
+    key = (in_shape, img_size)
+    if getattr(_resize_scratch, 'key', None) != key:
+        in_height, in_width, channels = in_shape
+        row_shape = (img_size[0], in_width, channels)
+        out_shape = (img_size[0], img_size[1], channels)
+        # Weights spread to full planes: a broadcast in-place multiply would go through a NumPy buffer
+        y_weights = np.ascontiguousarray(np.broadcast_to(_resize_taps(in_height, img_size[0])[2][:, None, None],
+                                                         row_shape))
+        x_weights = np.ascontiguousarray(np.broadcast_to(_resize_taps(in_width, img_size[1])[2][None, :, None],
+                                                         out_shape))
+        _resize_scratch.buffers = (np.empty(row_shape, dtype=np.uint8), np.empty(row_shape, dtype=np.float32),
+                                   np.empty(row_shape, dtype=np.float32), y_weights,
+                                   np.empty(out_shape, dtype=np.float32), np.empty(out_shape, dtype=np.float32),
+                                   x_weights)
+        _resize_scratch.key = key
+    return _resize_scratch.buffers
+
+
+def resize_bilinear(image, img_size, out=None):
+    """
+    Bilinear-resize a uint8 (H, W, 3) image to img_size, without antialiasing (as on Android).
+    Works in per-thread scratch buffers, so repeated calls at the same sizes allocate no arrays.
+    """
+    img_height, img_width = img_size
+    if out is None:
+        out = np.empty((img_height, img_width, image.shape[2]), dtype=np.uint8)
+    if image.shape[:2] == (img_height, img_width):
+        out[...] = image
+        return out
+
+    y_low, y_high, _ = _resize_taps(image.shape[0], img_height)
+    x_low, x_high, _ = _resize_taps(image.shape[1], img_width)
+    gathered, top, rows, y_weights, left, result, x_weights = _resize_buffers(image.shape, (img_height, img_width))
+    # rows = top + (bottom - top) * y_weight, then the same along x. mode='clip' keeps np.take
+    # unbuffered, and uint8 -> float32 goes through plain copies, which (unlike mixed-dtype
+    # ufuncs) need no cast buffer
+    np.take(image, y_low, axis=0, out=gathered, mode='clip')
+    top[...] = gathered
+    np.take(image, y_high, axis=0, out=gathered, mode='clip')
+    rows[...] = gathered
+    rows -= top
+    rows *= y_weights
+    rows += top
+    np.take(rows, x_low, axis=1, out=left, mode='clip')
+    np.take(rows, x_high, axis=1, out=result, mode='clip')
+    result -= left
+    result *= x_weights
+    result += left
+    np.clip(np.round(result, out=result), 0, 255, out=result)
+    np.copyto(out, result, casting='unsafe')
+    return out
+
+
+def load_image(path, img_size, out=None):
+    """Decode to RGB and resize to img_size; writes into out (e.g. a batch slot) if given."""
+    with Image.open(path) as image:
+        pixels = np.asarray(image.convert('RGB'))
+    return resize_bilinear(pixels, img_size, out)
+
+
+def decode_batch(batch_paths, img_size, batch_size=None, pool=None, out=None):
+    """
+    Decode a batch straight into a zero-padded (batch_size, H, W, 3) uint8 array
+    (out, reused across calls, or a new one).
+    Returns (pixels, {position: error message}) for files that failed to decode.
+    """
+    if out is None:
+        out = np.zeros((batch_size or len(batch_paths), img_size[0], img_size[1], 3), dtype=np.uint8)
+
+    def load(item):
+        i, path = item
+        try:
+            load_image(path, img_size, out[i])
+        except Exception as e:
+            out[i] = 0
+            return i, str(e)
+        return i, None
+
+    loader = pool.map if pool is not None else map
+    errors = {i: error for i, error in loader(load, enumerate(batch_paths)) if error is not None}
+    out[len(batch_paths):] = 0
+    return out, errors
+
+
+def normalize(pixels, out=None):
+    """uint8 pixels -> float32 in [0, 1], the Keras models' input scaling."""
+    if out is None:
+        out = np.empty(np.shape(pixels), dtype=np.float32)
+    # Cast by assignment, then divide in place: a mixed-dtype divide would go through a NumPy cast buffer
+    out[...] = pixels
+    out /= np.float32(255.0)
+    return out
+
+
+@lru_cache(maxsize=16)
+def _lookup_table(dtype, scale, zero_point):
+    values = np.arange(256, dtype=np.float32) / 255.0
+    if dtype in (np.int8, np.uint8):
+        info = np.iinfo(dtype)
+        values = np.clip(np.round(values / scale + zero_point), info.min, info.max)
+    return values.astype(dtype)
+
+
+def input_table(input_detail):
+    """
+    256-entry table mapping each uint8 pixel value to the interpreter's input
+    value ([0, 1] floats, quantized for int8/uint8 models).
+    """
+    scale, zero_point = input_detail['quantization']
+    return _lookup_table(np.dtype(input_detail['dtype']).type, scale, zero_point)
+
+
+def to_model_input(images, input_detail, out=None, indices=None):
+    """
+    uint8 pixels -> the interpreter's input dtype: a divide for float models, one table lookup otherwise.
+    indices (an intp array shaped like images) holds the lookup's indices, which np.take would
+    otherwise convert into a new array on every call.
+    """
+    if input_detail['dtype'] == np.float32:
+        return normalize(images, out)
+    if indices is None:
+        return np.take(input_table(input_detail), images, out=out)
+    indices[...] = images
+    return np.take(input_table(input_detail), indices, out=out, mode='clip')
+
+
+def from_model_output(output, output_detail):
+    """Dequantize int8/uint8 outputs to float scores."""
+    if output_detail['dtype'] in (np.int8, np.uint8):
+        scale, zero_point = output_detail['quantization']
+        return (output.astype(np.float32) - zero_point) * scale
+    return output.astype(np.float32)
+
+
+class BatchPreprocessor:
+    """
+    Preallocated pixel and model-input buffers for one interpreter input.
+    Every call refills the same arrays, so copy results that must outlive the next call.
+    """
+
+    def __init__(self, input_detail, batch_size=None):
+        shape = input_detail['shape']
+        self.batch_size = batch_size or int(shape[0])
+        self.img_size = (int(shape[1]), int(shape[2]))
+        self.input_detail = input_detail
+        self.pixels = np.zeros((self.batch_size,) + self.img_size + (3,), dtype=np.uint8)
+        self.inputs = None      # allocated on first use; callers may supply their own out
+        self.indices = None     # table-lookup indices for int8/uint8 inputs, allocated on first use
+
+    def load(self, batch_paths, pool=None, out=None):
+        """Decode paths into the pixel buffer; returns (model input, decode errors)."""
+        _, errors = decode_batch(batch_paths, self.img_size, pool=pool, out=self.pixels)
+        return self(self.pixels, out), errors
+
+    def __call__(self, pixels, out=None):
+        """
+        Convert up to batch_size uint8 images to model input, written into out
+        (e.g. an interpreter tensor view) or the reusable input buffer.
+        Padding rows are zeroed pixels.
+        """
+        if len(pixels) < self.batch_size:
+            self.pixels[:len(pixels)] = pixels
+            self.pixels[len(pixels):] = 0
+            pixels = self.pixels
+        if out is None:
+            if self.inputs is None:
+                self.inputs = np.empty(self.pixels.shape, dtype=self.input_detail['dtype'])
+            out = self.inputs
+        if self.indices is None and self.input_detail['dtype'] != np.float32:
+            self.indices = np.empty(self.pixels.shape, dtype=np.intp)
+        return to_model_input(pixels, self.input_detail, out, self.indices)
@@ -3,18 +3,25 @@ Retrain PlantVillage Model with TensorFlow 2.14
 This script creates a compatible model for TFLite conversion
 """
 
+import argparse
+import functools
 import os
-import numpy as np
-import shutil
-from sklearn.model_selection import train_test_split
 import tensorflow as tf
-from tensorflow.keras.applications import EfficientNetB5
-from tensorflow.keras.models import Model
-from tensorflow.keras.layers import Dense, Dropout
 from tensorflow.keras.optimizers import Adam
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
 from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
-from tensorflow.keras.regularizers import l2
+from dataset_manifest import build_manifest, split_rows, class_names_from
+from input_pipeline import make_dataset, paths_and_labels, ThroughputCallback
+from decode_cache import CACHE_DIR, build_cache, load_split, make_cached_dataset
+from feature_cache import FEATURE_CACHE_DIR, train_head_only
+from model_factory import BACKBONE_NAME, BACKBONES, build_model
+from distributed_training import (PRECISION_MODES, barrier, is_chief, make_strategy, save_model,
+                                  scale_for_replicas, set_precision)
+from training_checkpoint import (CHECKPOINT_DIR, CHECKPOINT_EVERY_STEPS, TrainingCheckpoint,
+                                 read_position, track_rng_in_checkpoints)
+from training_schedule import SCHEDULES, build_schedule, print_phase_report, run_schedule
+from incremental_training import (CLASS_NAMES_PATH, INCREMENTAL_EPOCHS, INCREMENTAL_LEARNING_RATE, PREVIOUS_MODEL,
+                                  REPLAY_RATIO, load_previous_model, merge_class_names, read_class_names,
+                                  read_trained_record, select_training_rows, write_trained_record)
 
 print(f"TensorFlow version: {tf.__version__}")
 print(f"Keras version: {tf.keras.__version__}")
@@ -24,10 +31,67 @@ IMG_HEIGHT, IMG_WIDTH = 224, 224
 BATCH_SIZE = 32
 EPOCHS = 10
 LEARNING_RATE = 0.0001
+MANIFEST_PATH = 'plantvillage_manifest.csv'
+SEED = 42
+
+# Seed Python, NumPy and TensorFlow so shuffling, augmentation and weight init repeat
+tf.keras.utils.set_random_seed(SEED)
+
+parser = argparse.ArgumentParser(description="Retrain the PlantVillage model with TensorFlow 2.14")
+parser.add_argument('--data-path', help="PlantVillage 'color' folder (prompted for if omitted)")
+parser.add_argument('--decode-cache', nargs='?', const=CACHE_DIR, default=None, metavar='DIR',
+                    help=f"train from pre-decoded memory-mapped shards (default dir: {CACHE_DIR})")
+parser.add_argument('--head-only', action='store_true',
+                    help="freeze the backbone and train only the dense head on cached embeddings")
+parser.add_argument('--feature-cache', default=FEATURE_CACHE_DIR, metavar='DIR',
+                    help="where --head-only stores float16 backbone embeddings")
+parser.add_argument('--precision', choices=PRECISION_MODES, default='float32',
+                    help="Keras dtype policy; 'auto' picks mixed_float16/mixed_bfloat16 when the hardware supports it")
+parser.add_argument('--distributed', action='store_true',
+                    help="MultiWorkerMirroredStrategy across the workers in TF_CONFIG "
+                         "(python distributed_training.py --workers N -- ... runs them locally)")
+parser.add_argument('--resume', action='store_true',
+                    help="continue from the latest checkpoint in --checkpoint-dir (model, optimizer, epoch/step, RNG)")
+parser.add_argument('--checkpoint-dir', default=CHECKPOINT_DIR, metavar='DIR',
+                    help="where full training state is checkpointed")
+parser.add_argument('--checkpoint-every', type=int, default=CHECKPOINT_EVERY_STEPS, metavar='STEPS',
+                    help="batches between mid-epoch checkpoints (0: only at epoch ends)")
+parser.add_argument('--backbone', choices=list(BACKBONES), default=BACKBONE_NAME,
+                    help="ImageNet backbone (efficientnet-lite* need tensorflow_hub); "
+                         "backbone_sweep.py compares them on accuracy, latency and size")
+parser.add_argument('--schedule', choices=SCHEDULES, default='full',
+                    help="'two-phase': frozen-backbone head warmup, then progressive unfreezing of the top blocks")
+parser.add_argument('--incremental', nargs='?', const=PREVIOUS_MODEL, default=None, metavar='MODEL',
+                    help=f"warm-start from the last model (default {PREVIOUS_MODEL}) and train on new images "
+                         "plus a replay sample of old ones; new class folders get new outputs")
+parser.add_argument('--replay-ratio', type=float, default=REPLAY_RATIO,
+                    help="--incremental: replayed old images per new image")
+args = parser.parse_args()
+if args.incremental and (args.head_only or args.decode_cache or args.schedule != 'full'):
+    parser.error("--incremental fine-tunes the whole saved model on a subset of rows; "
+                 "drop --head-only, --decode-cache and --schedule")
+if args.incremental and args.precision != 'float32':
+    parser.error("--incremental continues training the saved float32 model; drop --precision")
+if args.distributed and not args.data_path:
+    parser.error("--distributed needs --data-path (workers cannot prompt for it)")
+if args.head_only and args.distributed:
+    parser.error("--head-only trains on cached embeddings in one process; drop --distributed")
+if args.head_only and args.resume:
+    parser.error("--resume applies to full training; --head-only reuses its embedding cache instead")
+
+# The strategy must exist before any other TensorFlow op runs
+strategy = make_strategy(args.distributed)
+chief = is_chief(strategy)
+precision = set_precision(args.precision)
+global_batch_size, learning_rate = scale_for_replicas(BATCH_SIZE, LEARNING_RATE, strategy.num_replicas_in_sync)
+print(f"🎛️  Precision policy: {precision}")
+print(f"🌐 Replicas: {strategy.num_replicas_in_sync} (global batch {global_batch_size}, learning rate {learning_rate:g})")
 
 # Dataset path - MODIFY THIS to point to your PlantVillage dataset
 # Download from: https://www.kaggle.com/datasets/abdallahalidev/plantvillage-dataset
-DATA_PATH = input("Enter the path to PlantVillage 'color' folder (or press Enter to use default): ").strip()
+DATA_PATH = args.data_path
+if not DATA_PATH:
+    DATA_PATH = input("Enter the path to PlantVillage 'color' folder (or press Enter to use default): ").strip()
 if not DATA_PATH:
     DATA_PATH = 'C:/Users/borhe/Downloads/plantvillage/color'  # Default path
     print(f"Using default path: {DATA_PATH}")
@@ -39,183 +103,213 @@ if not os.path.exists(DATA_PATH):
     print("\nExtract it and provide the path to the 'color' folder.")
     exit(1)
 
-# Create working directories
-BASE_DIR = 'plantvillage_split'
-TRAIN_DIR = os.path.join(BASE_DIR, 'train')
-TEST_DIR = os.path.join(BASE_DIR, 'test')
-VAL_DIR = os.path.join(BASE_DIR, 'val')
-
-print("\n📁 Preparing dataset directories...")
-for directory in [TRAIN_DIR, TEST_DIR, VAL_DIR]:
-    os.makedirs(directory, exist_ok=True)
-
-# Collect all image files
-print("📸 Collecting image files...")
-image_files = []
-for root, dirs, files in os.walk(DATA_PATH):
-    for file in files:
-        if file.lower().endswith(('.jpg', '.jpeg', '.png')):
-            image_files.append(os.path.join(root, file))
-
-print(f"Found {len(image_files)} images")
-
-# Shuffle and split dataset
-np.random.seed(42)
-np.random.shuffle(image_files)
-
-train_size = int(len(image_files) * 0.8)
-test_size = int(len(image_files) * 0.1)
-
-train_files = image_files[:train_size]
-test_files = image_files[train_size:train_size + test_size]
-val_files = image_files[train_size + test_size:]
-
-print(f"Training samples: {len(train_files)}")
-print(f"Testing samples: {len(test_files)}")
-print(f"Validation samples: {len(val_files)}")
-
-# Copy files to split directories
-def copy_files(file_list, dest_dir):
-    print(f"  Copying files to {dest_dir}...")
-    for f in file_list:
-        class_name = os.path.basename(os.path.dirname(f))
-        class_dir = os.path.join(dest_dir, class_name)
-        os.makedirs(class_dir, exist_ok=True)
-        dest_path = os.path.join(class_dir, os.path.basename(f))
-        if not os.path.exists(dest_path):
-            shutil.copy2(f, dest_path)
-
-print("\n📋 Copying files to split directories...")
-copy_files(train_files, TRAIN_DIR)
-copy_files(test_files, TEST_DIR)
-copy_files(val_files, VAL_DIR)
-
-# Data generators with augmentation
-print("\n🔄 Setting up data generators...")
-train_datagen = ImageDataGenerator(
-    rescale=1./255,
-    rotation_range=20,
-    width_shift_range=0.2,
-    height_shift_range=0.2,
-    shear_range=0.2,
-    zoom_range=0.2,
-    horizontal_flip=True,
-    fill_mode='nearest'
-)
-
-val_datagen = ImageDataGenerator(rescale=1./255)
-test_datagen = ImageDataGenerator(rescale=1./255)
-
-train_generator = train_datagen.flow_from_directory(
-    TRAIN_DIR,
-    target_size=(IMG_HEIGHT, IMG_WIDTH),
-    batch_size=BATCH_SIZE,
-    class_mode='categorical',
-    shuffle=True
-)
-
-val_generator = val_datagen.flow_from_directory(
-    VAL_DIR,
-    target_size=(IMG_HEIGHT, IMG_WIDTH),
-    batch_size=BATCH_SIZE,
-    class_mode='categorical',
-    shuffle=False
-)
-
-test_generator = test_datagen.flow_from_directory(
-    TEST_DIR,
-    target_size=(IMG_HEIGHT, IMG_WIDTH),
-    batch_size=BATCH_SIZE,
-    class_mode='categorical',
-    shuffle=False
-)
-
-num_classes = train_generator.num_classes
+# Build (or reuse) the split manifest - images are read in place from DATA_PATH
+print("\n📋 Preparing dataset split manifest...")
+manifest = build_manifest(DATA_PATH, MANIFEST_PATH)
+print(f"Found {len(manifest)} images")
+
+train_rows = split_rows(manifest, 'train')
+test_rows = split_rows(manifest, 'test')
+val_rows = split_rows(manifest, 'val')
+class_names = class_names_from(manifest)
+
+if args.incremental:
+    # Output order is fixed by the previous model; new classes are appended after it
+    if not (os.path.exists(args.incremental) and os.path.exists(CLASS_NAMES_PATH)):
+        print(f"\n❌ --incremental needs {args.incremental} and {CLASS_NAMES_PATH} from a previous run")
+        exit(1)
+    previous_classes = read_class_names(CLASS_NAMES_PATH)
+    class_names = merge_class_names(previous_classes, class_names)
+    if len(class_names) > len(previous_classes):
+        print(f"🆕 New classes: {', '.join(class_names[len(previous_classes):])}")
+
+    trained_hashes = read_trained_record(args.incremental)
+    if trained_hashes is None:
+        print(f"⚠️  No record of the images {args.incremental} was trained on; treating new classes as the new data")
+    new_rows, replay_rows = select_training_rows(train_rows, trained_hashes, previous_classes,
+                                                 args.replay_ratio, seed=SEED)
+    if not new_rows:
+        print(f"\n✅ No new training images since {args.incremental}; nothing to do")
+        exit(0)
+    if trained_hashes is None:
+        new_hashes = {row['sha256'] for row in new_rows}
+        trained_hashes = {row['sha256'] for row in train_rows} - new_hashes
+    train_rows = new_rows + replay_rows
+    print(f"🔁 Incremental training on {len(new_rows)} new + {len(replay_rows)} replayed images")
+num_classes = len(class_names)
+
+print(f"Training samples: {len(train_rows)}")
+print(f"Testing samples: {len(test_rows)}")
+print(f"Validation samples: {len(val_rows)}")
+
+img_size = (IMG_HEIGHT, IMG_WIDTH)
+# Where a resumed run picks up: training pipelines are built starting at an (epoch, batch)
+start_epoch, start_step = read_position(args.checkpoint_dir) if args.resume else (0, 0)
+if args.resume and not (start_epoch or start_step):
+    print(f"\n⚠️  No checkpoint in {args.checkpoint_dir}; starting from scratch")
+if args.decode_cache:
+    # Decode every split once into memory-mapped uint8 shards, then train from those
+    print("\n🗜️  Setting up decode cache pipelines...")
+    # The chief builds the cache while the other workers wait, so workers sharing a
+    # filesystem never write the same directory; they then reuse it (or, on machines
+    # that do not share it, build their own copy)
+    if chief:
+        cache_path = build_cache(manifest, DATA_PATH, img_size, args.decode_cache)
+    barrier(strategy)
+    if not chief:
+        cache_path = build_cache(manifest, DATA_PATH, img_size, args.decode_cache)
+    make_train_dataset = functools.partial(
+        make_cached_dataset, *load_split(cache_path, 'train'), num_classes, global_batch_size,
+        training=True, seed=SEED
+    )
+    val_dataset = make_cached_dataset(*load_split(cache_path, 'val'), num_classes, global_batch_size)
+    test_dataset = make_cached_dataset(*load_split(cache_path, 'test'), num_classes, global_batch_size)
+else:
+    # tf.data pipelines: parallel decode, on-graph augmentation, prefetching
+    print("\n🔄 Setting up tf.data input pipelines...")
+    make_train_dataset = functools.partial(
+        make_dataset, *paths_and_labels(train_rows, DATA_PATH, class_names),
+        num_classes, global_batch_size, img_size, training=True, seed=SEED
+    )
+    val_dataset = make_dataset(
+        *paths_and_labels(val_rows, DATA_PATH, class_names),
+        num_classes, global_batch_size, img_size
+    )
+    test_dataset = make_dataset(
+        *paths_and_labels(test_rows, DATA_PATH, class_names),
+        num_classes, global_batch_size, img_size
+    )
+
 print(f"Number of classes: {num_classes}")
 
 # Save class names
-class_names = sorted(list(train_generator.class_indices.keys()))
-with open('class_names_new.txt', 'w') as f:
-    for class_name in class_names:
-        f.write(f"{class_name}\n")
-print(f"✅ Class names saved to class_names_new.txt")
+if chief:
+    with open(CLASS_NAMES_PATH, 'w') as f:
+        for class_name in class_names:
+            f.write(f"{class_name}\n")
+    print(f"✅ Class names saved to {CLASS_NAMES_PATH}")
 
 # Clear TensorFlow session
 print("\n🧹 Clearing TensorFlow session...")
 tf.keras.backend.clear_session()
 
-# Build model
-print("\n🏗️ Building EfficientNetB5 model...")
-base_model = EfficientNetB5(
-    weights='imagenet',
-    include_top=False,
-    input_shape=(IMG_HEIGHT, IMG_WIDTH, 3),
-    pooling='max'
-)
-
-# Add custom layers
-x = base_model.output
-x = Dense(1024, activation='relu', kernel_regularizer=l2(0.001))(x)
-x = Dropout(0.5)(x)
-x = Dense(512, activation='relu', kernel_regularizer=l2(0.001))(x)
-x = Dropout(0.3)(x)
-predictions = Dense(num_classes, activation='softmax')(x)
-
-# Create final model
-model = Model(inputs=base_model.input, outputs=predictions)
-
-# Compile model
-print("⚙️ Compiling model...")
-model.compile(
-    optimizer=Adam(learning_rate=LEARNING_RATE),
-    loss='categorical_crossentropy',
-    metrics=['accuracy']
-)
-
-print("\n📊 Model Summary:")
-model.summary()
-
-# Callbacks
-early_stopping = EarlyStopping(
-    monitor='val_loss',
-    patience=3,
-    restore_best_weights=True,
-    verbose=1
-)
-
-checkpoint = ModelCheckpoint(
-    'best_model_tf214.keras',
-    monitor='val_loss',
-    save_best_only=True,
-    verbose=1
-)
-
-# Train model
-print(f"\n🚀 Starting training for {EPOCHS} epochs...")
-print("=" * 60)
-history = model.fit(
-    train_generator,
-    epochs=EPOCHS,
-    validation_data=val_generator,
-    callbacks=[early_stopping, checkpoint],
-    verbose=1
-)
+if args.head_only:
+    # Frozen backbone: embed each image once, then train only the dense head
+    print("\n🧊 Head-only mode: training the dense head on cached backbone embeddings...")
+    model = train_head_only(manifest, DATA_PATH, class_names, img_size,
+                            cache_dir=args.feature_cache, seed=SEED, backbone=args.backbone)
+else:
+    # Dropout RNG state lives in variables, so checkpoints capture it
+    track_rng_in_checkpoints()
+
+    # Build and compile model (variables are mirrored across replicas inside the scope)
+    with strategy.scope():
+        resuming = bool(start_epoch or start_step)
+        if args.incremental:
+            print(f"\n🏗️ Warm-starting from {args.incremental}...")
+            try:
+                model = load_previous_model(args.incremental, num_classes)
+            except ValueError as e:
+                print(f"❌ {e}")
+                exit(1)
+            # The whole model is fine-tuned, so it stands in for the backbone in the schedule
+            base_model = model
+            learning_rate = INCREMENTAL_LEARNING_RATE * strategy.num_replicas_in_sync
+        else:
+            print(f"\n🏗️ Building {args.backbone} model...")
+            # A resumed run overwrites every weight, so skip the ImageNet download
+            model, base_model = build_model(num_classes, img_size, weights=None if resuming else 'imagenet',
+                                            backbone=args.backbone)
+
+        # Compile model (mixed_float16 wraps the optimizer in dynamic loss scaling)
+        print("⚙️ Compiling model...")
+        model.compile(
+            optimizer=Adam(learning_rate=learning_rate),
+            loss='categorical_crossentropy',
+            metrics=['accuracy']
+        )
+        # Slots for every weight up front: the same optimizer serves each schedule phase
+        model.optimizer.build(model.trainable_variables)
+
+    print("\n📊 Model Summary:")
+    model.summary()
+
+    # Callbacks
+    early_stopping = EarlyStopping(
+        monitor='val_loss',
+        patience=3,
+        restore_best_weights=True,
+        verbose=1
+    )
+
+    checkpoint = ModelCheckpoint(
+        'best_model_tf214.keras',
+        monitor='val_loss',
+        save_best_only=True,
+        verbose=1
+    )
+
+    throughput = ThroughputCallback(len(train_rows), global_batch_size)
+
+    # Full training state: periodic checkpoints, restored on --resume
+    training_state = TrainingCheckpoint(
+        model, args.checkpoint_dir, every_steps=args.checkpoint_every, strategy=strategy,
+        early_stopping=early_stopping, best_checkpoint=checkpoint
+    )
+    if resuming:
+        training_state.restore()
+
+    # Train model
+    if args.incremental:
+        phases = build_schedule('full', INCREMENTAL_EPOCHS, INCREMENTAL_LEARNING_RATE,
+                                lr_scale=strategy.num_replicas_in_sync)
+    else:
+        phases = build_schedule(args.schedule, EPOCHS, LEARNING_RATE, lr_scale=strategy.num_replicas_in_sync,
+                                blocks=BACKBONES[args.backbone].blocks)
+    print(f"\n🚀 Starting training for {phases[-1].end_epoch} epochs ({args.schedule} schedule)...")
+    reports = run_schedule(
+        model, base_model, phases, make_train_dataset,
+        compile_kwargs={'loss': 'categorical_crossentropy', 'metrics': ['accuracy']},
+        strategy=strategy,
+        training_state=training_state,
+        start_epoch=start_epoch,
+        start_step=start_step,
+        validation_data=val_dataset,
+        callbacks=[early_stopping, checkpoint, throughput, training_state],
+        verbose=1
+    )
+    print_phase_report(reports)
 
 # Evaluate on test set
 print("\n📈 Evaluating model on test set...")
-loss, accuracy = model.evaluate(test_generator, verbose=1)
+loss, accuracy = model.evaluate(test_dataset, verbose=1)
 print(f"\n✅ Test Loss: {loss:.4f}")
 print(f"✅ Test Accuracy: {accuracy * 100:.2f}%")
 
-# Save final model
+if precision != 'float32':
+    # Saved models get a float32 graph so TFLite conversion sees the same ops as before
+    print("\n🎛️  Rebuilding the model in float32 for export...")
+    tf.keras.mixed_precision.set_global_policy('float32')
+    export_model, _ = build_model(num_classes, img_size, weights=None, backbone=args.backbone)
+    export_model.set_weights(model.get_weights())
+    model = export_model
+
+# Save final model (only the chief's copy is kept)
 print("\n💾 Saving final model...")
-model.save('plant_model_tf214.keras')
+save_model(model, 'plant_model_tf214.keras', strategy)
 print("✅ Model saved as plant_model_tf214.keras")
 
 # Also save as H5 format for compatibility
-model.save('plant_model_tf214.h5')
+save_model(model, 'plant_model_tf214.h5', strategy)
 print("✅ Model saved as plant_model_tf214.h5")
 
+# Which images this model has seen, so the next --incremental run can tell what is new
+if chief:
+    trained = {row['sha256'] for row in train_rows}
+    if args.incremental:
+        trained |= trained_hashes
+    write_trained_record('plant_model_tf214.keras', trained)
+
 print("\n" + "=" * 60)
 print("✅ TRAINING COMPLETE!")
 print("=" * 60)
@@ -0,0 +1,56 @@
+"""
+Test that training images reach each backbone in the range it was pretrained on
+Feeds white and black images through the tf.data pipeline into every keras.applications backbone
+"""
+
+import os
+import tempfile
+import numpy as np
+import tensorflow as tf
+from PIL import Image
+from input_pipeline import make_dataset
+from model_factory import BACKBONE_NAME, BACKBONES, build_backbone
+
+IMG_SIZE = (64, 64)
+BACKBONES_TO_TEST = (BACKBONE_NAME, 'efficientnetb0', 'mobilenetv3small')
+
+print("=" * 60)
+print("Testing backbone input range")
+print("=" * 60)
+
+# White and black leaves, decoded and rescaled exactly as in training
+tmp_dir = tempfile.mkdtemp()
+paths = []
+for name, value in (('white', 255), ('black', 0)):
+    paths.append(os.path.join(tmp_dir, f"{name}.png"))
+    Image.fromarray(np.full(IMG_SIZE + (3,), value, dtype=np.uint8)).save(paths[-1])
+images, _ = next(iter(make_dataset(paths, [0, 0], 1, len(paths), IMG_SIZE)))
+print(f"\nPipeline output: min {float(tf.reduce_min(images)):.3f}, max {float(tf.reduce_max(images)):.3f}")
+
+failures = 0
+if not (float(tf.reduce_min(images)) == 0.0 and float(tf.reduce_max(images)) == 1.0):
+    print("❌ The input pipeline should produce [0, 1] pixels")
+    failures += 1
+
+for name in BACKBONES_TO_TEST:
+    print(f"\n🧪 {name}")
+    base_model = build_backbone(IMG_SIZE, weights=None, backbone=name)
+    # The backbone's own first preprocessing layer: EfficientNet maps [0, 255] to [0, 1],
+    # MobileNetV3 to [-1, 1]. A white image must come out of it at 1.0, not 1/255.
+    own_rescaling = next(layer for layer in base_model.layers
+                         if isinstance(layer, tf.keras.layers.Rescaling) and layer.name != 'input_scaling')
+    probe = tf.keras.Model(inputs=base_model.input, outputs=own_rescaling.output)
+    white, black = np.asarray(probe(images))
+    print(f"   input_scale {BACKBONES[name].input_scale:g}: white → {white.max():.4f}, black → {black.min():.4f}")
+    if abs(white.max() - 1.0) < 1e-3 and black.min() <= 0.0:
+        print("   ✅ Backbone sees its pretraining input range")
+    else:
+        print(f"   ❌ A white image reaches '{own_rescaling.name}' as {white.max():.4f}; expected 1.0")
+        failures += 1
+
+print("\n" + "=" * 60)
+if failures:
+    print(f"❌ {failures} input range checks failed")
+    exit(1)
+print("✅ All backbones see correctly scaled input")
+print("=" * 60)
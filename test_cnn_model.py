@@ -1,5 +1,6 @@
 import tensorflow as tf
 import numpy as np
+from preprocessing import from_model_output, to_model_input
 
 print("Testing CNN_PV_model.tflite...")
 print("=" * 60)
@@ -30,15 +31,12 @@ input_shape = input_details[0]['shape']
 input_dtype = input_details[0]['dtype']
 print(f"\n🔍 Model expects: {input_shape} with type {input_dtype}")
 
-# Create input matching the model's requirements
-if input_dtype == np.int8:
-    test_input = np.random.randint(-128, 127, size=input_shape, dtype=np.int8)
-else:
-    test_input = np.random.rand(*input_shape).astype(np.float32)
+# Random pixels, quantized/normalized to the model's input type by the shared preprocessing
+test_input = to_model_input(np.random.randint(0, 256, size=input_shape, dtype=np.uint8), input_details[0])
 
 interpreter.set_tensor(input_details[0]['index'], test_input)
 interpreter.invoke()
-output = interpreter.get_tensor(output_details[0]['index'])
+output = from_model_output(interpreter.get_tensor(output_details[0]['index']), output_details[0])
 
 print(f"\n🧪 TEST INFERENCE:")
 print(f"   Predicted class: {np.argmax(output[0])}")
@@ -63,25 +61,12 @@ else:
 print("\n🔍 Testing with multiple random inputs...")
 predictions = []
 for i in range(5):
-    if input_dtype == np.int8:
-        test_input = np.random.randint(-128, 127, size=input_shape, dtype=np.int8)
-    else:
-        test_input = np.random.rand(*input_shape).astype(np.float32)
+    test_input = to_model_input(np.random.randint(0, 256, size=input_shape, dtype=np.uint8), input_details[0])
     interpreter.set_tensor(input_details[0]['index'], test_input)
     interpreter.invoke()
-    output = interpreter.get_tensor(output_details[0]['index'])
-    
-    # Handle INT8 output
-    if output_details[0]['dtype'] == np.int8:
-        # Dequantize output
-        scale = output_details[0]['quantization'][0]
-        zero_point = output_details[0]['quantization'][1]
-        output_float = (output.astype(np.float32) - zero_point) * scale
-        pred_class = np.argmax(output_float[0])
-        confidence = np.max(output_float[0]) * 100
-    else:
-        pred_class = np.argmax(output[0])
-        confidence = np.max(output[0]) * 100
+    output = from_model_output(interpreter.get_tensor(output_details[0]['index']), output_details[0])
+    pred_class = np.argmax(output[0])
+    confidence = np.max(output[0]) * 100
     
     predictions.append((pred_class, confidence))
     print(f"   Test {i+1}: Class {pred_class}, Confidence {confidence:.2f}%")
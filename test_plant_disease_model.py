@@ -4,6 +4,7 @@ Test plant_disease_model.tflite
 
 import tensorflow as tf
 import numpy as np
+from preprocessing import from_model_output, to_model_input
 
 print("=" * 60)
 print("Testing plant_disease_model.tflite")
@@ -54,12 +55,13 @@ print("-" * 60)
 predictions_list = []
 for test_num in range(1, 6):
     # Create random test input
-    test_input = np.random.rand(1, height, width, 3).astype(input_details[0]['dtype'])
+    pixels = np.random.randint(0, 256, size=(1, height, width, 3), dtype=np.uint8)
+    test_input = to_model_input(pixels, input_details[0])
     
     # Run inference
     interpreter.set_tensor(input_details[0]['index'], test_input)
     interpreter.invoke()
-    output = interpreter.get_tensor(output_details[0]['index'])
+    output = from_model_output(interpreter.get_tensor(output_details[0]['index']), output_details[0])
     
     # Get prediction
     predicted_class = np.argmax(output[0])
@@ -0,0 +1,52 @@
+"""
+Test top-k accuracy on tied scores
+Quantized models output scores in 1/256 steps, so most classes often tie at exactly 0.0
+"""
+
+import numpy as np
+from evaluate_model import top_k_accuracy
+
+print("=" * 60)
+print("Testing top-k accuracy with tied scores")
+print("=" * 60)
+
+num_classes = 39
+labels = np.arange(4) % num_classes + 1
+cases = []
+
+# Quantized output: all confidence on class 0, every other class exactly 0.0
+quantized = np.zeros((4, num_classes), dtype=np.float32)
+quantized[:, 0] = 255 / 256
+cases.append(("All mass on a wrong class, the rest tied at 0.0", quantized, labels, {1: 0.0, 3: 0.0, 5: 0.0}))
+
+# Every class tied: no image is in any top-k short of all classes
+cases.append(("Uniform scores", np.full((4, num_classes), 1 / num_classes, dtype=np.float32), labels,
+              {1: 0.0, 3: 0.0, 5: 0.0}))
+
+# True class tied with exactly one other class at the top: top-1 misses, top-3 hits
+tied_pair = np.zeros((4, num_classes), dtype=np.float32)
+tied_pair[:, 0] = 0.5
+tied_pair[np.arange(4), labels] = 0.5
+cases.append(("True class tied with one other at the top", tied_pair, labels, {1: 0.0, 3: 1.0, 5: 1.0}))
+
+# Distinct scores still rank normally: the true class is second
+ranked = np.tile(np.linspace(0.0, 1.0, num_classes, dtype=np.float32)[::-1], (4, 1))
+cases.append(("Distinct scores, true class second", ranked, np.full(4, 1), {1: 0.0, 3: 1.0, 5: 1.0}))
+
+failures = 0
+for test_num, (title, scores, case_labels, expected) in enumerate(cases, 1):
+    print(f"\n🧪 Test {test_num}: {title}")
+    result = top_k_accuracy(scores, case_labels)
+    print("   " + ", ".join(f"top-{k}: {accuracy:.2%}" for k, accuracy in result.items()))
+    if result == expected:
+        print("   ✅ As expected")
+    else:
+        print("   ❌ Expected " + ", ".join(f"top-{k}: {accuracy:.2%}" for k, accuracy in expected.items()))
+        failures += 1
+
+print("\n" + "=" * 60)
+if failures:
+    print(f"❌ {failures} top-k checks failed")
+    exit(1)
+print("✅ Ties are never counted as hits")
+print("=" * 60)
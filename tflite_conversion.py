@@ -0,0 +1,105 @@
+"""
+TFLite Conversion Helpers
+Representative PlantVillage samples for int8 calibration, plus automatic
+accuracy validation of converted models against the float Keras model
+"""
+
+import numpy as np
+from dataset_manifest import split_rows, class_names_from
+from input_pipeline import paths_and_labels
+from preprocessing import decode_batch, load_image, normalize
+from tflite_runner import TFLiteRunner
+
+REPRESENTATIVE_SAMPLES = 200
+VALIDATION_SAMPLES = 500
+VALIDATION_BATCH_SIZE = 32
+MAX_ACCURACY_DROP = 0.01   # a converted model may lose at most 1 point of top-1 accuracy
+FLOAT16_MAX_ABS_DIFF = 0.01  # float16 weights must reproduce float32 probabilities this closely
+
+
+def sample_rows(rows, split, num_samples, seed=42):
+    """Seeded random sample of one split's manifest rows."""
+    candidates = split_rows(rows, split)
+    if len(candidates) <= num_samples:
+        return candidates
+    picks = np.random.RandomState(seed).choice(len(candidates), num_samples, replace=False)
+    return [candidates[i] for i in sorted(picks)]
+
+
+def load_pixels(rows, data_path, class_names, img_size):
+    """Decode rows with the shared preprocessing; returns (uint8 images, int labels)."""
+    paths, labels = paths_and_labels(rows, data_path, class_names)
+    images, _ = decode_batch(paths, img_size)
+    return images, np.asarray(labels)
+
+
+def representative_dataset(rows, data_path, img_size, num_samples=REPRESENTATIVE_SAMPLES, seed=42):
+    """
+    Generator for converter.representative_dataset: streams real training-split
+    images one at a time, preprocessed exactly as at inference time.
+    """
+    paths, _ = paths_and_labels(sample_rows(rows, 'train', num_samples, seed), data_path,
+                                class_names_from(rows))
+
+    def generate():
+        pixels = np.empty((1,) + tuple(img_size) + (3,), dtype=np.uint8)
+        image = np.empty(pixels.shape, dtype=np.float32)
+        for path in paths:
+            try:
+                load_image(path, img_size, pixels[0])
+            except Exception as e:
+                print(f"⚠️  Skipping {path} in calibration: {e}")
+                continue
+            yield [normalize(pixels, image)]
+
+    return generate
+
+
+def tflite_scores(model_path, images, batch_size=VALIDATION_BATCH_SIZE, runner=None):
+    """Float scores from a TFLite model (or an existing runner) for uint8 images (handles quantized I/O)."""
+    runner = runner or TFLiteRunner(model_path, batch_size)
+    scores = np.empty((len(images), runner.num_classes), dtype=np.float32)
+    for start in range(0, len(images), runner.batch_size):
+        batch = images[start:start + runner.batch_size]
+        scores[start:start + len(batch)] = runner.run(batch)
+    return scores
+
+
+def validate_against_float(model, tflite_path, images, labels, max_drop=MAX_ACCURACY_DROP):
+    """
+    Compare top-1 accuracy of the Keras float model and a converted TFLite model
+    on labelled images. Without labels the float model's own predictions are
+    used, so the accuracy drop becomes the top-1 disagreement.
+    Also reports how far the converted output probabilities are from float32.
+    Returns a result dict with 'passed' set.
+    """
+    float_scores = model.predict(normalize(images), batch_size=VALIDATION_BATCH_SIZE, verbose=0)
+    converted_scores = tflite_scores(tflite_path, images)
+    float_top1 = np.argmax(float_scores, axis=1)
+    tflite_top1 = np.argmax(converted_scores, axis=1)
+    if labels is None:
+        labels = float_top1
+    abs_diff = np.abs(float_scores - converted_scores)
+
+    float_accuracy = float(np.mean(float_top1 == labels))
+    tflite_accuracy = float(np.mean(tflite_top1 == labels))
+    drop = float_accuracy - tflite_accuracy
+    return {
+        'num_images': int(len(labels)),
+        'float_accuracy': float_accuracy,
+        'tflite_accuracy': tflite_accuracy,
+        'accuracy_drop': drop,
+        'top1_agreement': float(np.mean(float_top1 == tflite_top1)),
+        'max_abs_diff': float(abs_diff.max()),
+        'mean_abs_diff': float(abs_diff.mean()),
+        'passed': bool(drop <= max_drop),
+    }
+
+
+def print_validation(result, label):
+    print(f"   {'Validation images:':<19}{result['num_images']}")
+    print(f"   {'Float accuracy:':<19}{result['float_accuracy'] * 100:.2f}%")
+    print(f"   {label + ' accuracy:':<19}{result['tflite_accuracy'] * 100:.2f}%")
+    print(f"   {'Accuracy drop:':<19}{result['accuracy_drop'] * 100:.2f} points")
+    print(f"   {'Top-1 agreement:':<19}{result['top1_agreement'] * 100:.2f}%")
+    print(f"   {'Output diff:':<19}max {result['max_abs_diff']:.5f}, mean {result['mean_abs_diff']:.6f}")
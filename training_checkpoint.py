@@ -0,0 +1,159 @@
+"""
+Resumable Training Checkpoints
+Model, optimizer, epoch/step position, RNG state and early-stopping progress saved
+periodically through tf.train.CheckpointManager, so an interrupted run continues mid-epoch
+"""
+
+import os
+import tempfile
+import tensorflow as tf
+from distributed_training import is_chief
+
+CHECKPOINT_DIR = 'training_checkpoints'
+CHECKPOINT_EVERY_STEPS = 500   # batches between mid-epoch checkpoints (0: epoch ends only)
+MAX_TO_KEEP = 3
+
+
+def track_rng_in_checkpoints():
+    """
+    Keras 2 layers draw dropout masks from global stateful ops by default;
+    switch them to tf.random.Generator variables so the model checkpoint carries
+    their RNG state (Keras 3 layers already keep it in seed-state variables).
+    Call before building the model.
+    """
+    experimental = getattr(tf.keras.backend, 'experimental', None)
+    if experimental is not None:
+        experimental.enable_tf_random_generator()
+
+
+def read_position(directory=CHECKPOINT_DIR):
+    """
+    (epoch, step) of the latest checkpoint in directory, or (0, 0) without one.
+    Read straight from the file, so input pipelines can be positioned before
+    the model exists.
+    """
+    latest = tf.train.latest_checkpoint(directory)
+    if latest is None:
+        return 0, 0
+    return (int(tf.train.load_variable(latest, 'epoch/.ATTRIBUTES/VARIABLE_VALUE')),
+            int(tf.train.load_variable(latest, 'step/.ATTRIBUTES/VARIABLE_VALUE')))
+
+
+class TrainingCheckpoint(tf.keras.callbacks.Callback):
+    """
+    Saves the full training state every `every_steps` batches and at the end
+    of every epoch; restore() loads the latest one back into the model.
+
+    The position is (epoch, batches done in that epoch): the training input
+    pipelines derive their order and augmentation from the epoch, so resuming
+    skips exactly the batches already trained on. EarlyStopping's patience
+    counter and best value, and ModelCheckpoint's best value, are saved too.
+    Put this callback after those two so it sees their end-of-epoch updates.
+    In multi-worker training every worker saves, but only the chief writes
+    to `directory`.
+    """
+
+    def __init__(self, model, directory=CHECKPOINT_DIR, every_steps=CHECKPOINT_EVERY_STEPS,
+                 max_to_keep=MAX_TO_KEEP, strategy=None, early_stopping=None, best_checkpoint=None):
+        super().__init__()
+        self.directory = directory
+        self.every_steps = every_steps
+        self.early_stopping = early_stopping
+        self.best_checkpoint = best_checkpoint
+        self.start_epoch, self.start_step = 0, 0
+        self._epoch, self._step = 0, 0
+
+        self.epoch = tf.Variable(0, dtype=tf.int64, trainable=False)
+        self.step = tf.Variable(0, dtype=tf.int64, trainable=False)
+        self.stopping_wait = tf.Variable(0, dtype=tf.int64, trainable=False)
+        self.stopping_best = tf.Variable(float('inf'), dtype=tf.float64, trainable=False)
+        self.stopping_best_epoch = tf.Variable(0, dtype=tf.int64, trainable=False)
+        self.checkpoint_best = tf.Variable(float('inf'), dtype=tf.float64, trainable=False)
+        # model_variables spells out every variable: Keras 3 models do not expose BatchNorm
+        # statistics or dropout seed state to tf.train.Checkpoint through `model`
+        self.checkpoint = tf.train.Checkpoint(
+            model=model, model_variables=list(model.variables), optimizer=model.optimizer,
+            epoch=self.epoch, step=self.step,
+            stopping_wait=self.stopping_wait, stopping_best=self.stopping_best,
+            stopping_best_epoch=self.stopping_best_epoch, checkpoint_best=self.checkpoint_best
+        )
+
+        write_dir = directory
+        if strategy is not None and not is_chief(strategy):
+            write_dir = tempfile.mkdtemp(prefix=f"checkpoint_worker_{strategy.cluster_resolver.task_id}_")
+        self.manager = tf.train.CheckpointManager(self.checkpoint, write_dir, max_to_keep=max_to_keep)
+
+    def restore(self):
+        """
+        Load the latest checkpoint from directory; returns its (epoch, step),
+        or (0, 0) when there is nothing to resume. Optimizer slots are restored
+        as soon as the first training step creates them.
+        """
+        latest = tf.train.latest_checkpoint(self.directory)
+        if latest is None:
+            return 0, 0
+        self.checkpoint.restore(latest)
+        self.start_epoch, self.start_step = int(self.epoch.numpy()), int(self.step.numpy())
+        print(f"♻️  Resuming from {latest} (epoch {self.start_epoch + 1}, step {self.start_step})")
+        return self.start_epoch, self.start_step
+
+    def save(self, epoch, step):
+        self.epoch.assign(epoch)
+        self.step.assign(step)
+        if self.early_stopping is not None and self.early_stopping.best is not None:
+            self.stopping_wait.assign(self.early_stopping.wait)
+            self.stopping_best.assign(self.early_stopping.best)
+            self.stopping_best_epoch.assign(self.early_stopping.best_epoch)
+        if self.best_checkpoint is not None and self.best_checkpoint.best is not None:
+            self.checkpoint_best.assign(self.best_checkpoint.best)
+        return self.manager.save()
+
+    def new_phase(self):
+        """Restart early-stopping patience (the best value carries over) for a new training phase."""
+        self.stopping_wait.assign(0)
+
+    def on_train_begin(self, logs=None):
+        # EarlyStopping resets itself in every fit; put back the run's progress so far,
+        # including progress from before an interruption
+        if self.early_stopping is not None:
+            self.early_stopping.wait = int(self.stopping_wait.numpy())
+            self.early_stopping.best = float(self.stopping_best.numpy())
+            self.early_stopping.best_epoch = int(self.stopping_best_epoch.numpy())
+        if self.best_checkpoint is not None and (self.start_epoch or self.start_step):
+            self.best_checkpoint.best = float(self.checkpoint_best.numpy())
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._epoch = epoch
+        self._step = self.start_step if epoch == self.start_epoch else 0
+
+    def on_train_batch_end(self, batch, logs=None):
+        self._step += 1
+        if self.every_steps and self._step % self.every_steps == 0:
+            self.save(self._epoch, self._step)
+
+    def on_epoch_end(self, epoch, logs=None):
+        path = self.save(epoch + 1, 0)
+        print(f"\n💾 Training state saved to {os.path.dirname(path) or '.'} (epoch {epoch + 1} complete)")
+
+
+def resume_fit(model, make_train_dataset, start_epoch, start_step, epochs, **fit_kwargs):
+    """
+    model.fit from (start_epoch, start_step) up to `epochs`. An epoch resumed
+    part-way is finished on its remaining batches in a fit of its own, since
+    Keras takes the epoch length from the first epoch it sees.
+    make_train_dataset(start_epoch=, start_step=) builds the training pipeline,
+    which with start_step covers just the rest of start_epoch.
+    Returns the History objects; stops early if a callback stopped training.
+    """
+    histories = []
+    if start_step and start_epoch < epochs:
+        print(f"\n⏩ Finishing epoch {start_epoch + 1} from step {start_step}...")
+        histories.append(model.fit(make_train_dataset(start_epoch=start_epoch, start_step=start_step),
+                                   epochs=start_epoch + 1, initial_epoch=start_epoch, **fit_kwargs))
+        start_epoch += 1
+        if model.stop_training:
+            return histories
+    if start_epoch < epochs:
+        histories.append(model.fit(make_train_dataset(start_epoch=start_epoch),
+                                   epochs=epochs, initial_epoch=start_epoch, **fit_kwargs))
+    return histories
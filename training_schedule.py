@@ -0,0 +1,109 @@
+"""
+Transfer-Learning Schedules for PlantVillage Retraining
+Full fine-tuning, or a frozen-backbone head warmup followed by progressive unfreezing
+of the top backbone blocks at a lower learning rate, with a per-phase cost report
+"""
+
+import collections
+import time
+import numpy as np
+from model_factory import BACKBONE_BLOCKS, set_backbone_trainable
+from training_checkpoint import resume_fit
+
+SCHEDULES = ('full', 'two-phase')
+
+# Two-phase schedule
+WARMUP_EPOCHS = 3
+WARMUP_LEARNING_RATE = 1e-3
+UNFREEZE_STAGES = 3            # each stage unfreezes one more backbone block group, top down
+STAGE_EPOCHS = 2
+FINE_TUNE_LEARNING_RATE = 1e-5
+
+# blocks: backbone layer prefixes left trainable (None: all, (): frozen)
+Phase = collections.namedtuple('Phase', ['name', 'start_epoch', 'end_epoch', 'learning_rate', 'blocks'])
+
+
+def build_schedule(schedule, epochs, learning_rate, lr_scale=1, blocks=BACKBONE_BLOCKS):
+    """
+    The phases of a schedule, each covering [start_epoch, end_epoch).
+    'full' trains everything for `epochs` at learning_rate. 'two-phase' ignores
+    both: it warms the head up on a frozen backbone, then unfreezes the top
+    block groups (the backbone's `blocks`, top down) one stage at a time.
+    Learning rates are multiplied by lr_scale (the replica count in distributed training).
+    """
+    if schedule == 'full':
+        return [Phase('full fine-tune', 0, epochs, learning_rate * lr_scale, None)]
+
+    phases = [Phase('head warmup', 0, WARMUP_EPOCHS, WARMUP_LEARNING_RATE * lr_scale, ())]
+    for stage in range(1, min(UNFREEZE_STAGES, len(blocks)) + 1):
+        # the first group is only the final 1x1 conv, so it goes with the next block group
+        unfrozen = blocks[:stage + 1]
+        start = phases[-1].end_epoch
+        phases.append(Phase(f"unfreeze {'+'.join(b.strip('_') for b in unfrozen)}", start, start + STAGE_EPOCHS,
+                            FINE_TUNE_LEARNING_RATE * lr_scale, unfrozen))
+    return phases
+
+
+def trainable_params(model):
+    return int(sum(np.prod(w.shape) for w in model.trainable_weights))
+
+
+def run_schedule(model, base_model, phases, make_train_dataset, compile_kwargs, strategy,
+                 training_state=None, start_epoch=0, start_step=0, **fit_kwargs):
+    """
+    Train through the phases in order, resuming at (start_epoch, start_step).
+    Each phase sets which backbone blocks train, recompiles with the model's
+    existing optimizer at the phase learning rate, and restarts early-stopping
+    patience; an early stop ends only the current phase.
+    The optimizer must already be built on every variable the schedule trains.
+    Returns one report dict per phase that ran.
+    """
+    reports = []
+    for phase in phases:
+        if phase.end_epoch <= start_epoch:
+            continue
+        set_backbone_trainable(base_model, phase.blocks)
+        with strategy.scope():
+            model.compile(optimizer=model.optimizer, **compile_kwargs)
+        model.optimizer.learning_rate.assign(phase.learning_rate)
+        resumed = start_epoch > phase.start_epoch or start_step
+        if training_state is not None and not resumed:
+            training_state.new_phase()
+
+        print(f"\n🧭 Phase '{phase.name}': epochs {phase.start_epoch + 1}-{phase.end_epoch}, "
+              f"learning rate {phase.learning_rate:g}, {trainable_params(model):,} trainable params")
+        print("=" * 60)
+        first_epoch = max(start_epoch, phase.start_epoch)
+        phase_start = time.perf_counter()
+        histories = resume_fit(model, make_train_dataset, first_epoch,
+                               start_step if first_epoch == start_epoch else 0,
+                               phase.end_epoch, **fit_kwargs)
+        history = {}
+        for h in histories:
+            for key, values in h.history.items():
+                history.setdefault(key, []).extend(values)
+        reports.append({
+            'phase': phase.name,
+            'epochs': len(history.get('loss', [])),
+            'seconds': time.perf_counter() - phase_start,
+            'trainable_params': trainable_params(model),
+            'images_per_sec': float(np.mean(history['images_per_sec'])) if 'images_per_sec' in history else None,
+            'accuracy': history['accuracy'][-1] if history.get('accuracy') else None,
+            'val_accuracy': history['val_accuracy'][-1] if history.get('val_accuracy') else None,
+        })
+        start_step = 0
+    return reports
+
+
+def print_phase_report(reports):
+    print("\n📊 Phase Report")
+    print("=" * 60)
+    print(f"{'Phase':<34} {'Epochs':>6} {'Time':>9} {'Img/s':>8} {'Acc':>7} {'Val acc':>8}")
+    print("-" * 76)
+    for r in reports:
+        rate = f"{r['images_per_sec']:.1f}" if r['images_per_sec'] is not None else '-'
+        acc = f"{r['accuracy'] * 100:.2f}%" if r['accuracy'] is not None else '-'
+        val = f"{r['val_accuracy'] * 100:.2f}%" if r['val_accuracy'] is not None else '-'
+        print(f"{r['phase']:<34} {r['epochs']:>6} {r['seconds']:>8.1f}s {rate:>8} {acc:>7} {val:>8}")
+    print("-" * 76)
+    print(f"{'Total':<34} {sum(r['epochs'] for r in reports):>6} {sum(r['seconds'] for r in reports):>8.1f}s")